@@ -2,14 +2,34 @@
 from __future__ import annotations
 
 import argparse
-import os
 from datetime import datetime
+import os
 from pathlib import Path
-import shutil
-import subprocess
 import sys
-import tarfile
 
+from newyearscards.backup import (
+    load_recipients,
+    restore_archive,
+    write_encrypted_tar,
+)
+from newyearscards.catalog import (
+    expected_checksums,
+    find_entry,
+    record_backup,
+)
+from newyearscards.chunkstore import create_snapshot, is_snapshot, restore_snapshot
+from newyearscards.compression import (
+    COMPRESSIONS,
+    archive_suffix,
+    check_level,
+    compression_from_env,
+)
+from newyearscards.seekable import (
+    SEEKABLE_SUFFIX,
+    extract_seekable,
+    is_seekable,
+    write_seekable_archive,
+)
 
 # Optional .env support
 try:  # pragma: no cover - trivial import
@@ -19,36 +39,6 @@ except Exception:  # pragma: no cover
         return False
 
 
-def tar_sources(sources: list[Path], out_tar_gz: Path) -> None:
-    with tarfile.open(out_tar_gz, "w:gz") as tar:
-        for src in sources:
-            tar.add(src, arcname=src.name)
-
-
-def run_age_encrypt(in_file: Path, out_file: Path, recipients: list[str]) -> None:
-    cmd = [
-        "age",
-        *(sum([["-r", r] for r in recipients], [])),
-        "-o",
-        str(out_file),
-        str(in_file),
-    ]
-    subprocess.run(cmd, check=True)
-
-
-def run_age_decrypt(in_file: Path, out_file: Path, identity: Path) -> None:
-    cmd = [
-        "age",
-        "-d",
-        "-i",
-        str(identity),
-        "-o",
-        str(out_file),
-        str(in_file),
-    ]
-    subprocess.run(cmd, check=True)
-
-
 def backup(args: argparse.Namespace) -> int:
     # Load .env so AGE_* and directory overrides are available
     load_dotenv()
@@ -61,37 +51,66 @@ def backup(args: argparse.Namespace) -> int:
         print("No sources found to back up (data/raw, data/processed)", file=sys.stderr)
         return 2
 
-    backup_dir.mkdir(parents=True, exist_ok=True)
-    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
-    tmp_tar = backup_dir / f"addresses-{stamp}.tgz"
-    out_age = backup_dir / f"addresses-{stamp}.tgz.age"
-
-    tar_sources(sources, tmp_tar)
-
     rec = args.recipient or os.getenv("AGE_RECIPIENT")
     rec_file = args.recipients_file or os.getenv("AGE_RECIPIENTS_FILE")
-    recipients: list[str] = []
-    if rec:
-        recipients.append(rec)
-    if rec_file:
-        for line in Path(rec_file).read_text(encoding="utf-8").splitlines():
-            s = line.strip()
-            if s:
-                recipients.append(s)
+    recipients, missing_file = load_recipients(rec, rec_file)
+    if missing_file:
+        if args.recipients_file:
+            print(f"Recipients file not found: {rec_file}", file=sys.stderr)
+            return 2
+        print(f"Note: AGE_RECIPIENTS_FILE not found: {rec_file}", file=sys.stderr)
     if not recipients:
         print(
-            "Missing recipients. Set --recipient or --recipients-file (or AGE_RECIPIENT / AGE_RECIPIENTS_FILE)",
+            "Missing recipients. Set --recipient or --recipients-file "
+            "(or AGE_RECIPIENT / AGE_RECIPIENTS_FILE)",
             file=sys.stderr,
         )
-        tmp_tar.unlink(missing_ok=True)
         return 2
 
+    mode = args.mode or os.getenv("BACKUP_MODE", "archive")
+    if mode == "dedup":
+        result = create_snapshot(sources, backup_dir / "store", recipients)
+        print(f"Wrote encrypted snapshot: {result.path} ({result.summary()})")
+        return 0
+
+    backup_dir.mkdir(parents=True, exist_ok=True)
+    now = datetime.now()
+    stamp = now.strftime("%Y%m%d-%H%M%S")
     try:
-        run_age_encrypt(tmp_tar, out_age, recipients)
-    finally:
-        tmp_tar.unlink(missing_ok=True)
+        compression, level, threads = compression_from_env()
+        compression = args.compression or compression
+        level = args.level if args.level is not None else level
+        threads = args.threads if args.threads is not None else threads
+        if level is not None:
+            check_level(compression, level)
+        if threads is not None and threads < 1:
+            raise ValueError(f"--threads must be at least 1, got {threads}")
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    if mode == "seekable":
+        out_age = backup_dir / f"addresses-{stamp}{SEEKABLE_SUFFIX}"
+        stats = write_seekable_archive(
+            sources, out_age, recipients, compression=compression, level=level
+        )
+    else:
+        out_age = backup_dir / f"addresses-{stamp}{archive_suffix(compression, level)}.age"
+        # Compressed tar is piped straight into age; no plaintext archive touches the disk
+        stats = write_encrypted_tar(
+            sources, out_age, recipients, compression=compression, level=level, threads=threads
+        )
 
-    print(f"Wrote encrypted backup: {out_age}")
+    record_backup(
+        backup_dir,
+        out_age,
+        stats.files,
+        sources,
+        recipients,
+        year=None,
+        created=now,
+        compression=compression,
+    )
+    print(f"Wrote encrypted backup: {out_age} ({stats.summary()})")
     return 0
 
 
@@ -108,14 +127,44 @@ def restore(args: argparse.Namespace) -> int:
         print("Missing identity. Provide --identity or set AGE_IDENTITY", file=sys.stderr)
         return 2
 
-    tmp_tar = in_age.with_suffix("")  # strip .age
-    run_age_decrypt(in_age, tmp_tar, identity)
-
     target_base = Path(args.out_dir or ".")
-    with tarfile.open(tmp_tar, "r:gz") as tar:
-        tar.extractall(path=target_base)
-    tmp_tar.unlink(missing_ok=True)
-    print(f"Restored into: {target_base.resolve()}")
+    if is_seekable(in_age):
+        # Only the index and the requested members are decrypted
+        restored = extract_seekable(in_age, identity, target_base, args.path or None)
+        print(f"Restored {len(restored)} file(s) into: {target_base.resolve()}")
+        return 0
+
+    if is_snapshot(in_age):
+        if args.path:
+            print("--path is not supported for snapshots", file=sys.stderr)
+            return 2
+        files = restore_snapshot(in_age, identity, target_base)
+        print(f"Restored {files} file(s) into: {target_base.resolve()}")
+        return 0
+
+    expected = None
+    if args.verify:
+        found = find_entry(in_age)
+        if found is None:
+            print(f"No catalog entry for {in_age}; cannot verify", file=sys.stderr)
+            return 2
+        expected = expected_checksums(found[1], identity)
+
+    # age output is piped straight into the tar reader; nothing plaintext but
+    # the extracted members is written
+    result = restore_archive(
+        in_age, identity, target_base, paths=args.path, expected=expected, workers=args.jobs
+    )
+    if args.path and not result.files:
+        print(f"Path not in backup: {', '.join(args.path)}", file=sys.stderr)
+        return 2
+    print(f"Restored {len(result.files)} file(s) into: {target_base.resolve()}")
+    if expected is not None:
+        print(f"Verified {result.verified} file(s) against catalog checksums")
+        for name in result.mismatched:
+            print(f"Checksum mismatch: {name}", file=sys.stderr)
+        if result.mismatched:
+            return 1
     return 0
 
 
@@ -127,12 +176,43 @@ def main(argv: list[str] | None = None) -> int:
     pb.add_argument("--out-dir", help="Output directory for .age file (default: backups)")
     pb.add_argument("--recipient", help="age recipient (public key)")
     pb.add_argument("--recipients-file", help="File with one recipient per line")
+    pb.add_argument(
+        "--mode",
+        choices=["archive", "seekable", "dedup"],
+        help="archive: one .tgz.age per run; seekable: one .sar per run with members "
+        "encrypted separately (restore --path); dedup: chunk store under <out-dir>/store "
+        "(default: BACKUP_MODE or archive)",
+    )
+    pb.add_argument(
+        "--compression",
+        choices=list(COMPRESSIONS),
+        help="Archive codec: gzip (.tgz), pgzip (parallel gzip, .tgz) or zstd "
+        "(.tar.zst, needs zstandard) (default: BACKUP_COMPRESSION or gzip)",
+    )
+    pb.add_argument("--level", type=int, help="Compression level (zstd default: 3)")
+    pb.add_argument("--threads", type=int, help="Worker threads for pgzip/zstd (default: all CPUs)")
     pb.set_defaults(func=backup)
 
     pr = sub.add_parser("restore", help="Restore an encrypted backup to the current directory")
-    pr.add_argument("--input", required=True, help="Path to .age file")
+    pr.add_argument(
+        "--input",
+        required=True,
+        help="Path to .age or .sar file, or store/snapshots/*.json.age",
+    )
     pr.add_argument("--identity", help="age identity (private key) file path")
     pr.add_argument("--out-dir", help="Directory to extract into (default: current directory)")
+    pr.add_argument(
+        "--path",
+        action="append",
+        help="Restore only this file or directory, e.g. data/raw/2023/mailing_list.csv "
+        "(repeatable; .sar backups decrypt only what is needed)",
+    )
+    pr.add_argument(
+        "--verify",
+        action="store_true",
+        help="Check restored files against the SHA-256 sums in backups/catalog.jsonl",
+    )
+    pr.add_argument("--jobs", type=int, help="Hashing threads for --verify (default: auto)")
     pr.set_defaults(func=restore)
 
     args = p.parse_args(argv)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""CLI cold-start benchmark.
+
+Runs `newyearscards --version` and `build-labels --dry-run` in fresh
+interpreters, reports the median wall time, and uses `python -X importtime`
+to show the total import time and the most expensive top-level imports.
+
+Usage:
+  python scripts/bench_startup.py [--runs 20] [--top 8] [--budget-ms 50]
+
+With --budget-ms the script exits 1 when a command's median exceeds it.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+from pathlib import Path
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SAMPLE_CSV = (
+    "Prefix,First Name,Last Name,Address 1,Address 2,City,State,Zip Code,Country\n"
+    "Fam.,Frank,Prager,Satower Str. 26,,Stäbelow,,18198,Germany\n"
+    ",Ada,Lovelace,1 Main St,,Springfield,IL,62701,USA\n"
+)
+
+
+def _env() -> dict[str, str]:
+    env = dict(os.environ)
+    src = str(ROOT / "src")
+    env["PYTHONPATH"] = src + os.pathsep + env["PYTHONPATH"] if env.get("PYTHONPATH") else src
+    return env
+
+
+def _cmd(args: list[str], *, importtime: bool = False) -> list[str]:
+    flags = ["-X", "importtime"] if importtime else []
+    return [sys.executable, *flags, "-m", "newyearscards.cli", *args]
+
+
+def wall_times(args: list[str], runs: int) -> list[float]:
+    """Wall-clock seconds of `runs` fresh invocations."""
+    times: list[float] = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            _cmd(args), env=_env(), cwd=ROOT, check=True, stdout=subprocess.DEVNULL
+        )
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def import_times(args: list[str]) -> list[tuple[str, int, int]]:
+    """(module, self µs, cumulative µs) for each import, from -X importtime."""
+    proc = subprocess.run(
+        _cmd(args, importtime=True),
+        env=_env(),
+        cwd=ROOT,
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    rows: list[tuple[str, int, int]] = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative, name = line.split(":", 1)[1].split("|")
+        rows.append((name[1:].rstrip(), int(self_us), int(cumulative)))
+    return rows
+
+
+def report(label: str, args: list[str], runs: int, top: int) -> float:
+    median_ms = statistics.median(wall_times(args, runs)) * 1000
+    rows = import_times(args)
+    # Top-level imports are not indented; their cumulative times add up to the total
+    top_level = [r for r in rows if not r[0].startswith(" ")]
+    total_ms = sum(r[2] for r in top_level) / 1000
+    print(f"{label}: median {median_ms:.1f} ms over {runs} run(s), imports {total_ms:.1f} ms")
+    for name, _, cumulative in sorted(top_level, key=lambda r: r[2], reverse=True)[:top]:
+        print(f"  {cumulative / 1000:7.1f} ms  {name}")
+    return median_ms
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="Measure newyearscards CLI cold start")
+    p.add_argument("--runs", type=int, default=20, help="Invocations per command")
+    p.add_argument("--top", type=int, default=8, help="Top-level imports to list")
+    p.add_argument("--budget-ms", type=float, help="Fail if a median exceeds this")
+    args = p.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sample = Path(tmp) / "mailing_list.csv"
+        sample.write_text(SAMPLE_CSV, encoding="utf-8")
+        medians = {
+            "--version": report("--version", ["--version"], args.runs, args.top),
+            "build-labels --dry-run": report(
+                "build-labels --dry-run",
+                ["build-labels", "--dry-run", "--input", str(sample)],
+                args.runs,
+                args.top,
+            ),
+        }
+    over = {k: v for k, v in medians.items() if args.budget_ms and v > args.budget_ms}
+    for label, ms in over.items():
+        print(f"Over budget: {label} took {ms:.1f} ms (> {args.budget_ms:.0f} ms)")
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
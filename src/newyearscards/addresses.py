@@ -1,13 +1,35 @@
 from __future__ import annotations
 
-from collections.abc import Iterable
+from collections.abc import Iterable, Iterator, Mapping, Sequence
 import csv
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
+import random
 import re
-from typing import Any, TypedDict, cast
+from typing import TYPE_CHECKING, Any, TypedDict, cast
 import unicodedata
 
-from .config import ensure_dir, load_paths
+from .config import Paths, ensure_dir, load_paths
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .label_cache import LabelCache
+
+LABELS_FILENAME = "labels_for_mailmerge.csv"
+# Bump whenever a change to the formatting code alters the labels it produces
+# (cached labels are keyed by it, see `label_cache.template_version`)
+FORMAT_VERSION = 1
+LABEL_FIELDS = [
+    "Prefix",
+    "FirstName",
+    "LastName",
+    "Country",
+    "Line1",
+    "Line2",
+    "Line3",
+    "Line4",
+    "Line5",
+]
 
 NORMALIZE_MAP: dict[str, str] = {
     "prefix": "prefix",
@@ -36,6 +58,18 @@ NORMALIZE_MAP: dict[str, str] = {
     "postcode": "zip",
     "country": "country",
 }
+# Normalized field names a raw row can carry, in column order
+RAW_FIELDS = (
+    "prefix",
+    "first_name",
+    "last_name",
+    "address1",
+    "address2",
+    "city",
+    "state",
+    "zip",
+    "country",
+)
 
 
 US_STATE_ABBR = {
@@ -127,13 +161,28 @@ def normalize_headers(headers: Iterable[str]) -> list[str]:
     return result
 
 
-yaml_module: Any | None
-try:  # Prefer a direct import so tooling (deptry) sees usage
-    import yaml as _yaml
+def normalize_row(row: Mapping[str, Any]) -> dict[str, str]:
+    """Re-key a record by normalized header names ("First Name" -> "first_name")."""
+    keys = normalize_headers(row)
+    return {k: "" if v is None else str(v).strip() for k, v in zip(keys, row.values(), strict=True)}
 
-    yaml_module = _yaml
-except Exception:  # pragma: no cover
-    yaml_module = None
+
+# PyYAML is imported on first use (it is a sizeable share of CLI startup);
+# None means it is not installed and the fallback parser is used.
+_NOT_LOADED: Any = object()
+yaml_module: Any | None = _NOT_LOADED
+
+
+def _yaml() -> Any | None:
+    global yaml_module
+    if yaml_module is _NOT_LOADED:
+        try:  # Prefer a direct import so tooling (deptry) sees usage
+            import yaml as _yaml_mod
+
+            yaml_module = _yaml_mod
+        except Exception:  # pragma: no cover
+            yaml_module = None
+    return yaml_module
 
 
 class TemplateEntry(TypedDict, total=False):
@@ -143,8 +192,9 @@ class TemplateEntry(TypedDict, total=False):
 
 def load_templates(path: Path) -> dict[str, TemplateEntry]:
     text = path.read_text(encoding="utf-8")
-    if yaml_module is not None:
-        data = cast(Any, yaml_module).safe_load(text)
+    yaml = _yaml()
+    if yaml is not None:
+        data = yaml.safe_load(text)
         if not isinstance(data, dict):
             raise ValueError("address templates file must be a mapping")
         return cast(dict[str, TemplateEntry], data)
@@ -187,10 +237,28 @@ def load_templates(path: Path) -> dict[str, TemplateEntry]:
 
 
 def infer_country(row: dict[str, str]) -> tuple[str, str]:
-    raw = (row.get("country") or "").strip()
-    state = (row.get("state") or "").strip().upper()
+    code, display, _ = _resolve_country(
+        (row.get("country") or "").strip(), (row.get("state") or "").strip()
+    )
+    return code, display
+
+
+def country_resolution(row: dict[str, str]) -> tuple[str, str, str]:
+    """`infer_country` plus the path that resolved it, as (code, display, path).
+
+    The path is "state" (US state, no country), "alias" (alias table),
+    "canonical" (canonical-name fallback), "unresolved" (text kept as given)
+    or "empty".
+    """
+    return _resolve_country((row.get("country") or "").strip(), (row.get("state") or "").strip())
+
+
+# Mailing lists repeat a handful of country spellings; memoize the lookups
+@lru_cache(maxsize=1024)
+def _resolve_country(raw: str, state: str) -> tuple[str, str, str]:
+    state = state.upper()
     if not raw and state in US_STATE_ABBR:
-        return "US", "United States"
+        return "US", "United States", "state"
 
     # First try Unicode-aware alias mapping
     alias_key = unicodedata.normalize("NFC", raw).casefold()
@@ -205,20 +273,20 @@ def infer_country(row: dict[str, str]) -> tuple[str, str]:
             "PF": "French Polynesia",
             "TH": "Thailand",
         }.get(code, raw or code)
-        return code, display
+        return code, display, "alias"
 
     key = _canon(raw)
     if key in {"germany", "de", "deutschland"}:
-        return "DE", "Germany"
+        return "DE", "Germany", "canonical"
     if key in {"france", "fr", "français", "francaise", "république française"}:
-        return "FR", "France"
+        return "FR", "France", "canonical"
     if key in {"united states", "usa", "us", "united states of america"}:
-        return "US", "United States"
+        return "US", "United States", "canonical"
     if key in {"thailand", "th"}:
-        return "TH", "Thailand"
+        return "TH", "Thailand", "canonical"
 
     # Fall back to given text, or empty
-    return (raw or "", raw or "")
+    return (raw or "", raw or "", "unresolved" if raw else "empty")
 
 
 def build_address_lines(row: dict[str, str], templates: dict[str, TemplateEntry]) -> list[str]:
@@ -299,13 +367,57 @@ def _compact_lines_for_schema(code: str, lines: list[str], row: dict[str, str])
     return (lines + [""] * 5)[:5]
 
 
-def transform_rows(
+def has_address(row: Mapping[str, str]) -> bool:
+    return any((row.get("address1"), row.get("address2"), row.get("city")))
+
+
+def country_matches(row: dict[str, str], wanted: str) -> bool:
+    """True if the row resolves to `wanted`, given as a code ("DE") or a name."""
+    code, display = infer_country(row)
+    return wanted.strip().casefold() in {code.casefold(), display.casefold()}
+
+
+def select_rows(
+    rows: Iterable[dict[str, str]],
+    *,
+    limit: int | None = None,
+    sample: int | None = None,
+    country: str | None = None,
+    rng: random.Random | None = None,
+) -> Iterator[dict[str, str]]:
+    """Pick the rows to format for a preview, in one lazy pass over `rows`.
+
+    `country` filters on the resolved country before anything is formatted.
+    `sample` draws a uniform reservoir sample of that many rows (kept in input
+    order); otherwise the first `limit` rows are taken and the rest of the
+    input is never read.
+    """
+    picked: Iterable[dict[str, str]] = (r for r in rows if has_address(r))
+    if country:
+        picked = (r for r in picked if country_matches(r, country))
+    if sample is None:
+        yield from islice(picked, limit)
+        return
+    rng = rng or random.Random()
+    reservoir: list[tuple[int, dict[str, str]]] = []
+    for i, row in enumerate(picked):
+        if i < sample:
+            reservoir.append((i, row))
+        else:
+            j = rng.randint(0, i)
+            if j < sample:
+                reservoir[j] = (i, row)
+    for _, row in sorted(reservoir, key=lambda item: item[0]):
+        yield row
+
+
+def iter_transform_rows(
     rows: Iterable[dict[str, str]], templates: dict[str, TemplateEntry]
-) -> list[dict[str, str]]:
-    output: list[dict[str, str]] = []
+) -> Iterator[dict[str, str]]:
+    """Lazily format rows into label records, skipping clearly empty ones."""
     for row in rows:
         # Skip if clearly empty
-        if not any((row.get("address1"), row.get("address2"), row.get("city"))):
+        if not has_address(row):
             continue
 
         code, display_country = infer_country(row)
@@ -313,72 +425,152 @@ def transform_rows(
         # ensure at most 5 columns, preserving country line when possible
         lines5 = _compact_lines_for_schema(code, lines, row)
 
-        output.append(
-            {
-                "Prefix": row.get("prefix", ""),
-                "FirstName": row.get("first_name", ""),
-                "LastName": row.get("last_name", ""),
-                "Country": display_country,
-                "Line1": lines5[0],
-                "Line2": lines5[1],
-                "Line3": lines5[2],
-                "Line4": lines5[3],
-                "Line5": lines5[4],
-            }
-        )
-    return output
-
-
-def build_labels(in_csv: Path, out_csv: Path | None = None) -> Path:
-    paths = load_paths()
-    templates = load_templates(paths.templates)
+        yield {
+            "Prefix": row.get("prefix", ""),
+            "FirstName": row.get("first_name", ""),
+            "LastName": row.get("last_name", ""),
+            "Country": display_country,
+            "Line1": lines5[0],
+            "Line2": lines5[1],
+            "Line3": lines5[2],
+            "Line4": lines5[3],
+            "Line5": lines5[4],
+        }
 
-    with in_csv.open("r", encoding="utf-8", newline="") as f:
-        reader = csv.reader(f)
-        try:
-            raw_headers = next(reader)
-        except StopIteration as err:
-            raise ValueError("Input CSV is empty") from err
 
-        headers = normalize_headers(raw_headers)
-        rows: list[dict[str, str]] = []
-        for raw_row in reader:
-            row_dict: dict[str, str] = {}
-            for i, val in enumerate(raw_row[: len(headers)]):
-                row_dict[headers[i]] = val.strip()
-            rows.append(row_dict)
+def transform_rows(
+    rows: Iterable[dict[str, str]], templates: dict[str, TemplateEntry]
+) -> list[dict[str, str]]:
+    return list(iter_transform_rows(rows, templates))
 
-    processed = transform_rows(rows, templates)
 
-    if out_csv is None:
-        # Deduce year from parent folder name if possible
-        try:
-            year = int(in_csv.parent.name)
-        except ValueError as err:
-            raise ValueError(
-                "Cannot infer year from input path; please provide output path"
-            ) from err
-        target_dir = paths.processed_dir(year)
-        ensure_dir(target_dir)
-        out_csv = target_dir / "labels_for_mailmerge.csv"
-    else:
-        ensure_dir(out_csv.parent)
+def iter_csv_rows(lines: Iterable[str]) -> Iterator[dict[str, str]]:
+    """Parse raw CSV lines into dicts keyed by normalized header names."""
+    reader = csv.reader(lines)
+    try:
+        raw_headers = next(reader)
+    except StopIteration as err:
+        raise ValueError("Input CSV is empty") from err
+
+    headers = normalize_headers(raw_headers)
+    for raw_row in reader:
+        row_dict: dict[str, str] = {}
+        for i, val in enumerate(raw_row[: len(headers)]):
+            row_dict[headers[i]] = val.strip()
+        yield row_dict
+
+
+class LabelBuilder:
+    """Reusable in-memory label formatter.
+
+    Construct once from a templates file or an already-parsed mapping, then
+    call `build()` as often as needed; no paths or templates are reloaded.
+    The templates are copied at construction and only read afterwards, so one
+    builder can be shared between threads.
+    """
+
+    def __init__(self, templates: str | Path | Mapping[str, TemplateEntry] | None = None) -> None:
+        if templates is None:
+            templates = load_paths().templates
+        if isinstance(templates, (str, Path)):
+            loaded = load_templates(Path(templates))
+        else:
+            loaded = dict(templates)
+        self._templates: dict[str, TemplateEntry] = {}
+        for code, entry in loaded.items():
+            if not isinstance(entry, Mapping) or not isinstance(entry.get("lines"), list):
+                raise ValueError(f"address template {code!r} missing 'lines'")
+            copied = cast(TemplateEntry, dict(entry))
+            copied["lines"] = list(entry["lines"])
+            self._templates[code] = copied
+
+    @property
+    def templates(self) -> Mapping[str, TemplateEntry]:
+        return self._templates
+
+    def build(
+        self,
+        records: Iterable[Mapping[str, Any] | Sequence[Any]],
+        *,
+        headers: Sequence[str] | None = None,
+    ) -> Iterator[dict[str, str]]:
+        """Lazily format records into label dicts (see `iter_transform_rows`).
+
+        Records are mappings keyed by sheet headers or normalized names, or
+        tuples/lists in `headers` order. Without `headers`, the first tuple is
+        taken as the header row, as `csv.reader` yields it.
+        """
+        return iter_transform_rows(self._normalized(records, headers), self._templates)
+
+    def build_one(self, record: Mapping[str, Any]) -> dict[str, str] | None:
+        """Format a single record; None when it has no address."""
+        return next(self.build([record]), None)
+
+    @staticmethod
+    def _normalized(
+        records: Iterable[Mapping[str, Any] | Sequence[Any]], headers: Sequence[str] | None
+    ) -> Iterator[dict[str, str]]:
+        keys = normalize_headers(headers) if headers is not None else None
+        for record in records:
+            if isinstance(record, Mapping):
+                yield normalize_row(record)
+            elif keys is None:
+                keys = normalize_headers(str(h) for h in record)
+            else:
+                # Short rows leave the remaining fields empty, as in iter_csv_rows
+                pairs = zip(keys, record, strict=False)
+                yield {k: "" if v is None else str(v).strip() for k, v in pairs}
+
+
+def default_labels_path(in_csv: Path, paths: Paths) -> Path:
+    """data/processed/<year>/labels_for_mailmerge.csv, with <year> taken from the input path."""
+    # Deduce year from parent folder name if possible
+    try:
+        year = int(in_csv.parent.name)
+    except ValueError as err:
+        raise ValueError("Cannot infer year from input path; please provide output path") from err
+    return paths.processed_dir(year) / LABELS_FILENAME
 
+
+def write_labels(rows: Iterable[dict[str, str]], out_csv: Path) -> int:
+    """Write label records to `out_csv`; returns the number of rows written."""
+    count = 0
     with out_csv.open("w", encoding="utf-8", newline="") as f:
-        fieldnames = [
-            "Prefix",
-            "FirstName",
-            "LastName",
-            "Country",
-            "Line1",
-            "Line2",
-            "Line3",
-            "Line4",
-            "Line5",
-        ]
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer = csv.DictWriter(f, fieldnames=LABEL_FIELDS)
         writer.writeheader()
-        for row in processed:
+        for row in rows:
             writer.writerow(row)
+            count += 1
+    return count
+
+
+def build_labels(
+    in_csv: Path,
+    out_csv: Path | None = None,
+    *,
+    builder: LabelBuilder | None = None,
+    cache: LabelCache | None = None,
+) -> Path:
+    """Build the labels CSV for `in_csv`; pass a `builder` to reuse loaded templates.
+
+    With a `cache` (see `label_cache.open_cache`), rows formatted in an
+    earlier build with the same templates are not formatted again.
+    """
+    paths = load_paths()
+    if builder is None:
+        builder = LabelBuilder(paths.templates)
+
+    with in_csv.open("r", encoding="utf-8", newline="") as f:
+        if cache is None:
+            processed = list(builder.build(iter_csv_rows(f)))
+        else:
+            from .label_cache import build_cached
+
+            processed = list(build_cached(builder, iter_csv_rows(f), cache))
+
+    if out_csv is None:
+        out_csv = default_labels_path(in_csv, paths)
+    ensure_dir(out_csv.parent)
 
+    write_labels(processed, out_csv)
     return out_csv
@@ -0,0 +1,212 @@
+"""Asyncio-native counterparts of `download_sheet` and `build_labels`.
+
+`download_sheet_async` streams the CSV export with httpx (optional extra
+`newyearscards[async]`), with the same retry policy, shared rate limiter and
+gzip handling as the blocking download. `build_labels_async` reads, formats
+and writes rows in batches on an executor, yielding to the event loop between
+batches. Both write to a `.part` file that only replaces the target on
+success, so cancellation and timeouts (e.g. `asyncio.timeout`) propagate to
+the caller and leave no partial output behind.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Iterator
+from concurrent.futures import Executor
+import csv
+from itertools import islice
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from . import sheets, token_cache
+from .addresses import LABEL_FIELDS, LabelBuilder, default_labels_path, iter_csv_rows
+from .config import ensure_dir, load_dotenv, load_paths
+from .http_retry import (
+    ACCEPT_COMPRESSED,
+    BodyDecoder,
+    FetchStats,
+    RetryPolicy,
+    TokenBucket,
+    backoff_delay,
+    default_limiter,
+)
+
+if TYPE_CHECKING:  # pragma: no cover
+    import httpx
+
+BATCH_SIZE = 500
+
+
+def _require_httpx() -> Any:
+    try:
+        import httpx
+    except ImportError as e:  # pragma: no cover - depends on the environment
+        raise RuntimeError(
+            "async download needs httpx; install with: pip install 'newyearscards[async]'"
+        ) from e
+    return httpx
+
+
+async def get_with_retry_async(
+    client: httpx.AsyncClient,
+    url: str,
+    *,
+    headers: dict[str, str] | None = None,
+    policy: RetryPolicy | None = None,
+    limiter: TokenBucket | None = None,
+    stats: FetchStats | None = None,
+) -> httpx.Response:
+    """Async `http_retry.get_with_retry`: returns a streamed response (caller closes it)."""
+    transport_error = _require_httpx().TransportError
+    policy = policy or RetryPolicy.from_env()
+    limiter = limiter or default_limiter()
+    stats = stats if stats is not None else FetchStats()
+
+    stats.requests += 1
+    attempt = 0
+    waited = 0.0
+    while True:
+        # The token bucket sleeps; keep that off the event loop
+        stats.throttle_wait += await asyncio.to_thread(limiter.acquire)
+        stats.attempts += 1
+        attempt += 1
+        error: Exception | None = None
+        resp: httpx.Response | None = None
+        try:
+            resp = await client.send(client.build_request("GET", url, headers=headers), stream=True)
+        except transport_error as e:
+            error = e
+            if attempt >= policy.max_attempts:
+                raise
+        else:
+            stats.statuses.append(resp.status_code)
+            if resp.status_code not in policy.retry_statuses or attempt >= policy.max_attempts:
+                return resp
+
+        delay = backoff_delay(policy, attempt, resp)
+        if waited + delay > policy.budget:
+            if error is not None:
+                raise error
+            assert resp is not None
+            return resp
+        if resp is not None:
+            await resp.aclose()
+        await asyncio.sleep(delay)
+        waited += delay
+        stats.backoff_wait += delay
+
+
+async def download_sheet_async(
+    year: int,
+    *,
+    sheet_url: str | None = None,
+    out_path: Path | None = None,
+    stats: FetchStats | None = None,
+    client: httpx.AsyncClient | None = None,
+    timeout: float = 30,
+) -> Path:
+    """Download the sheet's CSV export without blocking the event loop.
+
+    Same defaults as `sheets.download_sheet` (export backend only). Pass a
+    shared `client` to reuse connections; `timeout` applies to each request
+    phase of a client created here.
+    """
+    hx = _require_httpx()
+    stats = stats if stats is not None else FetchStats()
+    load_dotenv()
+    paths = load_paths()
+    spreadsheet_id, gid = sheets.resolve_sheet(sheet_url)
+
+    creds, cache_key, cache_file = await asyncio.to_thread(sheets.load_credentials, paths.key_path)
+    if not getattr(creds, "valid", False):
+        from google.auth.transport.requests import Request
+
+        await asyncio.to_thread(creds.refresh, Request())
+    headers = {"Authorization": f"Bearer {creds.token}", **ACCEPT_COMPRESSED}
+
+    if out_path is None:
+        out_path = paths.raw_dir(year) / "mailing_list.csv"
+    ensure_dir(out_path.parent)
+    part = out_path.with_name(out_path.name + ".part")
+
+    owned = client is None
+    if client is None:
+        client = hx.AsyncClient(timeout=timeout)
+    try:
+        url = sheets.export_url(spreadsheet_id, gid)
+        resp = await get_with_retry_async(client, url, headers=headers, stats=stats)
+        try:
+            resp.raise_for_status()
+            decoder = BodyDecoder(resp.headers.get("Content-Encoding", ""), stats)
+            with part.open("wb") as f:
+                # Raw bytes, so wire and decoded sizes are counted like the sync path
+                async for chunk in resp.aiter_raw():
+                    f.write(decoder.feed(chunk))
+                f.write(decoder.finish())
+        finally:
+            await resp.aclose()
+        part.replace(out_path)
+    finally:
+        part.unlink(missing_ok=True)
+        if owned:
+            await client.aclose()
+    token_cache.save_credentials_token(creds, cache_key, cache_file)
+    return out_path
+
+
+def _write_batch(labels: Iterator[dict[str, str]], writer: Any, size: int) -> int:
+    count = 0
+    for label in islice(labels, size):
+        writer.writerow(label)
+        count += 1
+    return count
+
+
+async def build_labels_async(
+    in_csv: Path,
+    out_csv: Path | None = None,
+    *,
+    builder: LabelBuilder | None = None,
+    batch_size: int = BATCH_SIZE,
+    executor: Executor | None = None,
+) -> Path:
+    """Async `build_labels`: batches of `batch_size` rows run on `executor`.
+
+    Reading, formatting and writing all happen in the executor (a thread pool;
+    the default one if None), and the event loop runs other tasks between
+    batches. On cancellation the batch in flight is allowed to finish before
+    the partial output is removed.
+    """
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be at least 1, got {batch_size}")
+    loop = asyncio.get_running_loop()
+    paths = load_paths()
+    if builder is None:
+        builder = await loop.run_in_executor(executor, LabelBuilder, paths.templates)
+    if out_csv is None:
+        out_csv = default_labels_path(in_csv, paths)
+    ensure_dir(out_csv.parent)
+    part = out_csv.with_name(out_csv.name + ".part")
+    try:
+        with (
+            in_csv.open("r", encoding="utf-8", newline="") as src,
+            part.open("w", encoding="utf-8", newline="") as out,
+        ):
+            writer = csv.DictWriter(out, fieldnames=LABEL_FIELDS)
+            writer.writeheader()
+            labels = builder.build(iter_csv_rows(src))
+            while True:
+                fut = loop.run_in_executor(executor, _write_batch, labels, writer, batch_size)
+                try:
+                    written = await asyncio.shield(fut)
+                except asyncio.CancelledError:
+                    # Don't close the files under a batch that is still running
+                    await asyncio.wait([fut])
+                    raise
+                if written < batch_size:
+                    break
+        part.replace(out_csv)
+    finally:
+        part.unlink(missing_ok=True)
+    return out_csv
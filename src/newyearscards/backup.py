@@ -0,0 +1,325 @@
+"""Encrypted backups of address data via the `age` CLI.
+
+Archives are streamed straight into `age` over a pipe: compressed tar output
+(gzip, parallel gzip or zstd; see `compression`) is written to age's stdin,
+so no plaintext archive ever touches the disk and the backup finishes in a
+single pass.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+import hashlib
+import os
+from pathlib import Path, PurePosixPath
+import subprocess
+import tarfile
+import time
+from typing import IO, cast
+
+from .compression import (
+    ArchiveStats,
+    CountingWriter,
+    compression_for_name,
+    open_compressor,
+    open_decompressor,
+)
+
+
+def load_recipients(
+    recipient: str | None, recipients_file: str | None
+) -> tuple[list[str], bool]:
+    """Collect age recipients from a single key and/or a one-per-line file.
+
+    Returns `(recipients, file_missing)`; a missing file is reported rather
+    than raised so callers can print a friendly note.
+    """
+    recipients: list[str] = []
+    if recipient:
+        recipients.append(recipient)
+    file_missing = False
+    if recipients_file:
+        rf = Path(recipients_file)
+        if rf.exists():
+            for line in rf.read_text(encoding="utf-8").splitlines():
+                s = line.strip()
+                if s:
+                    recipients.append(s)
+        else:
+            file_missing = True
+    return recipients, file_missing
+
+
+@contextmanager
+def age_encrypt_stream(recipients: list[str], out_file: Path | IO[bytes]) -> Iterator[IO[bytes]]:
+    """Yield a writable pipe whose contents `age` encrypts into `out_file`.
+
+    `out_file` is a path, or an open unbuffered binary file that age appends
+    to at its current position. On any error (while writing or from `age`
+    itself) a partial output path is removed and the exception propagates.
+    """
+    if not recipients:
+        raise ValueError("at least one age recipient is required")
+    cmd = ["age", *(arg for r in recipients for arg in ("-r", r))]
+    if isinstance(out_file, Path):
+        cmd += ["-o", str(out_file)]
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+    else:
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=out_file)
+    assert proc.stdin is not None
+    try:
+        try:
+            yield proc.stdin
+        finally:
+            proc.stdin.close()
+    except BaseException:
+        proc.kill()
+        proc.wait()
+        if isinstance(out_file, Path):
+            out_file.unlink(missing_ok=True)
+        raise
+    if proc.wait() != 0:
+        if isinstance(out_file, Path):
+            out_file.unlink(missing_ok=True)
+        raise subprocess.CalledProcessError(proc.returncode, cmd)
+
+
+class HashingReader:
+    """Pass-through reader that SHA-256 hashes what is read through it."""
+
+    def __init__(self, source: IO[bytes]) -> None:
+        self.source = source
+        self._hash = hashlib.sha256()
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.source.read(size)
+        self._hash.update(data)
+        return data
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+def write_encrypted_tar(
+    sources: list[Path],
+    out_age: Path,
+    recipients: list[str],
+    *,
+    compression: str = "gzip",
+    level: int | None = None,
+    threads: int | None = None,
+    only: str | None = None,
+) -> ArchiveStats:
+    """Stream a compressed tar of `sources` (stored under their base names) into age.
+
+    `compression` is one of `compression.COMPRESSIONS`; `only` limits each
+    source to one subdirectory (see `walk_sources`). Returns byte counts and
+    timing so callers can report the ratio and throughput, plus the SHA-256
+    of every file as it was streamed into the archive (for the catalog).
+    """
+    stats = ArchiveStats()
+    start = time.perf_counter()
+    with age_encrypt_stream(recipients, out_age) as sink:
+        compressed = CountingWriter(sink)
+        comp = open_compressor(
+            cast(IO[bytes], compressed), compression, level=level, threads=threads
+        )
+        try:
+            raw = CountingWriter(comp)
+            # "w|" writes a pure stream: no seeking, so it can target a pipe
+            with tarfile.open(fileobj=cast(IO[bytes], raw), mode="w|") as tar:
+                for name, path in walk_sources(sources, only=only):
+                    info = tar.gettarinfo(path, arcname=name)
+                    if not info.isreg():
+                        tar.addfile(info)
+                        continue
+                    # Hash the bytes tar actually reads, so the catalog matches the archive
+                    with path.open("rb") as f:
+                        reader = HashingReader(f)
+                        tar.addfile(info, cast(IO[bytes], reader))
+                    stats.files.append(
+                        {"path": name, "size": info.size, "sha256": reader.hexdigest()}
+                    )
+        finally:
+            comp.close()
+    stats.raw_bytes = raw.count
+    stats.compressed_bytes = compressed.count
+    stats.seconds = time.perf_counter() - start
+    return stats
+
+
+@contextmanager
+def open_tar_reader(source: IO[bytes], compression: str) -> Iterator[tarfile.TarFile]:
+    """Open a compressed tar stream for sequential reading."""
+    stream = open_decompressor(source, compression)
+    try:
+        with tarfile.open(fileobj=stream, mode="r|") as tar:
+            yield tar
+    finally:
+        stream.close()
+
+
+def walk_sources(sources: list[Path], *, only: str | None = None) -> Iterator[tuple[str, Path]]:
+    """Yield `(archive_name, path)` for each source and everything below it.
+
+    Sources are stored under their base names (as `tar.add(src, arcname=src.name)`
+    does); directories precede their contents and siblings are sorted. With
+    `only`, each source directory contributes just its top-level entry of that
+    name (e.g. `only="2025"` keeps `raw/2025/...` and skips other years).
+    """
+    for src in sources:
+        yield src.name, src
+        if not src.is_dir():
+            continue
+        top = src
+        if only is not None:
+            top = src / only
+            if not top.exists():
+                continue
+            yield f"{src.name}/{only}", top
+        for dirpath, dirnames, filenames in os.walk(top):
+            dirnames.sort()
+            base = Path(dirpath)
+            for name in [*dirnames, *sorted(filenames)]:
+                path = base / name
+                rel = PurePosixPath(src.name) / path.relative_to(src).as_posix()
+                yield rel.as_posix(), path
+
+
+def member_selected(name: str, wanted: list[str]) -> bool:
+    """True if member `name` is, or lies below, one of the `wanted` paths.
+
+    Leading components before the member's top-level name are ignored, so
+    `data/raw/2023/mailing_list.csv` selects member `raw/2023/mailing_list.csv`.
+    """
+    parts = PurePosixPath(name).parts
+    if not parts:
+        return False
+    for w in wanted:
+        wp = PurePosixPath(w).parts
+        if parts[0] in wp:
+            rel = wp[wp.index(parts[0]) :]
+            if parts[: len(rel)] == rel:
+                return True
+    return False
+
+
+def safe_target(base: Path, rel: str) -> Path:
+    """Resolve an archive member name under `base`, rejecting absolute or `..` paths."""
+    p = PurePosixPath(rel)
+    if p.is_absolute() or ".." in p.parts:
+        raise ValueError(f"Unsafe path in backup: {rel}")
+    return base.joinpath(*p.parts)
+
+
+@contextmanager
+def age_decrypt_stream(in_file: Path, identity: Path) -> Iterator[IO[bytes]]:
+    """Yield a pipe with the plaintext of `in_file`, decrypted by `age` as it is read."""
+    cmd = ["age", "-d", "-i", str(identity), str(in_file)]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE)
+    assert proc.stdout is not None
+    try:
+        yield proc.stdout
+        # Drain what the reader left (tar padding, trailers) so age exits cleanly
+        while proc.stdout.read(1 << 16):
+            pass
+    except BaseException:
+        proc.kill()
+        proc.wait()
+        raise
+    finally:
+        proc.stdout.close()
+    if proc.wait() != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd)
+
+
+@dataclass
+class RestoreResult:
+    files: list[str] = field(default_factory=list)
+    verified: int = 0
+    mismatched: list[str] = field(default_factory=list)
+
+
+def sha256_stream(f: IO[bytes]) -> str:
+    h = hashlib.sha256()
+    while block := f.read(1 << 20):
+        h.update(block)
+    return h.hexdigest()
+
+
+def _sha256_file(path: Path) -> str:
+    with path.open("rb") as f:
+        return sha256_stream(f)
+
+
+def restore_archive(
+    in_age: Path,
+    identity: Path,
+    out_dir: Path,
+    *,
+    paths: list[str] | None = None,
+    expected: dict[str, str] | None = None,
+    workers: int | None = None,
+) -> RestoreResult:
+    """Decrypt, decompress and extract a tar backup in one streaming pass.
+
+    Members are extracted as they arrive through tarfile's "data" filter
+    (no absolute paths, `..`, devices or links escaping `out_dir`), limited
+    to `paths` if given. With `expected` (member name -> SHA-256, e.g. from
+    the catalog) each extracted file is hashed on a thread pool while the
+    stream moves on, and mismatches are reported in the result.
+    """
+    result = RestoreResult()
+    hashes: dict[str, Future[str]] = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        with age_decrypt_stream(in_age, identity) as plain, open_tar_reader(
+            plain, compression_for_name(in_age.name)
+        ) as tar:
+            for member in tar:
+                if paths and not member_selected(member.name, paths):
+                    continue
+                tar.extract(member, path=out_dir, filter="data")
+                if member.isfile():
+                    result.files.append(member.name)
+                    if expected is not None:
+                        target = safe_target(out_dir, member.name)
+                        hashes[member.name] = pool.submit(_sha256_file, target)
+        for name, fut in hashes.items():
+            want = expected.get(name) if expected is not None else None
+            if want is None:
+                continue
+            if fut.result() == want:
+                result.verified += 1
+            else:
+                result.mismatched.append(name)
+    return result
+
+
+def hash_tar_members(in_age: Path, identity: Path) -> dict[str, str]:
+    """SHA-256 of every regular file in a tar backup, streamed without touching disk."""
+    hashes: dict[str, str] = {}
+    with age_decrypt_stream(in_age, identity) as plain, open_tar_reader(
+        plain, compression_for_name(in_age.name)
+    ) as tar:
+        for member in tar:
+            f = tar.extractfile(member) if member.isfile() else None
+            if f is not None:
+                hashes[member.name] = sha256_stream(f)
+    return hashes
+
+
+def age_encrypt_bytes(data: bytes, recipients: list[str]) -> bytes:
+    """Encrypt a small in-memory payload for `recipients`."""
+    if not recipients:
+        raise ValueError("at least one age recipient is required")
+    cmd = ["age", *(arg for r in recipients for arg in ("-r", r))]
+    return subprocess.run(cmd, input=data, stdout=subprocess.PIPE, check=True).stdout
+
+
+def age_decrypt_bytes(data: bytes, identity: Path) -> bytes:
+    """Decrypt an in-memory age payload with the private key file `identity`."""
+    cmd = ["age", "-d", "-i", str(identity)]
+    return subprocess.run(cmd, input=data, stdout=subprocess.PIPE, check=True).stdout
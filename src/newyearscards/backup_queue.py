@@ -0,0 +1,186 @@
+"""Hand-off of encrypted backups to a background worker.
+
+`download --backup queue` appends a job to `backups/queue.jsonl` and
+returns; `newyearscards backup-worker` drains the queue and runs the jobs,
+appending status to `backups/backup.log`. Drained jobs move to the worker's
+`backups/claimed-<pid>.jsonl` (locked while the worker lives) and leave it
+once their backup finished; a worker starting up puts the jobs of claim files
+nobody holds (a worker that was killed) back on the queue. `--backup detach` does both: it
+queues the job and starts a detached worker that exits once the queue is
+empty. Backups of the same year are serialized by an exclusive `flock` on
+`backups/locks/<year>.lock`, whichever process runs them.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import datetime
+import fcntl
+import json
+import os
+from pathlib import Path
+import subprocess
+import sys
+from typing import IO
+
+from .config import ensure_dir
+
+DISPATCH_MODES = ("sync", "queue", "detach", "off")
+QUEUE_NAME = "queue.jsonl"
+LOG_NAME = "backup.log"
+CLAIM_GLOB = "claimed-*.jsonl"
+
+
+def dispatch_mode(value: str | None = None) -> str:
+    """Resolve `--backup` / BACKUP_DISPATCH, defaulting to a synchronous backup."""
+    mode = (value or os.getenv("BACKUP_DISPATCH", "") or "sync").strip().lower()
+    if mode not in DISPATCH_MODES:
+        raise ValueError(
+            f"Unknown backup dispatch {mode!r}; expected one of {', '.join(DISPATCH_MODES)}"
+        )
+    return mode
+
+
+@contextmanager
+def _locked(path: Path, mode: str) -> Iterator[IO[str]]:
+    ensure_dir(path.parent)
+    with path.open(mode, encoding="utf-8") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield f
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+@contextmanager
+def year_lock(root: Path, year: int | None) -> Iterator[None]:
+    """Hold the per-year backup lock (blocks while another backup of that year runs)."""
+    name = str(year) if year is not None else "all"
+    with _locked(root / "locks" / f"{name}.lock", "a"):
+        yield
+
+
+def enqueue(root: Path, year: int | None) -> None:
+    job = {"year": year, "queued": datetime.now().isoformat(timespec="seconds")}
+    with _locked(root / QUEUE_NAME, "a") as f:
+        f.write(json.dumps(job) + "\n")
+
+
+def _is_current(f: IO[str], path: Path) -> bool:
+    """Whether the open file `f` is still the file at `path` (not unlinked or replaced)."""
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return False
+    own = os.fstat(f.fileno())
+    return (own.st_dev, own.st_ino) == (st.st_dev, st.st_ino)
+
+
+@contextmanager
+def worker_claim(root: Path) -> Iterator[Path]:
+    """Own a claim file for the lifetime of this worker; yields its path."""
+    path = root / f"claimed-{os.getpid()}.jsonl"
+    while True:
+        with _locked(path, "a") as f:
+            # `recover` may have taken the new, still unlocked file for a dead
+            # worker's and unlinked it; then our lock is on a stale inode
+            if not _is_current(f, path):
+                continue
+            try:
+                yield path
+            finally:
+                if _is_current(f, path) and os.fstat(f.fileno()).st_size == 0:
+                    path.unlink(missing_ok=True)
+            return
+
+
+def recover(root: Path) -> int:
+    """Requeue jobs claimed by workers that are gone; returns how many."""
+    count = 0
+    with _locked(root / QUEUE_NAME, "a+") as queue:
+        queue.seek(0)
+        pending = queue.read()
+        for path in sorted(root.glob(CLAIM_GLOB)):
+            with path.open("r", encoding="utf-8") as f:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue  # its worker is still running
+                lines = [line for line in f.read().splitlines() if line.strip()]
+                # Claimed jobs are older than anything still queued
+                pending = "".join(f"{line}\n" for line in lines) + pending
+                count += len(lines)
+                path.unlink()
+        if count:
+            queue.seek(0)
+            queue.truncate()
+            queue.write(pending)
+    return count
+
+
+def drain(root: Path, claim: Path) -> list[int | None]:
+    """Move every queued job to `claim`; returns their years (oldest first, once each)."""
+    path = root / QUEUE_NAME
+    if not path.exists():
+        return []
+    with _locked(path, "r+") as f:
+        lines = [line for line in f.read().splitlines() if line.strip()]
+        if lines:
+            # Claim before emptying the queue: a crash in between repeats a backup
+            # rather than losing one
+            with claim.open("a", encoding="utf-8") as out:
+                out.write("".join(f"{line}\n" for line in lines))
+                out.flush()
+                os.fsync(out.fileno())
+            f.seek(0)
+            f.truncate()
+    years: list[int | None] = []
+    for line in lines:
+        year = json.loads(line).get("year")
+        if year not in years:
+            years.append(year)
+    return years
+
+
+def finish(claim: Path, year: int | None) -> None:
+    """Drop the claimed jobs of `year` once its backup has run."""
+    with claim.open("r+", encoding="utf-8") as f:
+        keep = [
+            line
+            for line in f.read().splitlines()
+            if line.strip() and json.loads(line).get("year") != year
+        ]
+        f.seek(0)
+        f.truncate()
+        f.write("".join(f"{line}\n" for line in keep))
+
+
+def log(root: Path, message: str) -> None:
+    ensure_dir(root)
+    stamp = datetime.now().isoformat(timespec="seconds")
+    with (root / LOG_NAME).open("a", encoding="utf-8") as f:
+        f.write(f"{stamp} {message}\n")
+
+
+def spawn_worker(root: Path) -> int:
+    """Start a detached `backup-worker --once`; returns its pid.
+
+    The worker gets its own session, so it survives the parent (and a
+    scheduler killing the parent's process group). Its output goes to the log.
+    """
+    ensure_dir(root)
+    # Make the package importable in the child even when run from a source checkout
+    pkg_root = str(Path(__file__).resolve().parent.parent)
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (pkg_root, env.get("PYTHONPATH")) if p)
+    with (root / LOG_NAME).open("a", encoding="utf-8") as out:
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "newyearscards.cli", "backup-worker", "--once"],
+            stdin=subprocess.DEVNULL,
+            stdout=out,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,
+            env=env,
+        )
+    return proc.pid
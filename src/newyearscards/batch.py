@@ -0,0 +1,117 @@
+"""Multi-year label builds (`build-labels --all-years` / `--years`).
+
+Templates are loaded once into a shared `LabelBuilder`, and the years are
+built concurrently on a bounded thread pool (the builder is read-only, so
+threads can share it; so can the optional label cache, which locks its
+connection).
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+import time
+from typing import TYPE_CHECKING
+
+from .addresses import LABELS_FILENAME, LabelBuilder, iter_csv_rows, write_labels
+from .config import Paths, ensure_dir
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .label_cache import LabelCache
+
+RAW_FILENAME = "mailing_list.csv"
+
+
+@dataclass
+class YearBuild:
+    year: int
+    out_path: Path
+    rows: int = 0
+    seconds: float = 0.0
+    error: str | None = None
+
+    def summary(self) -> str:
+        if self.error:
+            return f"{self.year}: failed: {self.error}"
+        return (
+            f"{self.year}: {self.rows} rows in {self.seconds * 1000:.1f} ms -> {self.out_path}"
+        )
+
+
+def parse_years(spec: str) -> list[int]:
+    """Years from "2019-2025", "2019,2021" or a mix like "2019-2021,2024"."""
+    years: set[int] = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            if "-" in part:
+                lo, hi = (int(p) for p in part.split("-", 1))
+                if lo > hi:
+                    raise ValueError
+                years.update(range(lo, hi + 1))
+            else:
+                years.add(int(part))
+        except ValueError as err:
+            raise ValueError(f"Invalid --years value: {part!r} (use e.g. 2019-2025)") from err
+    if not years:
+        raise ValueError("--years is empty")
+    return sorted(years)
+
+
+def discover_years(paths: Paths) -> list[int]:
+    """Years under the raw data folder that have a mailing list."""
+    if not paths.raw_base.is_dir():
+        return []
+    return sorted(
+        int(d.name)
+        for d in paths.raw_base.iterdir()
+        if d.name.isdigit() and (d / RAW_FILENAME).is_file()
+    )
+
+
+def build_year(
+    year: int, paths: Paths, builder: LabelBuilder, cache: LabelCache | None = None
+) -> YearBuild:
+    """Build one year's labels; errors are reported in the result, not raised."""
+    in_csv = paths.raw_dir(year) / RAW_FILENAME
+    result = YearBuild(year=year, out_path=paths.processed_dir(year) / LABELS_FILENAME)
+    start = time.perf_counter()
+    try:
+        if not in_csv.exists():
+            raise FileNotFoundError(f"input CSV not found at {in_csv}")
+        with in_csv.open("r", encoding="utf-8", newline="") as f:
+            rows = iter_csv_rows(f)
+            if cache is None:
+                labels = list(builder.build(rows))
+            else:
+                from .label_cache import build_cached
+
+                labels = list(build_cached(builder, rows, cache))
+        ensure_dir(result.out_path.parent)
+        # A failed write must not leave a truncated labels file behind
+        part = result.out_path.with_name(result.out_path.name + ".part")
+        try:
+            result.rows = write_labels(labels, part)
+            part.replace(result.out_path)
+        finally:
+            part.unlink(missing_ok=True)
+    except (OSError, UnicodeDecodeError, ValueError) as e:
+        result.error = str(e)
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def build_years(
+    years: list[int],
+    paths: Paths,
+    builder: LabelBuilder,
+    *,
+    jobs: int | None = None,
+    cache: LabelCache | None = None,
+) -> list[YearBuild]:
+    """Build every year with at most `jobs` in flight; results in year order."""
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(lambda y: build_year(y, paths, builder, cache), years))
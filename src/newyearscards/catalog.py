@@ -0,0 +1,231 @@
+"""Catalog of encrypted backup archives, with retention-based pruning.
+
+Every archive written under `backups/` gets one line in
+`backups/catalog.jsonl`. The plaintext fields (archive path, card year,
+creation time, size, codec) are exactly what `ls backups/` already shows, so
+listing history and deciding what to prune never needs a private key. The
+sensitive part (file list with sizes and SHA-256 per file) is stored as an
+age-encrypted blob per entry and only decrypted when searching contents.
+"""
+
+from __future__ import annotations
+
+import base64
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass
+from datetime import datetime
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+from .backup import age_decrypt_bytes, age_encrypt_bytes
+from .backup_queue import _locked
+from .config import ensure_dir
+
+CATALOG_NAME = "catalog.jsonl"
+# Serializes appends with prune's read-and-rewrite (the worker records backups too)
+LOCK_NAME = "catalog.lock"
+
+
+@dataclass
+class CatalogEntry:
+    archive: str  # path relative to the backups root, POSIX style
+    year: int | None
+    created: str  # ISO timestamp, seconds precision
+    size: int
+    compression: str
+    details: str  # base64 of the age-encrypted file list
+    scope: str = "all"  # "all" (every year) or "year" (only this card year)
+
+    @property
+    def created_at(self) -> datetime:
+        return datetime.fromisoformat(self.created)
+
+
+def describe_files(files: list[dict[str, Any]], sources: Iterable[Path]) -> dict[str, Any]:
+    """File list as archived (see `ArchiveStats.files`) plus one digest per source."""
+    digests: dict[str, str] = {}
+    for src in sources:
+        combined = hashlib.sha256()
+        for f in files:
+            if f["path"].split("/", 1)[0] == src.name:
+                combined.update(f"{f['path']}\0{f['sha256']}\n".encode())
+        digests[src.name] = combined.hexdigest()
+    return {"sources": digests, "files": files}
+
+
+def catalog_path(root: Path) -> Path:
+    return root / CATALOG_NAME
+
+
+def read_catalog(root: Path) -> list[CatalogEntry]:
+    """All catalog entries, oldest first."""
+    path = catalog_path(root)
+    if not path.exists():
+        return []
+    entries = [
+        CatalogEntry(**json.loads(line))
+        for line in path.read_text(encoding="utf-8").splitlines()
+        if line.strip()
+    ]
+    entries.sort(key=lambda e: e.created)
+    return entries
+
+
+def _write_catalog(root: Path, entries: list[CatalogEntry]) -> None:
+    # Callers hold the catalog lock, so the fixed temp name cannot collide
+    path = catalog_path(root)
+    tmp = path.with_name(path.name + ".part")
+    with tmp.open("w", encoding="utf-8") as f:
+        for e in entries:
+            f.write(json.dumps(asdict(e)) + "\n")
+    os.replace(tmp, path)
+
+
+def record_backup(
+    root: Path,
+    archive: Path,
+    files: list[dict[str, Any]],
+    sources: list[Path],
+    recipients: list[str],
+    *,
+    year: int | None,
+    created: datetime,
+    compression: str,
+    only: str | None = None,
+) -> CatalogEntry:
+    """Append a catalog entry for `archive` (which must live under `root`).
+
+    `files` are the checksums taken while the archive was written (the
+    sources are not read again); `only` is the subdirectory a year-scoped
+    backup was limited to.
+    """
+    details = json.dumps(describe_files(files, sources)).encode("utf-8")
+    entry = CatalogEntry(
+        archive=archive.relative_to(root).as_posix(),
+        year=year,
+        created=created.isoformat(timespec="seconds"),
+        size=archive.stat().st_size,
+        compression=compression,
+        details=base64.b64encode(age_encrypt_bytes(details, recipients)).decode("ascii"),
+        scope="all" if only is None else "year",
+    )
+    ensure_dir(root)
+    with _locked(root / LOCK_NAME, "a"), catalog_path(root).open("a", encoding="utf-8") as f:
+        f.write(json.dumps(asdict(entry)) + "\n")
+    return entry
+
+
+def last_full_backup(root: Path) -> datetime | None:
+    """Creation time of the newest backup covering every year, if any."""
+    full = [e.created_at for e in read_catalog(root) if e.scope == "all"]
+    return max(full, default=None)
+
+
+def find_entry(archive: Path) -> tuple[Path, CatalogEntry] | None:
+    """Locate the catalog (in a parent directory) and entry describing `archive`."""
+    archive = archive.resolve()
+    for root in archive.parents:
+        if catalog_path(root).exists():
+            rel = archive.relative_to(root).as_posix()
+            for entry in read_catalog(root):
+                if entry.archive == rel:
+                    return root, entry
+            return None
+    return None
+
+
+def expected_checksums(entry: CatalogEntry, identity: Path) -> dict[str, str]:
+    """Member name -> SHA-256 recorded when the backup was made."""
+    return {f["path"]: f["sha256"] for f in read_details(entry, identity)["files"]}
+
+
+def read_details(entry: CatalogEntry, identity: Path) -> dict[str, Any]:
+    """Decrypt the file list of one entry."""
+    data: dict[str, Any] = json.loads(
+        age_decrypt_bytes(base64.b64decode(entry.details), identity)
+    )
+    return data
+
+
+def select_kept(
+    entries: list[CatalogEntry],
+    *,
+    keep_last: int = 0,
+    keep_daily: int = 0,
+    keep_yearly: int = 0,
+) -> set[str]:
+    """Archives to keep under the union of the policies.
+
+    `keep_last` keeps the N newest backups; `keep_daily`/`keep_yearly` keep
+    the newest backup of each of the N most recent days/years that have one.
+    """
+    newest_first = sorted(entries, key=lambda e: e.created, reverse=True)
+    kept = {e.archive for e in newest_first[:keep_last]}
+    for n, bucket in ((keep_daily, "%Y-%m-%d"), (keep_yearly, "%Y")):
+        seen: set[str] = set()
+        for e in newest_first:
+            if len(seen) >= n:
+                break
+            key = e.created_at.strftime(bucket)
+            if key not in seen:
+                seen.add(key)
+                kept.add(e.archive)
+    return kept
+
+
+def prune(
+    root: Path,
+    *,
+    keep_last: int = 0,
+    keep_daily: int = 0,
+    keep_yearly: int = 0,
+    year: int | None = None,
+    dry_run: bool = False,
+) -> list[CatalogEntry]:
+    """Delete catalogued archives not kept by the policies; returns the removed entries.
+
+    Policies apply to each card year separately (or only to `year`).
+    Archives missing from the catalog are never touched.
+    """
+    if not (keep_last or keep_daily or keep_yearly):
+        raise ValueError("refusing to prune without a retention policy (--keep-*)")
+    if not catalog_path(root).exists():
+        return []
+    # Held until the catalog is rewritten, so a backup recorded meanwhile is not lost
+    with _locked(root / LOCK_NAME, "a"):
+        return _prune(root, keep_last, keep_daily, keep_yearly, year, dry_run)
+
+
+def _prune(
+    root: Path,
+    keep_last: int,
+    keep_daily: int,
+    keep_yearly: int,
+    year: int | None,
+    dry_run: bool,
+) -> list[CatalogEntry]:
+    entries = read_catalog(root)
+    groups: dict[int | None, list[CatalogEntry]] = {}
+    for e in entries:
+        groups.setdefault(e.year, []).append(e)
+
+    removed: list[CatalogEntry] = []
+    for group_year, group in groups.items():
+        if year is not None and group_year != year:
+            continue
+        kept = select_kept(
+            group, keep_last=keep_last, keep_daily=keep_daily, keep_yearly=keep_yearly
+        )
+        removed += [e for e in group if e.archive not in kept]
+    if dry_run or not removed:
+        return removed
+
+    gone = {e.archive for e in removed}
+    # Catalog first: a crash mid-way leaves orphan files, never dangling entries
+    _write_catalog(root, [e for e in entries if e.archive not in gone])
+    for e in removed:
+        (root / e.archive).unlink(missing_ok=True)
+    return removed
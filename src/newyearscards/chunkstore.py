@@ -0,0 +1,279 @@
+"""Content-addressed, deduplicated incremental backups.
+
+Files are split into content-defined chunks (gear rolling hash, FastCDC
+style) so an edit only changes the chunks around it. Each chunk is stored
+once: new chunks of a run are zlib-compressed, packed together and the pack
+is encrypted with age. Every run adds one small encrypted snapshot manifest
+listing the tree (paths, modes, mtimes, SHA-256) and the chunk ids per file.
+
+Store layout (everything sensitive is encrypted)::
+
+    <store>/packs/<pack>.pack.age        encrypted compressed chunks
+    <store>/index.jsonl                  chunk id -> pack, offset, length
+    <store>/snapshots/<stamp>.json.age   encrypted snapshot manifests
+
+Chunk ids are HMAC-SHA256 digests under a local secret key (default
+`keys/backup-chunk.key`), so the plaintext index reveals nothing about the
+content. Only deduplication needs that key; restore needs just the age
+identity. Losing the key merely stops new runs from reusing old chunks.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+import hashlib
+import hmac
+import json
+import os
+from pathlib import Path
+import secrets
+from typing import Any
+import zlib
+
+from .backup import age_decrypt_bytes, age_encrypt_bytes, safe_target, walk_sources
+from .config import ensure_dir
+
+MIN_CHUNK = 16 * 1024
+MAX_CHUNK = 256 * 1024
+# 16 high bits must be zero at a cut point -> ~64 KiB average after MIN_CHUNK
+_CUT_MASK = 0xFFFF << 48
+_U64 = (1 << 64) - 1
+# Deterministic gear table so chunk boundaries are stable across runs
+_GEAR = [
+    int.from_bytes(hashlib.sha256(b"newyearscards-gear" + bytes([i])).digest()[:8], "big")
+    for i in range(256)
+]
+PACK_TARGET_SIZE = 16 * 1024 * 1024
+# Decrypted packs kept in memory during a restore (most recently used)
+PACK_CACHE_SIZE = 4
+SNAPSHOT_SUFFIX = ".json.age"
+DEFAULT_KEY_PATH = "keys/backup-chunk.key"
+
+
+def chunk_spans(data: bytes) -> Iterator[tuple[int, int]]:
+    """Yield `(start, end)` spans of content-defined chunks covering `data`."""
+    n = len(data)
+    start = 0
+    gear = _GEAR
+    while start < n:
+        end = min(n, start + MAX_CHUNK)
+        i = start + MIN_CHUNK
+        if i >= end:
+            yield start, end
+            start = end
+            continue
+        h = 0
+        while i < end:
+            h = ((h << 1) + gear[data[i]]) & _U64
+            i += 1
+            if not h & _CUT_MASK:
+                break
+        yield start, i
+        start = i
+
+
+def load_chunk_key(path: Path | None = None) -> bytes:
+    """Read (or create with 0600 permissions) the local chunk-id key."""
+    path = path or Path(os.getenv("BACKUP_CHUNK_KEY", DEFAULT_KEY_PATH))
+    if path.exists():
+        return bytes.fromhex(path.read_text(encoding="utf-8").strip())
+    ensure_dir(path.parent)
+    key = secrets.token_bytes(32)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(key.hex() + "\n")
+    return key
+
+
+@dataclass
+class IndexEntry:
+    pack: str
+    offset: int
+    length: int
+
+
+def read_index(store: Path) -> dict[str, IndexEntry]:
+    index: dict[str, IndexEntry] = {}
+    path = store / "index.jsonl"
+    if not path.exists():
+        return index
+    for line in path.read_text(encoding="utf-8").splitlines():
+        if line.strip():
+            rec = json.loads(line)
+            index[rec["id"]] = IndexEntry(rec["pack"], rec["offset"], rec["length"])
+    return index
+
+
+@dataclass
+class SnapshotResult:
+    path: Path
+    files: int
+    chunks: int
+    new_chunks: int
+    bytes_total: int
+    bytes_new: int
+
+    def summary(self) -> str:
+        return (
+            f"{self.files} file(s), {self.chunks} chunk(s), {self.new_chunks} new; "
+            f"{self.bytes_new} of {self.bytes_total} bytes stored"
+        )
+
+
+class _PackWriter:
+    """Accumulates compressed chunks and flushes them as encrypted packs."""
+
+    def __init__(self, store: Path, recipients: list[str], stamp: str) -> None:
+        self.store = store
+        self.recipients = recipients
+        self.stamp = stamp
+        self.buf = bytearray()
+        self.pending: list[dict[str, Any]] = []
+        self.count = 0
+
+    def add(self, chunk_id: str, data: bytes) -> None:
+        comp = zlib.compress(data, 6)
+        self.pending.append(
+            {"id": chunk_id, "pack": self._name(), "offset": len(self.buf), "length": len(comp)}
+        )
+        self.buf += comp
+        if len(self.buf) >= PACK_TARGET_SIZE:
+            self.flush()
+
+    def _name(self) -> str:
+        return f"{self.stamp}-{self.count:03d}"
+
+    def flush(self) -> None:
+        if not self.pending:
+            return
+        packs = self.store / "packs"
+        ensure_dir(packs)
+        enc = age_encrypt_bytes(bytes(self.buf), self.recipients)
+        (packs / f"{self._name()}.pack.age").write_bytes(enc)
+        # Index entries only after the pack is safely on disk
+        with (self.store / "index.jsonl").open("a", encoding="utf-8") as f:
+            for rec in self.pending:
+                f.write(json.dumps(rec) + "\n")
+        self.buf = bytearray()
+        self.pending = []
+        self.count += 1
+
+
+def create_snapshot(
+    sources: list[Path],
+    store: Path,
+    recipients: list[str],
+    *,
+    key: bytes | None = None,
+    tag: str = "",
+    only: str | None = None,
+) -> SnapshotResult:
+    """Back up `sources` (stored under their base names) into the chunk store.
+
+    `only` limits each source to one subdirectory (see `backup.walk_sources`).
+    """
+    key = key if key is not None else load_chunk_key()
+    ensure_dir(store)
+    index = read_index(store)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    packer = _PackWriter(store, recipients, stamp)
+
+    entries: list[dict[str, Any]] = []
+    n_chunks = n_new = bytes_total = bytes_new = files = 0
+    for rel, path in walk_sources(sources, only=only):
+        st = path.stat()
+        entry: dict[str, Any] = {"path": rel, "mode": st.st_mode & 0o7777, "mtime": st.st_mtime}
+        if path.is_dir():
+            entry["type"] = "dir"
+            entries.append(entry)
+            continue
+        data = path.read_bytes()
+        ids: list[str] = []
+        for a, b in chunk_spans(data):
+            piece = data[a:b]
+            cid = hmac.new(key, piece, hashlib.sha256).hexdigest()
+            ids.append(cid)
+            n_chunks += 1
+            if cid not in index:
+                packer.add(cid, piece)
+                index[cid] = IndexEntry("", 0, 0)  # placeholder: dedup within this run
+                n_new += 1
+                bytes_new += len(piece)
+        files += 1
+        bytes_total += len(data)
+        entry.update(
+            type="file", size=len(data), sha256=hashlib.sha256(data).hexdigest(), chunks=ids
+        )
+        entries.append(entry)
+    packer.flush()
+
+    manifest = {"version": 1, "created": stamp, "tag": tag, "entries": entries}
+    snapshots = store / "snapshots"
+    ensure_dir(snapshots)
+    name = f"{stamp}-{tag}{SNAPSHOT_SUFFIX}" if tag else f"{stamp}{SNAPSHOT_SUFFIX}"
+    out = snapshots / name
+    out.write_bytes(age_encrypt_bytes(json.dumps(manifest).encode("utf-8"), recipients))
+    return SnapshotResult(out, files, n_chunks, n_new, bytes_total, bytes_new)
+
+
+def is_snapshot(path: Path) -> bool:
+    """Whether `path` names a snapshot manifest (they are encrypted, so by name)."""
+    return path.name.endswith(SNAPSHOT_SUFFIX)
+
+
+def read_snapshot(snapshot: Path, identity: Path) -> dict[str, Any]:
+    data: dict[str, Any] = json.loads(age_decrypt_bytes(snapshot.read_bytes(), identity))
+    return data
+
+
+def restore_snapshot(snapshot: Path, identity: Path, out_dir: Path) -> int:
+    """Rebuild the snapshot's tree under `out_dir`; returns the number of files.
+
+    Decrypted packs are kept in a small LRU cache (`PACK_CACHE_SIZE`), so
+    memory stays bounded however many packs the snapshot spans; chunks are
+    mostly read in the order they were packed, so a pack is rarely decrypted
+    twice. Every file is checked against its recorded SHA-256 before mode and
+    mtime are applied.
+    """
+    store = snapshot.parent.parent
+    manifest = read_snapshot(snapshot, identity)
+    index = read_index(store)
+
+    @lru_cache(maxsize=PACK_CACHE_SIZE)
+    def pack(name: str) -> bytes:
+        return age_decrypt_bytes((store / "packs" / f"{name}.pack.age").read_bytes(), identity)
+
+    def chunk(cid: str) -> bytes:
+        loc = index.get(cid)
+        if loc is None:
+            raise ValueError(f"Chunk {cid[:12]} missing from store index")
+        return zlib.decompress(pack(loc.pack)[loc.offset : loc.offset + loc.length])
+
+    files = 0
+    dirs: list[tuple[Path, dict[str, Any]]] = []
+    for entry in manifest["entries"]:
+        target = safe_target(out_dir, entry["path"])
+        if entry["type"] == "dir":
+            ensure_dir(target)
+            dirs.append((target, entry))
+            continue
+        ensure_dir(target.parent)
+        h = hashlib.sha256()
+        with target.open("wb") as f:
+            for cid in entry["chunks"]:
+                data = chunk(cid)
+                h.update(data)
+                f.write(data)
+        if h.hexdigest() != entry["sha256"]:
+            raise ValueError(f"Checksum mismatch restoring {entry['path']}")
+        os.chmod(target, entry["mode"])
+        os.utime(target, (entry["mtime"], entry["mtime"]))
+        files += 1
+    # Directory metadata last, since writing files bumps their mtimes
+    for target, entry in reversed(dirs):
+        os.chmod(target, entry["mode"])
+        os.utime(target, (entry["mtime"], entry["mtime"]))
+    return files
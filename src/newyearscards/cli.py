@@ -1,35 +1,38 @@
 from __future__ import annotations
 
 import argparse
-from contextlib import suppress
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
 from pathlib import Path
-import shutil
-import subprocess
 import sys
-import tarfile
-import tempfile
+from typing import TYPE_CHECKING
 
 from . import __version__
-from .addresses import build_labels
-from .config import ensure_dir, load_paths
 
-# Best-effort .env loading (keep optional like in sheets.py)
-try:  # pragma: no cover - trivial import
-    from pathlib import Path as _P
+if TYPE_CHECKING:  # pragma: no cover
+    from collections.abc import Iterable
 
-    from dotenv import load_dotenv as _real_load_dotenv
+    from .config import Paths
 
-    def _load_env() -> bool:
-        # Only load a .env from the current working directory, not parents.
-        env_path = _P.cwd() / ".env"
-        if env_path.exists():
-            return _real_load_dotenv(dotenv_path=str(env_path))
+# Rows shown by `build-labels --dry-run` unless --limit says otherwise
+DRY_RUN_ROWS = 5
+
+# Keep module-level imports to the bare minimum: the CLI is invoked thousands of
+# times from scripts, so each command imports what it needs (tarfile, PyYAML,
+# dotenv, ...) itself. `make bench-startup` tracks this with -X importtime.
+
+
+def _load_env() -> bool:
+    """Best-effort .env loading (optional, like in sheets.py)."""
+    # Only load a .env from the current working directory, not parents.
+    env_path = Path.cwd() / ".env"
+    if not env_path.exists():
         return False
-except Exception:  # pragma: no cover
-    def _load_env() -> bool:
+    try:
+        from dotenv import load_dotenv
+    except Exception:  # pragma: no cover
         return False
+    return load_dotenv(dotenv_path=str(env_path))
 
 
 def cmd_download(args: argparse.Namespace) -> int:
@@ -37,7 +40,10 @@ def cmd_download(args: argparse.Namespace) -> int:
 
     Imports the google client lazily so other commands don't need those deps.
     """
+    from .config import ensure_dir
+
     try:
+        from .http_retry import FetchStats
         from .sheets import download_sheet
     except Exception as e:
         print(
@@ -55,13 +61,61 @@ def cmd_download(args: argparse.Namespace) -> int:
         else:
             ensure_dir(out)
             out_path = out / "mailing_list.csv"
+    stats = FetchStats()
     try:
-        path = download_sheet(args.year, sheet_url=args.url, out_path=out_path)
+        path = download_sheet(
+            args.year, sheet_url=args.url, out_path=out_path, stats=stats, backend=args.backend
+        )
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
+        if stats.attempts:
+            print(f"Fetch: {stats.summary()}", file=sys.stderr)
         return 2
     print(f"Saved CSV to {path}")
-    _attempt_encrypted_backup(args.year)
+    print(f"Fetch: {stats.summary()}")
+    _dispatch_backup(args.year, args.backup)
+    return 0
+
+
+def cmd_download_build(args: argparse.Namespace) -> int:
+    """Download the sheet and build labels in one streaming pass."""
+    try:
+        from .http_retry import FetchStats
+        from .pipeline import download_and_build
+    except Exception as e:
+        print(
+            "Error: google auth dependencies are missing for download command",
+            file=sys.stderr,
+        )
+        print(str(e), file=sys.stderr)
+        return 2
+
+    raw_out: Path | None = None
+    if args.raw_out:
+        raw = Path(args.raw_out)
+        raw_out = raw if raw.suffix.lower() == ".csv" else raw / "mailing_list.csv"
+    labels_out: Path | None = None
+    if args.out:
+        out = Path(args.out)
+        labels_out = out if out.suffix.lower() == ".csv" else out / "labels_for_mailmerge.csv"
+
+    stats = FetchStats()
+    try:
+        result = download_and_build(
+            args.year,
+            sheet_url=args.url,
+            raw_out=raw_out,
+            labels_out=labels_out,
+            stats=stats,
+            backend=args.backend,
+        )
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    print(f"Saved CSV to {result.raw_path}")
+    print(f"Wrote labels CSV: {result.labels_path} ({result.rows} rows)")
+    print(f"Fetch: {stats.summary()}")
+    _dispatch_backup(args.year, args.backup)
     return 0
 
 
@@ -69,31 +123,27 @@ def _attempt_encrypted_backup(year: int | None = None) -> None:
     """Create an encrypted backup with age, if configured.
 
     Looks for AGE_RECIPIENT or AGE_RECIPIENTS_FILE and the `age` executable.
-    Archives data/raw and data/processed (if present) into backups/*.tgz.age.
+    Streams data/raw and data/processed (if present) into backups/*.tgz.age
+    (BACKUP_COMPRESSION=pgzip|zstd picks a faster codec), into a seekable
+    backups/*.sar with BACKUP_MODE=seekable, or, with BACKUP_MODE=dedup, into
+    the deduplicating store under backups/store/. With BACKUP_SCOPE=year only
+    the given year's folders are archived, plus a full backup under
+    backups/full/ every BACKUP_FULL_EVERY_DAYS.
     Never raises; prints a short status message on success or skip.
     """
+    import shutil
+
+    from .backup import load_recipients
+    from .backup_queue import year_lock
+
     # Load .env so local AGE_* vars are available
     _load_env()
 
     # Ensure recipients configured first (and file exists / has content if provided)
-    recipient = os.getenv("AGE_RECIPIENT")
     recipients_file = os.getenv("AGE_RECIPIENTS_FILE")
+    recipients, missing_file_notice = load_recipients(os.getenv("AGE_RECIPIENT"), recipients_file)
 
-    rec_args: list[str] = []
-    if recipient:
-        rec_args += ["-r", recipient]
-    missing_file_notice = False
-    if recipients_file:
-        rf = Path(recipients_file)
-        if rf.exists():
-            for line in rf.read_text(encoding="utf-8").splitlines():
-                s = line.strip()
-                if s:
-                    rec_args += ["-r", s]
-        else:
-            missing_file_notice = True
-
-    if not rec_args:
+    if not recipients:
         msg = (
             "Note: skipping encrypted backup; no recipients configured. "
             "Set AGE_RECIPIENT or AGE_RECIPIENTS_FILE."
@@ -114,32 +164,203 @@ def _attempt_encrypted_backup(year: int | None = None) -> None:
     if not sources:
         return
 
-    backups_dir = Path("backups") / (str(year) if year is not None else "")
+    mode = os.getenv("BACKUP_MODE", "archive").strip().lower()
+    try:
+        # Decided before locking: a periodic full backup takes the all-years lock
+        year, only, full = _backup_scope(year, mode)
+    except Exception as e:  # pragma: no cover - best-effort
+        print(f"Note: encrypted backup failed: {e}", file=sys.stderr)
+        return
+
+    # At most one backup per year (or one full backup) at a time, also across
+    # background workers
+    with year_lock(Path("backups"), year):
+        _write_backup(year, sources, recipients, mode=mode, only=only, full=full)
+
+
+def _full_backup_due() -> bool:
+    """True when no full backup is younger than BACKUP_FULL_EVERY_DAYS (0 disables)."""
+    value = os.getenv("BACKUP_FULL_EVERY_DAYS", "").strip()
+    try:
+        every = float(value or 30)
+    except ValueError:
+        print(
+            f"Note: invalid BACKUP_FULL_EVERY_DAYS={value!r}; using 30 days.", file=sys.stderr
+        )
+        every = 30
+    if every <= 0:
+        return False
+    from .catalog import last_full_backup
+
+    last = last_full_backup(Path("backups"))
+    return last is None or datetime.now() - last >= timedelta(days=every)
+
+
+def _backup_scope(year: int | None, mode: str) -> tuple[int | None, str | None, bool]:
+    """Decide what a backup triggered for `year` covers.
+
+    Returns (year, only, full): the year to lock and record (None for every
+    year), the data subfolder to limit the backup to, and whether this is
+    the periodic full backup.
+    """
+    # BACKUP_SCOPE=year archives only data/*/<year>; BACKUP_SCOPE=all (default) everything
+    scoped = year is not None and os.getenv("BACKUP_SCOPE", "all").strip().lower() == "year"
+    if not scoped:
+        return year, None, False
+    # The dedup store has no separate full backups (see _write_backup)
+    if mode != "dedup" and _full_backup_due():
+        print("Note: full backup due; archiving all years.", file=sys.stderr)
+        return None, None, True
+    return year, str(year), False
+
+
+def _write_backup(
+    year: int | None,
+    sources: list[Path],
+    recipients: list[str],
+    *,
+    mode: str,
+    only: str | None,
+    full: bool,
+) -> None:
+    from .backup import write_encrypted_tar
+    from .compression import archive_suffix, compression_from_env
+    from .config import ensure_dir
+
+    if mode == "dedup":
+        # Content-addressed store shared by all years, one snapshot per run; unchanged
+        # years cost nothing there, so there is no separate periodic full backup
+        try:
+            from .chunkstore import create_snapshot
+
+            result = create_snapshot(
+                sources,
+                Path("backups") / "store",
+                recipients,
+                tag=str(year or ""),
+                only=only,
+            )
+            print(f"Encrypted snapshot: {result.path} ({result.summary()})")
+        except Exception as e:  # pragma: no cover - best-effort
+            print(f"Note: encrypted backup failed: {e}", file=sys.stderr)
+        return
+
+    # Periodic full backups of every year are kept apart from the per-year ones
+    subdir = "full" if full else (str(year) if year is not None else "")
+    backups_dir = Path("backups") / subdir
     ensure_dir(backups_dir)
 
     # Include microseconds to avoid collisions on rapid consecutive invocations
-    stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
-    tmp_tar = backups_dir / f"addresses-{stamp}.tgz"
-    out_age = backups_dir / f"addresses-{stamp}.tgz.age"
-
+    now = datetime.now()
+    stamp = now.strftime("%Y%m%d-%H%M%S-%f")
     try:
-        with tarfile.open(tmp_tar, "w:gz") as tar:
-            for src in sources:
-                tar.add(src, arcname=src.name)
+        compression, level, threads = compression_from_env()
+        if mode == "seekable":
+            # Members encrypted one by one, so a single file can be restored cheaply
+            from .seekable import SEEKABLE_SUFFIX, write_seekable_archive
 
-        cmd = ["age", *rec_args, "-o", str(out_age), str(tmp_tar)]
-        subprocess.run(cmd, check=True)
-        print(f"Encrypted backup: {out_age}")
+            out_age = backups_dir / f"addresses-{stamp}{SEEKABLE_SUFFIX}"
+            arch = write_seekable_archive(
+                sources, out_age, recipients, compression=compression, level=level, only=only
+            )
+        else:
+            out_age = backups_dir / f"addresses-{stamp}{archive_suffix(compression, level)}.age"
+            # Compressed tar is piped straight into age; no plaintext archive is written
+            arch = write_encrypted_tar(
+                sources,
+                out_age,
+                recipients,
+                compression=compression,
+                level=level,
+                threads=threads,
+                only=only,
+            )
+        print(f"Encrypted backup: {out_age} ({arch.summary()})")
     except Exception as e:  # pragma: no cover - best-effort
         print(f"Note: encrypted backup failed: {e}", file=sys.stderr)
-    finally:
-        with suppress(Exception):
-            tmp_tar.unlink(missing_ok=True)
+        return
+
+    try:
+        from .catalog import record_backup
+
+        record_backup(
+            Path("backups"),
+            out_age,
+            arch.files,
+            sources,
+            recipients,
+            year=year,
+            created=now,
+            compression=compression,
+            only=only,
+        )
+    except Exception as e:  # pragma: no cover - best-effort
+        print(f"Note: could not update backup catalog: {e}", file=sys.stderr)
+
+
+def _dispatch_backup(year: int, mode: str | None) -> None:
+    """Run the post-download backup now, queue it, or hand it to a detached worker."""
+    from .backup_queue import LOG_NAME, dispatch_mode, enqueue, spawn_worker
+
+    try:
+        mode = dispatch_mode(mode)
+    except ValueError as e:
+        print(f"Note: skipping encrypted backup; {e}", file=sys.stderr)
+        return
+    if mode == "off":
+        return
+    if mode == "sync":
+        _attempt_encrypted_backup(year)
+        return
+    root = Path("backups")
+    enqueue(root, year)
+    if mode == "queue":
+        print(f"Queued backup for {year}; run `newyearscards backup-worker` to process it.")
+        return
+    pid = spawn_worker(root)
+    print(f"Backup for {year} running in background (pid {pid}); status in {root / LOG_NAME}")
+
+
+def cmd_backup_worker(args: argparse.Namespace) -> int:
+    """Process queued backups, logging to backups/backup.log."""
+    from contextlib import redirect_stderr, redirect_stdout
+    import time
+
+    from .backup_queue import LOG_NAME, drain, finish, log, recover, worker_claim
+
+    root = Path("backups")
+    with worker_claim(root) as claim:
+        if requeued := recover(root):
+            log(root, f"requeued {requeued} job(s) left by an interrupted worker")
+        while True:
+            years = drain(root, claim)
+            for year in years:
+                log(root, f"backup year={year} started")
+                with (
+                    (root / LOG_NAME).open("a", encoding="utf-8") as out,
+                    redirect_stdout(out),
+                    redirect_stderr(out),
+                ):
+                    _attempt_encrypted_backup(year)
+                finish(claim, year)
+                log(root, f"backup year={year} finished")
+            if args.once and not years:
+                return 0
+            if not years:
+                time.sleep(args.poll)
 
 
 def cmd_build_labels(args: argparse.Namespace) -> int:
+    from .addresses import LabelBuilder, build_labels
+    from .config import ensure_dir, label_cache_path, load_paths
+
     paths = load_paths()
 
+    if args.all_years or args.years:
+        return _build_years(args, paths)
+    if args.from_store:
+        return _labels_from_store(args, paths)
+
     if args.input:
         in_csv = Path(args.input)
     else:
@@ -155,31 +376,14 @@ def cmd_build_labels(args: argparse.Namespace) -> int:
         print(f"Error: input CSV not found at {in_csv}", file=sys.stderr)
         return 2
 
+    if args.watch:
+        return _watch_labels(args, in_csv, paths)
+
     if args.dry_run:
-        # Build to a temp path but don't persist
-        try:
-            temp_dir = Path(tempfile.gettempdir())
-            out_path = build_labels(in_csv, out_csv=temp_dir / "labels_for_mailmerge.csv")
-        except Exception as e:
-            print(f"Error: {e}", file=sys.stderr)
-            return 2
-        # Show first few lines
-        try:
-            preview = out_path.read_text(encoding="utf-8").splitlines()[:6]
-            print("\n".join(preview))
-        except (OSError, UnicodeDecodeError) as e:
-            print(f"Warning: unable to show dry-run preview: {e}", file=sys.stderr)
-        finally:
-            try:
-                out_path.unlink()
-            except FileNotFoundError:
-                pass
-            except OSError as e:
-                print(
-                    f"Warning: could not delete temporary preview file {out_path}: {e}",
-                    file=sys.stderr,
-                )
-        return 0
+        return _preview_labels(args, in_csv, paths)
+    if args.limit is not None or args.sample is not None or args.country:
+        print("Error: --limit/--sample/--country need --dry-run", file=sys.stderr)
+        return 2
 
     if args.out:
         out_arg = Path(args.out)
@@ -192,7 +396,16 @@ def cmd_build_labels(args: argparse.Namespace) -> int:
         out_csv = None
 
     try:
-        of = build_labels(in_csv, out_csv=out_csv)
+        cache_file = label_cache_path(args.cache)
+        if cache_file is None:
+            of = build_labels(in_csv, out_csv=out_csv)
+        else:
+            from .label_cache import open_cache
+
+            builder = LabelBuilder(paths.templates)
+            with open_cache(cache_file, builder) as cache:
+                of = build_labels(in_csv, out_csv=out_csv, builder=builder, cache=cache)
+            print(cache.summary(), file=sys.stderr)
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
         return 2
@@ -200,6 +413,485 @@ def cmd_build_labels(args: argparse.Namespace) -> int:
     return 0
 
 
+def _build_years(args: argparse.Namespace, paths: Paths) -> int:
+    """Build several years with one template load and a bounded worker pool."""
+    import time
+
+    from .addresses import LabelBuilder
+    from .batch import build_years, discover_years, parse_years
+    from .config import label_cache_path
+
+    if (
+        args.year is not None
+        or args.input
+        or args.out
+        or args.dry_run
+        or args.watch
+        or args.from_store
+    ):
+        print(
+            "Error: --all-years/--years cannot be combined with "
+            "--year, --input, --out, --dry-run, --watch or --from-store",
+            file=sys.stderr,
+        )
+        return 2
+    if args.jobs < 1:
+        print("Error: --jobs must be at least 1", file=sys.stderr)
+        return 2
+    try:
+        years = parse_years(args.years) if args.years else discover_years(paths)
+        builder = LabelBuilder(paths.templates)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    if not years:
+        print(f"Error: no years with {paths.raw_base}/<year>/mailing_list.csv", file=sys.stderr)
+        return 2
+
+    start = time.perf_counter()
+    cache_file = label_cache_path(args.cache)
+    cache = None
+    if cache_file is not None:
+        import sqlite3
+
+        from .label_cache import open_cache
+
+        try:
+            cache = open_cache(cache_file, builder)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Error: label cache {cache_file}: {e}", file=sys.stderr)
+            return 2
+    try:
+        results = build_years(years, paths, builder, jobs=args.jobs, cache=cache)
+    finally:
+        if cache is not None:
+            cache.close()
+    for result in results:
+        print(result.summary(), file=sys.stderr if result.error else sys.stdout)
+    if cache is not None:
+        print(cache.summary(), file=sys.stderr)
+    failed = sum(r.error is not None for r in results)
+    print(
+        f"Built {len(results) - failed} of {len(results)} year(s) "
+        f"in {(time.perf_counter() - start) * 1000:.1f} ms"
+    )
+    return 2 if failed else 0
+
+
+def _preview_labels(args: argparse.Namespace, in_csv: Path, paths: Paths) -> int:
+    """Stream the first (or a sample of) formatted rows to stdout; nothing is written."""
+    from .addresses import iter_csv_rows
+
+    try:
+        with in_csv.open("r", encoding="utf-8", newline="") as f:
+            return _preview_rows(args, iter_csv_rows(f), paths)
+    except (OSError, UnicodeDecodeError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+
+def _preview_rows(
+    args: argparse.Namespace, rows: Iterable[dict[str, str]], paths: Paths, *, country: bool = True
+) -> int:
+    """`--dry-run` output for normalized `rows` (`country=False`: already filtered)."""
+    import csv
+    import random
+
+    from .addresses import LABEL_FIELDS, LabelBuilder, select_rows
+
+    limit = DRY_RUN_ROWS if args.limit is None else args.limit
+    if limit < 0 or (args.sample is not None and args.sample < 0):
+        print("Error: --limit and --sample must not be negative", file=sys.stderr)
+        return 2
+    writer = csv.DictWriter(sys.stdout, fieldnames=LABEL_FIELDS, lineterminator="\n")
+    builder = LabelBuilder(paths.templates)
+    picked = select_rows(
+        rows,
+        limit=limit,
+        sample=args.sample,
+        country=args.country if country else None,
+        rng=random.Random(args.seed),
+    )
+    labels = builder.build(picked)
+    writer.writeheader()
+    writer.writerows(labels)
+    return 0
+
+
+def _labels_from_store(args: argparse.Namespace, paths: Paths) -> int:
+    """`build-labels --from-store`: read the year from the address book, not the CSV."""
+    import sqlite3
+
+    from . import label_cache
+    from .addresses import LABELS_FILENAME, LabelBuilder, write_labels
+    from .config import ensure_dir, label_cache_path
+    from .store import AddressStore
+
+    if args.year is None or args.input or args.watch:
+        print(
+            "Error: --from-store needs --year and cannot be combined with --input or --watch",
+            file=sys.stderr,
+        )
+        return 2
+    store_path = Path(args.store) if args.store else paths.store
+    if not store_path.exists():
+        print(f"Error: address store not found at {store_path} (run ingest)", file=sys.stderr)
+        return 2
+    try:
+        with AddressStore(store_path) as store:
+            if args.year not in store.years():
+                print(f"Error: {args.year} is not in {store_path} (run ingest)", file=sys.stderr)
+                return 2
+            # The country filter runs in SQLite, on the indexed resolved code
+            rows = (row for _, row in store.rows(args.year, country=args.country))
+            if args.dry_run:
+                return _preview_rows(args, rows, paths, country=False)
+            if args.limit is not None or args.sample is not None or args.country:
+                print("Error: --limit/--sample/--country need --dry-run", file=sys.stderr)
+                return 2
+
+            builder = LabelBuilder(paths.templates)
+            if args.out and Path(args.out).suffix.lower() == ".csv":
+                out_csv = Path(args.out)
+            else:
+                out_dir = Path(args.out) if args.out else paths.processed_dir(args.year)
+                out_csv = out_dir / LABELS_FILENAME
+            ensure_dir(out_csv.parent)
+            cache_file = label_cache_path(args.cache)
+            if cache_file is None:
+                labels = list(builder.build(rows))
+            else:
+                with label_cache.open_cache(cache_file, builder) as cache:
+                    labels = list(label_cache.build_cached(builder, rows, cache))
+                print(cache.summary(), file=sys.stderr)
+            write_labels(labels, out_csv)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    print(f"Wrote labels CSV: {out_csv}")
+    return 0
+
+
+def cmd_serve(args: argparse.Namespace) -> int:
+    """Serve label formatting over HTTP with templates loaded once."""
+    from .config import load_paths
+    from .service import LabelService, make_server, server_url
+
+    templates = Path(args.templates) if args.templates else load_paths().templates
+    try:
+        service = LabelService.from_path(templates)
+        server = make_server(
+            service,
+            host=args.host,
+            port=args.port,
+            socket_path=Path(args.socket) if args.socket else None,
+            verbose=args.verbose,
+        )
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    print(f"Serving labels on {server_url(server)} (templates: {templates})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.socket:
+            Path(args.socket).unlink(missing_ok=True)
+    return 0
+
+
+def _watch_labels(args: argparse.Namespace, in_csv: Path, paths: Paths) -> int:
+    from contextlib import suppress
+
+    from .addresses import default_labels_path
+    from .watch import IncrementalBuild, watch
+
+    if args.dry_run:
+        print("Error: --watch cannot be combined with --dry-run", file=sys.stderr)
+        return 2
+    if args.out:
+        out_arg = Path(args.out)
+        is_file = out_arg.suffix.lower() == ".csv"
+        out_csv = out_arg if is_file else out_arg / "labels_for_mailmerge.csv"
+    else:
+        try:
+            out_csv = default_labels_path(in_csv, paths)
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 2
+    build = IncrementalBuild(in_csv, out_csv, paths.templates)
+    print(f"Watching {in_csv} and {paths.templates}; writing {out_csv} (Ctrl-C to stop)")
+    with suppress(KeyboardInterrupt):
+        watch(build, interval=args.interval, debounce=args.debounce)
+    return 0
+
+
+def _diff_source(value: str, processed: bool, paths: Paths) -> Path:
+    """A year (resolved under the data folders) or a CSV path."""
+    if value.isdigit():
+        year = int(value)
+        if processed:
+            return paths.processed_dir(year) / "labels_for_mailmerge.csv"
+        return paths.raw_dir(year) / "mailing_list.csv"
+    return Path(value)
+
+
+def cmd_diff(args: argparse.Namespace) -> int:
+    """Stream added/removed/changed recipients between two mailing lists."""
+    from .config import load_paths
+    from .diff import PROCESSED_SPEC, RAW_SPEC, WRITERS, DiffStats, diff_rows, read_rows
+
+    if args.max_rows is not None and args.max_rows < 1:
+        print("Error: --max-rows must be at least 1", file=sys.stderr)
+        return 2
+    paths = load_paths()
+    old_csv = _diff_source(args.from_, args.processed, paths)
+    new_csv = _diff_source(args.to, args.processed, paths)
+    for path in (old_csv, new_csv):
+        if not path.exists():
+            print(f"Error: input CSV not found at {path}", file=sys.stderr)
+            return 2
+
+    spec = PROCESSED_SPEC if args.processed else RAW_SPEC
+    stats = DiffStats()
+    records = diff_rows(
+        read_rows(old_csv, spec),
+        read_rows(new_csv, spec),
+        spec,
+        max_rows=args.max_rows,
+        stats=stats,
+    )
+    try:
+        if args.out:
+            with Path(args.out).open("w", encoding="utf-8", newline="") as out:
+                WRITERS[args.format](records, spec, out)
+        else:
+            WRITERS[args.format](records, spec, sys.stdout)
+    except (OSError, UnicodeDecodeError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    print(f"{old_csv} -> {new_csv}: {stats.summary()}", file=sys.stderr)
+    return 0
+
+
+def cmd_ingest(args: argparse.Namespace) -> int:
+    """Load mailing lists into the address store, one batched load per year."""
+    import sqlite3
+
+    from .addresses import iter_csv_rows
+    from .batch import RAW_FILENAME, discover_years
+    from .config import load_paths
+    from .store import AddressStore
+
+    paths = load_paths()
+    if args.all_years:
+        if args.year is not None or args.input:
+            print("Error: --all-years cannot be combined with --year or --input", file=sys.stderr)
+            return 2
+        sources = [(y, paths.raw_dir(y) / RAW_FILENAME) for y in discover_years(paths)]
+        if not sources:
+            print(f"Error: no years with {paths.raw_base}/<year>/{RAW_FILENAME}", file=sys.stderr)
+            return 2
+    elif args.year is None:
+        print("Error: --year or --all-years is required", file=sys.stderr)
+        return 2
+    else:
+        in_csv = Path(args.input) if args.input else paths.raw_dir(args.year) / RAW_FILENAME
+        sources = [(args.year, in_csv)]
+    for _, in_csv in sources:
+        if not in_csv.exists():
+            print(f"Error: input CSV not found at {in_csv}", file=sys.stderr)
+            return 2
+
+    store_path = Path(args.store) if args.store else paths.store
+    try:
+        with AddressStore(store_path) as store:
+            for year, in_csv in sources:
+                with in_csv.open("r", encoding="utf-8", newline="") as f:
+                    count = store.ingest(year, iter_csv_rows(f), source=str(in_csv))
+                print(f"Ingested {count} rows for {year} into {store_path}")
+    except (OSError, UnicodeDecodeError, ValueError, sqlite3.Error) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    return 0
+
+
+def cmd_lookup(args: argparse.Namespace) -> int:
+    """Query the address store by name, postal code and/or country, across years."""
+    import csv
+    import sqlite3
+
+    from .addresses import RAW_FIELDS
+    from .config import load_paths
+    from .store import AddressStore
+
+    store_path = Path(args.store) if args.store else load_paths().store
+    if not store_path.exists():
+        print(f"Error: address store not found at {store_path} (run ingest)", file=sys.stderr)
+        return 2
+    writer = csv.writer(sys.stdout, lineterminator="\n")
+    try:
+        with AddressStore(store_path) as store:
+            filters = {"country": args.country, "zip_code": args.zip, "name": args.name}
+            if args.explain:
+                print(store.explain(args.year, **filters))
+                return 0
+            writer.writerow(["year", *RAW_FIELDS])
+            for year, row in store.rows(args.year, limit=args.limit, **filters):
+                writer.writerow([year, *row.values()])
+    except sqlite3.Error as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    return 0
+
+
+def cmd_stats(args: argparse.Namespace) -> int:
+    """Single-pass statistics and country inventory for a raw or processed CSV."""
+    import json
+
+    from .addresses import LABELS_FILENAME, load_templates
+    from .batch import RAW_FILENAME, discover_years
+    from .config import load_paths
+    from .stats import collect_stats
+
+    paths = load_paths()
+    if args.input:
+        in_csv = Path(args.input)
+    else:
+        year = args.year
+        if year is None:
+            # Default to the latest downloaded sheet
+            years = discover_years(paths)
+            if not years:
+                print(f"Error: no mailing lists under {paths.raw_base}", file=sys.stderr)
+                return 2
+            year = years[-1]
+        if args.processed:
+            in_csv = paths.processed_dir(year) / LABELS_FILENAME
+        else:
+            in_csv = paths.raw_dir(year) / RAW_FILENAME
+    if not in_csv.exists():
+        print(f"Error: input CSV not found at {in_csv}", file=sys.stderr)
+        return 2
+    if args.jobs is not None and args.jobs < 1:
+        print("Error: --jobs must be at least 1", file=sys.stderr)
+        return 2
+
+    try:
+        stats = collect_stats(in_csv, load_templates(paths.templates), jobs=args.jobs)
+    except (OSError, UnicodeDecodeError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    if args.json:
+        print(json.dumps({"input": str(in_csv), **stats.to_dict()}, indent=2, ensure_ascii=False))
+    elif args.countries:
+        for item in stats.to_dict()["countries"]:
+            print(f"{item['code']}\t{item['rows']}\t{item['name']}")
+    else:
+        print(f"{in_csv}: {stats.format()}")
+    return 0
+
+
+def _human_size(n: int) -> str:
+    size = float(n)
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def cmd_backups_list(args: argparse.Namespace) -> int:
+    """List catalogued backups; `--contains` searches the encrypted file lists."""
+    from .catalog import read_catalog, read_details
+
+    _load_env()
+    root = Path(args.backups_dir)
+    entries = [e for e in read_catalog(root) if args.year is None or e.year == args.year]
+    identity: Path | None = None
+    if args.contains or args.files:
+        identity = Path(args.identity or os.getenv("AGE_IDENTITY", ""))
+        if not identity.is_file():
+            print(
+                "Error: --contains/--files need --identity or AGE_IDENTITY", file=sys.stderr
+            )
+            return 2
+
+    shown = 0
+    for e in entries:
+        files: list[dict[str, object]] = []
+        if identity is not None:
+            try:
+                files = read_details(e, identity)["files"]
+            except Exception as err:
+                print(f"Error: cannot read catalog entry {e.archive}: {err}", file=sys.stderr)
+                return 2
+            if args.contains:
+                files = [f for f in files if args.contains in str(f["path"])]
+                if not files:
+                    continue
+        missing = "" if (root / e.archive).exists() else "  [missing]"
+        print(f"{e.created}  {_human_size(e.size):>10}  {e.archive}{missing}")
+        for f in files:
+            print(f"    {f['path']}  ({f['size']} bytes, sha256 {str(f['sha256'])[:12]})")
+        shown += 1
+    if not shown:
+        print("No backups found in catalog.", file=sys.stderr)
+    return 0
+
+
+def cmd_backups_verify(args: argparse.Namespace) -> int:
+    """Verify catalogued backups and print a JSON pass/fail report."""
+    import json
+
+    from .verify import verify_backups
+
+    if args.jobs is not None and args.jobs < 1:
+        print("Error: --jobs must be at least 1", file=sys.stderr)
+        return 2
+    _load_env()
+    identity = Path(args.identity or os.getenv("AGE_IDENTITY", ""))
+    if not identity.is_file():
+        print("Error: verify needs --identity or AGE_IDENTITY", file=sys.stderr)
+        return 2
+    report = verify_backups(Path(args.backups_dir), identity, year=args.year, jobs=args.jobs)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+        print(
+            f"Verified {report['passed']} of {len(report['archives'])} backup(s); "
+            f"report: {args.output}"
+        )
+    else:
+        print(text)
+    return 0 if report["ok"] else 1
+
+
+def cmd_backups_prune(args: argparse.Namespace) -> int:
+    """Apply retention policies to catalogued backups."""
+    from .catalog import prune
+
+    try:
+        removed = prune(
+            Path(args.backups_dir),
+            keep_last=args.keep_last,
+            keep_daily=args.keep_daily,
+            keep_yearly=args.keep_yearly,
+            year=args.year,
+            dry_run=args.dry_run,
+        )
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    verb = "Would remove" if args.dry_run else "Removed"
+    for entry in removed:
+        print(f"{verb}: {entry.archive} ({entry.created})")
+    print(f"{verb} {len(removed)} backup(s).")
+    return 0
+
+
 def build_parser() -> argparse.ArgumentParser:
     p = argparse.ArgumentParser(prog="newyearscards", description="New Year’s cards workflow")
     p.add_argument("--version", action="version", version=f"%(prog)s {__version__}")
@@ -210,8 +902,45 @@ def build_parser() -> argparse.ArgumentParser:
     dl.add_argument("--year", type=int, required=True, help="Target year")
     dl.add_argument("--url", help="Google Sheet URL (defaults to SHEET_URL from .env)")
     dl.add_argument("--out", help="Output file or directory (defaults to data/raw/<year>/)")
+    dl.add_argument(
+        "--backend",
+        choices=["export", "values"],
+        help="'export' downloads the full CSV; 'values' fetches only label columns "
+        "via the Sheets API (default: SHEET_BACKEND from .env, else export)",
+    )
+    dl.add_argument(
+        "--backup",
+        choices=["sync", "queue", "detach", "off"],
+        help="Encrypted backup after download: run now (sync), queue for backup-worker, "
+        "detach to a background worker, or off (default: BACKUP_DISPATCH, else sync)",
+    )
     dl.set_defaults(func=cmd_download)
 
+    db = sp.add_parser(
+        "download-build",
+        help="Download the sheet and build labels in one streaming pass",
+    )
+    db.add_argument("--year", type=int, required=True, help="Target year")
+    db.add_argument("--url", help="Google Sheet URL (defaults to SHEET_URL from .env)")
+    db.add_argument(
+        "--raw-out", help="Raw CSV file or directory (defaults to data/raw/<year>/)"
+    )
+    db.add_argument(
+        "--out", help="Labels CSV file or directory (defaults to data/processed/<year>/)"
+    )
+    db.add_argument(
+        "--backend",
+        choices=["export", "values"],
+        help="Download backend (default: SHEET_BACKEND from .env, else export)",
+    )
+    db.add_argument(
+        "--backup",
+        choices=["sync", "queue", "detach", "off"],
+        help="Encrypted backup after download: run now (sync), queue for backup-worker, "
+        "detach to a background worker, or off (default: BACKUP_DISPATCH, else sync)",
+    )
+    db.set_defaults(func=cmd_download_build)
+
     bl = sp.add_parser("build-labels", help="Build processed labels CSV for mail merge")
     bl.add_argument("--year", type=int, required=False, help="Year (used to infer default paths)")
     bl.add_argument(
@@ -220,8 +949,170 @@ def build_parser() -> argparse.ArgumentParser:
     )
     bl.add_argument("--out", help="Output file or directory (defaults to data/processed/<year>/)")
     bl.add_argument("--dry-run", action="store_true", help="Preview output to stdout, do not write")
+    bl.add_argument(
+        "--limit",
+        type=int,
+        help=f"Rows to preview with --dry-run (default: {DRY_RUN_ROWS}); reading stops there",
+    )
+    bl.add_argument(
+        "--sample", type=int, help="Preview a random sample of N rows (one pass over the input)"
+    )
+    bl.add_argument("--seed", type=int, help="Random seed for --sample")
+    bl.add_argument(
+        "--country", help="Preview only rows for this country (code like DE, or name)"
+    )
+    bl.add_argument(
+        "--all-years",
+        action="store_true",
+        help="Build every year found under the raw data folder",
+    )
+    bl.add_argument("--years", help="Build these years, e.g. 2019-2025 or 2023,2025")
+    bl.add_argument(
+        "--jobs", type=int, default=4, help="Years built concurrently (default: 4)"
+    )
+    bl.add_argument(
+        "--watch",
+        action="store_true",
+        help="Rebuild whenever the input CSV or the templates change (incremental)",
+    )
+    bl.add_argument(
+        "--interval", type=float, default=0.5, help="--watch poll interval in seconds"
+    )
+    bl.add_argument(
+        "--debounce", type=float, default=0.3, help="--watch quiet time before rebuilding"
+    )
+    bl.add_argument(
+        "--cache",
+        help="Reuse labels formatted in earlier builds: SQLite file path, 'on' for the "
+        "default location, or 'off' (default: LABEL_CACHE from .env, else off)",
+    )
+    bl.add_argument(
+        "--from-store",
+        action="store_true",
+        help="Read --year from the address store (see ingest) instead of the raw CSV",
+    )
+    bl.add_argument("--store", help="Address store file (default: ADDRESS_STORE from .env)")
     bl.set_defaults(func=cmd_build_labels)
 
+    ig = sp.add_parser("ingest", help="Load mailing lists into the indexed address store")
+    ig.add_argument("--year", type=int, help="Year to load (replaces that year in the store)")
+    ig.add_argument(
+        "--input", help="Raw CSV path (defaults to data/raw/<year>/mailing_list.csv)"
+    )
+    ig.add_argument(
+        "--all-years", action="store_true", help="Load every year under the raw data folder"
+    )
+    ig.add_argument(
+        "--store",
+        help="Address store file (default: ADDRESS_STORE from .env, else data/addresses.sqlite3)",
+    )
+    ig.set_defaults(func=cmd_ingest)
+
+    lk = sp.add_parser("lookup", help="Query the address store (all years unless --year)")
+    lk.add_argument("--name", help='Last name, or "First Last" (case-insensitive)')
+    lk.add_argument("--zip", help="Postal code")
+    lk.add_argument("--country", help="Country code (DE) or name")
+    lk.add_argument("--year", type=int, help="Only this year")
+    lk.add_argument("--limit", type=int, help="At most N rows")
+    lk.add_argument(
+        "--explain", action="store_true", help="Print SQLite's query plan instead of rows"
+    )
+    lk.add_argument("--store", help="Address store file (default: ADDRESS_STORE from .env)")
+    lk.set_defaults(func=cmd_lookup)
+
+    sv = sp.add_parser("serve", help="Serve label formatting over HTTP (templates kept warm)")
+    sv.add_argument("--host", default="127.0.0.1", help="Bind address (default: 127.0.0.1)")
+    sv.add_argument("--port", type=int, default=8080, help="TCP port (default: 8080; 0 picks one)")
+    sv.add_argument("--socket", help="Listen on this Unix socket instead of TCP")
+    sv.add_argument(
+        "--templates", help="Address templates (default: ADDRESS_TEMPLATES from .env)"
+    )
+    sv.add_argument("--verbose", action="store_true", help="Log every request to stderr")
+    sv.set_defaults(func=cmd_serve)
+
+    df = sp.add_parser("diff", help="Show recipients added, removed or changed between lists")
+    df.add_argument(
+        "--from",
+        dest="from_",
+        required=True,
+        help="Older list: a year (e.g. 2024) or a CSV path",
+    )
+    df.add_argument("--to", required=True, help="Newer list: a year or a CSV path")
+    df.add_argument(
+        "--processed",
+        action="store_true",
+        help="Compare the built label CSVs instead of the raw mailing lists",
+    )
+    df.add_argument("--format", choices=["csv", "json"], default="csv", help="Output format")
+    df.add_argument("--out", help="Write the diff to this file instead of stdout")
+    df.add_argument(
+        "--max-rows",
+        type=int,
+        help="Rows of the older list kept in memory before spilling to disk",
+    )
+    df.set_defaults(func=cmd_diff)
+
+    st = sp.add_parser("stats", help="Row, country, empty-field and line-length statistics")
+    st.add_argument("--year", type=int, help="Year to read (default: the latest downloaded)")
+    st.add_argument("--input", help="Raw or processed CSV path (detected from the header)")
+    st.add_argument(
+        "--processed", action="store_true", help="Read the year's labels CSV instead of the raw one"
+    )
+    st.add_argument(
+        "--jobs",
+        type=int,
+        help="Worker processes for chunks (default: CPU count for files over 4 MiB, else 1)",
+    )
+    out_fmt = st.add_mutually_exclusive_group()
+    out_fmt.add_argument("--json", action="store_true", help="Print the statistics as JSON")
+    out_fmt.add_argument(
+        "--countries",
+        action="store_true",
+        help="Only list countries (code, rows, name; tab-separated, most common first)",
+    )
+    st.set_defaults(func=cmd_stats)
+
+    bw = sp.add_parser("backup-worker", help="Run queued encrypted backups")
+    bw.add_argument("--once", action="store_true", help="Exit when the queue is empty")
+    bw.add_argument(
+        "--poll", type=float, default=30.0, help="Seconds between queue checks (default: 30)"
+    )
+    bw.set_defaults(func=cmd_backup_worker)
+
+    bk = sp.add_parser("backups", help="Inspect and prune encrypted backups via the catalog")
+    bk.add_argument(
+        "--backups-dir", default="backups", help="Backups root holding catalog.jsonl"
+    )
+    bks = bk.add_subparsers(dest="backups_command", required=True)
+
+    bkl = bks.add_parser("list", help="List catalogued backups (newest last)")
+    bkl.add_argument("--year", type=int, help="Only backups of this card year")
+    bkl.add_argument("--contains", help="Only backups containing a file path with this text")
+    bkl.add_argument("--files", action="store_true", help="Show each backup's file list")
+    bkl.add_argument("--identity", help="age identity file (defaults to AGE_IDENTITY)")
+    bkl.set_defaults(func=cmd_backups_list)
+
+    bkp = bks.add_parser("prune", help="Delete backups not kept by the retention policy")
+    bkp.add_argument("--keep-last", type=int, default=0, help="Keep the N newest backups")
+    bkp.add_argument(
+        "--keep-daily", type=int, default=0, help="Keep the newest backup of each of N days"
+    )
+    bkp.add_argument(
+        "--keep-yearly", type=int, default=0, help="Keep the newest backup of each of N years"
+    )
+    bkp.add_argument("--year", type=int, help="Only prune backups of this card year")
+    bkp.add_argument("--dry-run", action="store_true", help="Show what would be removed")
+    bkp.set_defaults(func=cmd_backups_prune)
+
+    bkv = bks.add_parser(
+        "verify", help="Decrypt and hash backups in memory against catalog checksums"
+    )
+    bkv.add_argument("--year", type=int, help="Only backups of this card year")
+    bkv.add_argument("--jobs", type=int, help="Worker processes (default: CPU count)")
+    bkv.add_argument("--identity", help="age identity file (defaults to AGE_IDENTITY)")
+    bkv.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    bkv.set_defaults(func=cmd_backups_verify)
+
     return p
 
 
@@ -0,0 +1,229 @@
+"""Compression back ends for backup archives.
+
+- "gzip": single-threaded gzip (the historical default, written as `.tgz`).
+- "pgzip": pigz-style parallel gzip. The stream is cut into blocks that are
+  deflated concurrently (zlib releases the GIL), each primed with the last
+  32 KiB of its predecessor and sync-flushed, then concatenated into one
+  standard gzip member that any gzip reader can decode.
+- "zstd": Zstandard with a configurable level via the optional `zstandard`
+  package (`pip install newyearscards[zstd]`).
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+import gzip
+import os
+import struct
+from typing import IO, Any, cast
+import zlib
+
+COMPRESSIONS = ("gzip", "pgzip", "zstd")
+DEFAULT_ZSTD_LEVEL = 3
+# Accepted levels per codec (zstd's negative "fast" levels are not exposed)
+LEVEL_RANGES = {"gzip": (0, 9), "pgzip": (0, 9), "zstd": (1, 22)}
+BLOCK_SIZE = 128 * 1024
+_WINDOW = 32 * 1024
+
+zstd_module: Any | None
+try:  # Optional dependency; only needed for the "zstd" mode
+    import zstandard as _zstd
+
+    zstd_module = _zstd
+except Exception:  # pragma: no cover - depends on environment
+    zstd_module = None
+
+
+def require_zstd() -> Any:
+    if zstd_module is None:
+        raise RuntimeError("zstd compression needs the 'zstandard' package (pip install zstandard)")
+    return zstd_module
+
+
+def archive_suffix(compression: str, level: int | None = None) -> str:
+    """File suffix (before `.age`) recording the codec, and the zstd level."""
+    if compression == "zstd":
+        return f"-zstd{DEFAULT_ZSTD_LEVEL if level is None else level}.tar.zst"
+    return ".tgz"
+
+
+def compression_from_env() -> tuple[str, int | None, int | None]:
+    """Read `(compression, level, threads)` from BACKUP_COMPRESSION/_LEVEL/_THREADS."""
+    compression = os.getenv("BACKUP_COMPRESSION", "gzip").strip().lower() or "gzip"
+    if compression not in COMPRESSIONS:
+        raise ValueError(
+            f"Unknown BACKUP_COMPRESSION {compression!r}; expected one of {', '.join(COMPRESSIONS)}"
+        )
+    level = _int_from_env("BACKUP_COMPRESSION_LEVEL")
+    if level is not None:
+        check_level(compression, level)
+    threads = _int_from_env("BACKUP_THREADS")
+    if threads is not None and threads < 1:
+        raise ValueError(f"BACKUP_THREADS must be at least 1, got {threads}")
+    return compression, level, threads
+
+
+def _int_from_env(name: str) -> int | None:
+    value = os.getenv(name, "").strip()
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer, got {value!r}") from None
+
+
+def check_level(compression: str, level: int) -> None:
+    """Raise ValueError when `level` is outside the range `compression` accepts."""
+    lo, hi = LEVEL_RANGES[compression]
+    if not lo <= level <= hi:
+        raise ValueError(f"{compression} compression level must be {lo}-{hi}, got {level}")
+
+
+def open_compressor(
+    sink: IO[bytes], compression: str, *, level: int | None = None, threads: int | None = None
+) -> Any:
+    """Return a closable writer compressing into `sink` with the chosen codec."""
+    if compression == "gzip":
+        # Level 9 matches what tarfile's "w|gz" has always produced
+        return gzip.GzipFile(
+            fileobj=sink, mode="wb", compresslevel=9 if level is None else level, mtime=0
+        )
+    if compression == "pgzip":
+        return ParallelGzipWriter(sink, level=6 if level is None else level, threads=threads)
+    if compression == "zstd":
+        cctx = require_zstd().ZstdCompressor(
+            level=DEFAULT_ZSTD_LEVEL if level is None else level,
+            threads=-1 if threads is None else threads,
+        )
+        return cctx.stream_writer(sink, closefd=False)
+    raise ValueError(f"Unknown compression: {compression!r}")
+
+
+def open_decompressor(source: IO[bytes], compression: str) -> IO[bytes]:
+    """Return a readable stream decoding `source` (gzip covers pgzip output too)."""
+    if compression == "zstd":
+        reader: IO[bytes] = require_zstd().ZstdDecompressor().stream_reader(
+            source, closefd=False
+        )
+        return reader
+    return cast(IO[bytes], gzip.GzipFile(fileobj=source, mode="rb"))
+
+
+def compression_for_name(name: str) -> str:
+    """Infer the decoder from an archive file name."""
+    return "zstd" if ".tar.zst" in name else "gzip"
+
+
+class CountingWriter:
+    """Pass-through writer that counts bytes."""
+
+    def __init__(self, sink: IO[bytes]) -> None:
+        self.sink = sink
+        self.count = 0
+
+    def write(self, data: bytes) -> int:
+        self.sink.write(data)
+        self.count += len(data)
+        return len(data)
+
+    def flush(self) -> None:
+        self.sink.flush()
+
+
+@dataclass
+class ArchiveStats:
+    raw_bytes: int = 0
+    compressed_bytes: int = 0
+    seconds: float = 0.0
+    # {"path", "size", "sha256"} per regular file, hashed as it was archived
+    files: list[dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def ratio(self) -> float:
+        return self.raw_bytes / self.compressed_bytes if self.compressed_bytes else 0.0
+
+    @property
+    def mb_per_s(self) -> float:
+        return self.raw_bytes / 1e6 / self.seconds if self.seconds > 0 else 0.0
+
+    def summary(self) -> str:
+        return f"ratio {self.ratio:.2f}x, {self.mb_per_s:.1f} MB/s"
+
+
+def _deflate_block(data: bytes, dictionary: bytes, level: int, last: bool) -> bytes:
+    if dictionary:
+        comp = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=dictionary)
+    else:
+        comp = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    out = comp.compress(data)
+    # A sync flush ends on a byte boundary, so blocks can simply be concatenated
+    return out + comp.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+class ParallelGzipWriter:
+    """Write-only file object producing a single gzip member using worker threads."""
+
+    def __init__(
+        self,
+        sink: IO[bytes],
+        *,
+        level: int = 6,
+        threads: int | None = None,
+        block_size: int = BLOCK_SIZE,
+    ) -> None:
+        self.sink = sink
+        self.level = level
+        self.block_size = block_size
+        self.threads = threads or os.cpu_count() or 1
+        self._pool = ThreadPoolExecutor(max_workers=self.threads)
+        self._pending: deque[Future[bytes]] = deque()
+        self._buf = bytearray()
+        self._prev_tail = b""
+        self._crc = 0
+        self._size = 0
+        self._closed = False
+        # gzip header: magic, deflate, no flags, mtime 0, no extra flags, unknown OS
+        sink.write(b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff")
+
+    def write(self, data: bytes) -> int:
+        self._buf += data
+        while len(self._buf) > self.block_size:
+            block = bytes(self._buf[: self.block_size])
+            del self._buf[: self.block_size]
+            self._submit(block, last=False)
+        return len(data)
+
+    def _submit(self, block: bytes, *, last: bool) -> None:
+        self._crc = zlib.crc32(block, self._crc)
+        self._size += len(block)
+        fut = self._pool.submit(_deflate_block, block, self._prev_tail, self.level, last)
+        self._pending.append(fut)
+        self._prev_tail = block[-_WINDOW:]
+        # Bound memory: keep at most two blocks in flight per worker
+        while len(self._pending) > 2 * self.threads:
+            self.sink.write(self._pending.popleft().result())
+
+    def flush(self) -> None:
+        return None
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._submit(bytes(self._buf), last=True)
+            self._buf = bytearray()
+            while self._pending:
+                self.sink.write(self._pending.popleft().result())
+            self.sink.write(struct.pack("<II", self._crc & 0xFFFFFFFF, self._size & 0xFFFFFFFF))
+        finally:
+            self._pool.shutdown(wait=True)
+
+    def __enter__(self) -> ParallelGzipWriter:
+        return self
+
+    def __exit__(self, *_exc: Any) -> None:
+        self.close()
@@ -3,18 +3,40 @@ from __future__ import annotations
 from dataclasses import dataclass
 import os
 from pathlib import Path
+from typing import Any
 
-try:
-    from dotenv import load_dotenv
-except Exception:  # pragma: no cover - optional dependency at runtime
-    def load_dotenv(*_args, **_kwargs):  # type: ignore
+_PACKAGE_DIR = Path(__file__).resolve().parent
+
+
+def load_dotenv(*args: Any, **kwargs: Any) -> bool:
+    """python-dotenv's `load_dotenv`, imported on first use to keep CLI startup fast.
+
+    Without arguments dotenv's own lookup is kept: it searches upwards from
+    this package's directory (from the working directory in a REPL or
+    debugger). dotenv is imported only when one of those two searches can
+    find a `.env`; otherwise there is nothing to load.
+    """
+    if not (args or kwargs) and not any(
+        (d / ".env").is_file()
+        for start in (_PACKAGE_DIR, Path.cwd())
+        for d in (start, *start.parents)
+    ):
+        return False
+    try:
+        from dotenv import load_dotenv as _load_dotenv
+    except Exception:  # pragma: no cover - optional dependency at runtime
         return False
+    return bool(_load_dotenv(*args, **kwargs))
 
 
 DEFAULT_RAW_DIR = "data/raw"
 DEFAULT_PROCESSED_DIR = "data/processed"
 DEFAULT_TEMPLATES_PATH = "config/address_formats.yml"
 DEFAULT_KEY_PATH = "keys/google-sheet-key.json"
+DEFAULT_STORE_PATH = "data/addresses.sqlite3"
+
+_DISABLED_VALUES = {"", "0", "off", "none", "false", "no"}
+_ENABLED_VALUES = {"1", "on", "true", "yes"}
 
 
 @dataclass
@@ -23,6 +45,7 @@ class Paths:
     processed_base: Path
     templates: Path
     key_path: Path
+    store: Path = Path(DEFAULT_STORE_PATH)
 
     def raw_dir(self, year: int) -> Path:
         return self.raw_base / str(year)
@@ -39,14 +62,34 @@ def load_paths() -> Paths:
     processed_base = Path(os.getenv("PROCESSED_DATA_DIR", DEFAULT_PROCESSED_DIR))
     templates = Path(os.getenv("ADDRESS_TEMPLATES", DEFAULT_TEMPLATES_PATH))
     key_path = Path(os.getenv("SERVICE_ACCOUNT_KEY", DEFAULT_KEY_PATH))
+    store = Path(os.getenv("ADDRESS_STORE", DEFAULT_STORE_PATH))
 
     return Paths(
         raw_base=raw_base,
         processed_base=processed_base,
         templates=templates,
         key_path=key_path,
+        store=store,
     )
 
 
+def label_cache_path(value: str | None = None) -> Path | None:
+    """Return the label cache file, or None when caching is disabled.
+
+    `value` (e.g. from `--cache`) or else `LABEL_CACHE` is a path, `on` for
+    `$XDG_CACHE_HOME/newyearscards/labels.sqlite3`, or `off` (the default).
+    Kept out of `label_cache` so that builds without a cache never import sqlite3.
+    """
+    if value is None:
+        value = os.getenv("LABEL_CACHE", "")
+    value = value.strip()
+    if value.lower() in _DISABLED_VALUES:
+        return None
+    if value.lower() in _ENABLED_VALUES:
+        base = os.getenv("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+        return Path(base) / "newyearscards" / "labels.sqlite3"
+    return Path(value).expanduser()
+
+
 def ensure_dir(path: Path) -> None:
     path.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,270 @@
+"""Year-over-year mailing-list diff (`newyearscards diff`).
+
+Records of the two lists are matched on a recipient key (normalized first
+and last name; a repeated key gets an occurrence suffix, `key#2`) with a hash
+join: the older list is indexed in memory and the newer one is streamed past
+it, so the work is linear in the size of both files. When the older list
+has more than `max_rows` records, both lists are first partitioned by key
+hash into temporary CSV files and joined one partition at a time (a grace
+hash join), so memory stays bounded by the partition size.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from collections.abc import Callable, Iterable, Iterator
+import csv
+from dataclasses import dataclass, field
+from itertools import chain, islice
+import json
+from pathlib import Path
+import re
+import tempfile
+from typing import IO
+import unicodedata
+import zlib
+
+from .addresses import LABEL_FIELDS, has_address, iter_csv_rows
+
+Row = dict[str, str]
+
+# Older-list records held in memory before the join spills to disk
+DEFAULT_MAX_ROWS = 200_000
+# Partitions per spill level, and how many levels before giving up on splitting
+FANOUT = 16
+MAX_DEPTH = 4
+STATUSES = ("added", "removed", "changed")
+
+
+@dataclass(frozen=True)
+class DiffSpec:
+    """Which columns identify a recipient, and which ones count as their address."""
+
+    fields: tuple[str, ...]
+    key_fields: tuple[str, ...]
+    compare_fields: tuple[str, ...]
+    # Raw sheets have free-form headers ("First Name") that need normalizing
+    raw: bool = True
+
+    def key(self, row: Row) -> str:
+        parts = [_norm(row.get(f, "")).casefold() for f in self.key_fields]
+        if not any(parts):
+            # Nameless rows: fall back to the address so they can still match
+            parts = [_norm(row.get(f, "")).casefold() for f in self.compare_fields[:2]]
+        return "|".join(parts)
+
+    def blank(self, row: Row) -> bool:
+        """No name and no address: an empty or spacer line, not a recipient."""
+        if any(_norm(row.get(f, "")) for f in self.key_fields):
+            return False
+        if self.raw:
+            return not has_address(row)
+        return not any(_norm(row.get(f, "")) for f in self.compare_fields)
+
+    def changes(self, old: Row, new: Row) -> list[str]:
+        return [
+            f for f in self.compare_fields if _norm(old.get(f, "")) != _norm(new.get(f, ""))
+        ]
+
+
+RAW_SPEC = DiffSpec(
+    fields=(
+        "prefix",
+        "first_name",
+        "last_name",
+        "address1",
+        "address2",
+        "city",
+        "state",
+        "zip",
+        "country",
+    ),
+    key_fields=("first_name", "last_name"),
+    compare_fields=("address1", "address2", "city", "state", "zip", "country"),
+)
+PROCESSED_SPEC = DiffSpec(
+    fields=tuple(LABEL_FIELDS),
+    key_fields=("FirstName", "LastName"),
+    compare_fields=("Line1", "Line2", "Line3", "Line4", "Line5", "Country"),
+    raw=False,
+)
+
+
+def _norm(value: str) -> str:
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", value)).strip()
+
+
+@dataclass
+class DiffRecord:
+    status: str
+    key: str
+    old: Row | None = None
+    new: Row | None = None
+    changed: list[str] = field(default_factory=list)
+
+
+@dataclass
+class DiffStats:
+    added: int = 0
+    removed: int = 0
+    changed: int = 0
+    unchanged: int = 0
+    partitions: int = 0
+
+    def summary(self) -> str:
+        text = (
+            f"{self.added} added, {self.removed} removed, {self.changed} changed, "
+            f"{self.unchanged} unchanged"
+        )
+        if self.partitions:
+            text += f" (spilled to {self.partitions} partitions)"
+        return text
+
+
+def read_rows(path: Path, spec: DiffSpec) -> Iterator[Row]:
+    """Stream a raw (normalized headers) or processed (label columns) CSV."""
+    with path.open("r", encoding="utf-8", newline="") as f:
+        rows: Iterable[Row] = iter_csv_rows(f) if spec.raw else csv.DictReader(f)
+        for row in rows:
+            yield {k: row.get(k) or "" for k in spec.fields}
+
+
+def _keyed(rows: Iterable[Row], spec: DiffSpec) -> Iterator[tuple[str, Row]]:
+    seen: Counter[str] = Counter()
+    for row in rows:
+        key = spec.key(row)
+        seen[key] += 1
+        yield (key if seen[key] == 1 else f"{key}#{seen[key]}"), row
+
+
+def _join(
+    old: Iterable[Row], new: Iterable[Row], spec: DiffSpec, stats: DiffStats
+) -> Iterator[DiffRecord]:
+    index = dict(_keyed(old, spec))
+    for key, row in _keyed(new, spec):
+        prev = index.pop(key, None)
+        if prev is None:
+            stats.added += 1
+            yield DiffRecord("added", key, new=row)
+        elif changed := spec.changes(prev, row):
+            stats.changed += 1
+            yield DiffRecord("changed", key, old=prev, new=row, changed=changed)
+        else:
+            stats.unchanged += 1
+    for key, row in index.items():
+        stats.removed += 1
+        yield DiffRecord("removed", key, old=row)
+
+
+def _partition(
+    rows: Iterable[Row], spec: DiffSpec, tmp: Path, side: str, depth: int
+) -> list[Path]:
+    paths = [tmp / f"{side}-{i}.csv" for i in range(FANOUT)]
+    files = [p.open("w", encoding="utf-8", newline="") for p in paths]
+    try:
+        writers = [csv.DictWriter(f, fieldnames=spec.fields) for f in files]
+        for row in rows:
+            # Salted per level, so a re-partitioned partition actually splits
+            h = zlib.crc32(f"{depth}:{spec.key(row)}".encode())
+            writers[h % FANOUT].writerow(row)
+    finally:
+        for f in files:
+            f.close()
+    return paths
+
+
+def _read_partition(path: Path, spec: DiffSpec) -> Iterator[Row]:
+    with path.open("r", encoding="utf-8", newline="") as f:
+        yield from csv.DictReader(f, fieldnames=spec.fields)
+
+
+def _grace_join(
+    old: Iterator[Row],
+    new: Iterable[Row],
+    spec: DiffSpec,
+    stats: DiffStats,
+    max_rows: int,
+    tmp_dir: Path | None,
+    depth: int,
+) -> Iterator[DiffRecord]:
+    head = list(islice(old, max_rows + 1))
+    # A single recipient key repeated more than max_rows times never splits; give up
+    # partitioning after a few levels rather than recursing forever
+    if len(head) <= max_rows or depth >= MAX_DEPTH:
+        yield from _join(chain(head, old), new, spec, stats)
+        return
+
+    # Partition both sides by key hash. All duplicates of a key land in one
+    # partition, in file order, so occurrence numbering still lines up.
+    stats.partitions += FANOUT
+    with tempfile.TemporaryDirectory(prefix="nyc-diff-", dir=tmp_dir) as tmp:
+        old_parts = _partition(chain(head, old), spec, Path(tmp), "old", depth)
+        del head
+        new_parts = _partition(new, spec, Path(tmp), "new", depth)
+        for old_path, new_path in zip(old_parts, new_parts, strict=True):
+            yield from _grace_join(
+                _read_partition(old_path, spec),
+                _read_partition(new_path, spec),
+                spec,
+                stats,
+                max_rows,
+                tmp_dir,
+                depth + 1,
+            )
+
+
+def diff_rows(
+    old: Iterable[Row],
+    new: Iterable[Row],
+    spec: DiffSpec,
+    *,
+    max_rows: int | None = None,
+    stats: DiffStats | None = None,
+    tmp_dir: Path | None = None,
+) -> Iterator[DiffRecord]:
+    """Stream added, changed and removed records of `new` relative to `old`.
+
+    Blank rows (`DiffSpec.blank`) are skipped on both sides. `max_rows`
+    defaults to `DEFAULT_MAX_ROWS`. In memory, added/changed records come in
+    `new` order, then removals in `old` order; after a spill the same holds
+    within each partition.
+    """
+    stats = stats if stats is not None else DiffStats()
+    if max_rows is None:
+        max_rows = DEFAULT_MAX_ROWS
+    old = (row for row in old if not spec.blank(row))
+    new = (row for row in new if not spec.blank(row))
+    yield from _grace_join(old, new, spec, stats, max_rows, tmp_dir, 0)
+
+
+def write_csv(records: Iterable[DiffRecord], spec: DiffSpec, out: IO[str]) -> None:
+    """One row per record: the new values (old ones for removals) plus changed columns."""
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(["status", "key", *spec.fields, "changed"])
+    for r in records:
+        row = r.new if r.new is not None else r.old or {}
+        values = [row.get(f, "") for f in spec.fields]
+        writer.writerow([r.status, r.key, *values, ",".join(r.changed)])
+
+
+def write_json(records: Iterable[DiffRecord], out: IO[str]) -> None:
+    """A JSON array, written incrementally (one record per line)."""
+    out.write("[")
+    sep = "\n"
+    for r in records:
+        item: dict[str, object] = {"status": r.status, "key": r.key}
+        if r.old is not None:
+            item["from"] = r.old
+        if r.new is not None:
+            item["to"] = r.new
+        if r.changed:
+            item["changed"] = r.changed
+        out.write(sep + json.dumps(item, ensure_ascii=False))
+        sep = ",\n"
+    out.write("\n]\n")
+
+
+WRITERS: dict[str, Callable[[Iterable[DiffRecord], DiffSpec, IO[str]], None]] = {
+    "csv": write_csv,
+    "json": lambda records, _spec, out: write_json(records, out),
+}
@@ -0,0 +1,383 @@
+"""Retry, rate limiting and streaming decode for HTTP fetches against Google.
+
+`get_with_retry` wraps a session's `get` with exponential backoff (full
+jitter), honours `Retry-After`, stops once the retry budget is spent and
+draws from a token bucket shared by every fetch in the process.
+`iter_decoded` streams a response body, inflating gzip/deflate incrementally
+while counting the bytes that actually crossed the wire; `stream_with_retry`
+combines the two and also repeats the request when the connection breaks
+while the body is being read.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
+import hashlib
+import http.client
+import os
+import random
+import threading
+import time
+from typing import Any
+import zlib
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+ACCEPT_COMPRESSED = {"Accept-Encoding": "gzip, deflate"}
+CHUNK_SIZE = 64 * 1024
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, ""))
+    except ValueError:
+        return default
+
+
+@dataclass
+class RetryPolicy:
+    max_attempts: int = 5
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+    # Total seconds of backoff we are willing to spend on one fetch
+    budget: float = 60.0
+    retry_statuses: frozenset[int] = RETRY_STATUSES
+
+    @classmethod
+    def from_env(cls) -> RetryPolicy:
+        """Build a policy from DOWNLOAD_MAX_ATTEMPTS / DOWNLOAD_RETRY_BUDGET."""
+        return cls(
+            max_attempts=max(1, int(_env_float("DOWNLOAD_MAX_ATTEMPTS", cls.max_attempts))),
+            budget=max(0.0, _env_float("DOWNLOAD_RETRY_BUDGET", cls.budget)),
+        )
+
+    def delay(self, retry: int, rng: random.Random | None = None) -> float:
+        """Full-jitter exponential backoff for the given retry number (1-based)."""
+        cap = min(self.max_delay, self.base_delay * (2 ** (retry - 1)))
+        return (rng or random).uniform(0, cap)
+
+
+@dataclass
+class FetchStats:
+    attempts: int = 0
+    # Seconds spent sleeping between attempts
+    backoff_wait: float = 0.0
+    # Seconds spent waiting on the shared rate limiter
+    throttle_wait: float = 0.0
+    statuses: list[int] = field(default_factory=list)
+    # Logical fetches; attempts beyond one per fetch are retries
+    requests: int = 0
+    # Body bytes as transferred (possibly compressed) and after decoding
+    wire_bytes: int = 0
+    body_bytes: int = 0
+
+    @property
+    def retries(self) -> int:
+        return max(0, self.attempts - self.requests)
+
+    def summary(self) -> str:
+        text = (
+            f"{self.attempts} attempt(s), {self.retries} retried, "
+            f"backoff {self.backoff_wait:.2f}s, throttled {self.throttle_wait:.2f}s"
+        )
+        if self.body_bytes:
+            text += f", {self.wire_bytes} bytes on the wire ({self.body_bytes} decoded)"
+        return text
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        if rate <= 0 or capacity <= 0:
+            raise ValueError("rate and capacity must be positive")
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token, sleeping until one is available. Returns seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = (1 - self._tokens) / self.rate
+            self._sleep(wait)
+            waited += wait
+
+
+_default_limiter: TokenBucket | None = None
+_default_limiter_lock = threading.Lock()
+
+
+def default_limiter() -> TokenBucket:
+    """Process-wide limiter shared by all fetches (DOWNLOAD_RATE_LIMIT req/s)."""
+    global _default_limiter
+    with _default_limiter_lock:
+        if _default_limiter is None:
+            rate = _env_float("DOWNLOAD_RATE_LIMIT", 2.0)
+            _default_limiter = TokenBucket(rate if rate > 0 else 2.0, capacity=5)
+        return _default_limiter
+
+
+def _retry_after(resp: Any) -> float | None:
+    headers = getattr(resp, "headers", None) or {}
+    value = headers.get("Retry-After") if hasattr(headers, "get") else None
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(policy: RetryPolicy, attempt: int, resp: Any | None) -> float:
+    """Seconds to wait before the next attempt: `Retry-After` if sent, else jittered backoff."""
+    hinted = _retry_after(resp) if resp is not None else None
+    return min(policy.max_delay, hinted) if hinted is not None else policy.delay(attempt)
+
+
+@dataclass
+class _Retries:
+    """Attempts made and backoff spent so far on one logical fetch."""
+
+    policy: RetryPolicy
+    limiter: TokenBucket
+    stats: FetchStats
+    sleep: Callable[[float], None]
+    attempt: int = 0
+    waited: float = 0.0
+
+    @property
+    def exhausted(self) -> bool:
+        return self.attempt >= self.policy.max_attempts
+
+    def backoff(self, resp: Any | None) -> bool:
+        """Sleep before the next attempt; False (no sleep) if that would exceed the budget."""
+        delay = backoff_delay(self.policy, self.attempt, resp)
+        if self.waited + delay > self.policy.budget:
+            return False
+        if resp is not None and hasattr(resp, "close"):
+            resp.close()
+        self.sleep(delay)
+        self.waited += delay
+        self.stats.backoff_wait += delay
+        return True
+
+
+def _retries(
+    policy: RetryPolicy | None,
+    limiter: TokenBucket | None,
+    stats: FetchStats | None,
+    sleep: Callable[[float], None] | None,
+) -> _Retries:
+    stats = stats if stats is not None else FetchStats()
+    stats.requests += 1
+    return _Retries(
+        policy or RetryPolicy.from_env(), limiter or default_limiter(), stats, sleep or time.sleep
+    )
+
+
+def get_with_retry(
+    session: Any,
+    url: str,
+    *,
+    timeout: float = 30,
+    policy: RetryPolicy | None = None,
+    limiter: TokenBucket | None = None,
+    stats: FetchStats | None = None,
+    sleep: Callable[[float], None] | None = None,
+    **kwargs: Any,
+) -> Any:
+    """GET `url` through `session`, retrying transient failures.
+
+    Retries on connection errors (OSError, which covers requests' exceptions)
+    and on 429/5xx responses. The final response is returned even when it is
+    an error so callers keep using `raise_for_status()`.
+    """
+    retries = _retries(policy, limiter, stats, sleep)
+    return _get(session, url, retries, timeout=timeout, **kwargs)
+
+
+def _get(session: Any, url: str, retries: _Retries, **kwargs: Any) -> Any:
+    stats = retries.stats
+    while True:
+        stats.throttle_wait += retries.limiter.acquire()
+        stats.attempts += 1
+        retries.attempt += 1
+        error: OSError | None = None
+        try:
+            resp = session.get(url, **kwargs)
+        except OSError as e:
+            resp, error = None, e
+            if retries.exhausted:
+                raise
+        else:
+            status = int(getattr(resp, "status_code", 200))
+            stats.statuses.append(status)
+            if status not in retries.policy.retry_statuses or retries.exhausted:
+                return resp
+
+        if not retries.backoff(resp):
+            if error is not None:
+                raise error
+            return resp
+
+
+def _broken_transfer(exc: Exception) -> bool:
+    """Whether `exc` means the connection failed while a body was being read.
+
+    urllib3 (under requests) raises its own ProtocolError/ReadTimeoutError,
+    which are not OSErrors; they are matched by module so that urllib3 is not
+    a dependency of this module.
+    """
+    if isinstance(exc, OSError | http.client.HTTPException):
+        return True
+    return type(exc).__module__.split(".")[0] == "urllib3"
+
+
+def stream_with_retry(
+    session: Any,
+    url: str,
+    *,
+    timeout: float = 30,
+    policy: RetryPolicy | None = None,
+    limiter: TokenBucket | None = None,
+    stats: FetchStats | None = None,
+    sleep: Callable[[float], None] | None = None,
+    **kwargs: Any,
+) -> Iterator[bytes]:
+    """Streamed `get_with_retry` that yields the decoded body and survives a dropped connection.
+
+    The first response is fetched and checked with `raise_for_status()`
+    before this returns. If the transport fails while the body is read, the
+    request is made again, counting against the same attempts and backoff
+    budget; the new body must start with the bytes already yielded (compared
+    by SHA-256) and streaming resumes after them. A body that changed between
+    attempts raises ValueError, so callers writing to a `.part` file keep
+    their previous copy.
+    """
+    retries = _retries(policy, limiter, stats, sleep)
+    kwargs.update(timeout=timeout, stream=True)
+    resp = _get(session, url, retries, **kwargs)
+    resp.raise_for_status()
+    return _resumable_body(session, url, resp, retries, kwargs)
+
+
+def _resumable_body(
+    session: Any, url: str, resp: Any, retries: _Retries, kwargs: dict[str, Any]
+) -> Iterator[bytes]:
+    sent = hashlib.sha256()
+    sent_bytes = 0
+    while True:
+        skip = sent_bytes
+        replayed = hashlib.sha256()
+        try:
+            for chunk in iter_decoded(resp, retries.stats):
+                if skip:
+                    head, chunk = chunk[:skip], chunk[skip:]
+                    replayed.update(head)
+                    skip -= len(head)
+                    if not skip and replayed.digest() != sent.digest():
+                        raise ValueError(f"response body of {url} changed while retrying")
+                    if not chunk:
+                        continue
+                sent.update(chunk)
+                sent_bytes += len(chunk)
+                yield chunk
+            if skip:
+                raise ValueError(f"response body of {url} changed while retrying")
+            return
+        except Exception as e:
+            if not _broken_transfer(e) or retries.exhausted or not retries.backoff(None):
+                raise
+            resp.close()
+            resp = _get(session, url, retries, **kwargs)
+            resp.raise_for_status()
+
+
+def _decoder(encoding: str) -> Any | None:
+    encoding = encoding.strip().lower()
+    if encoding in ("gzip", "x-gzip"):
+        return zlib.decompressobj(zlib.MAX_WBITS | 16)
+    if encoding == "deflate":
+        return zlib.decompressobj()
+    return None
+
+
+class BodyDecoder:
+    """Incremental gzip/deflate decoding of a response body, counting bytes into `stats`."""
+
+    def __init__(self, encoding: str, stats: FetchStats) -> None:
+        self.encoding = encoding
+        self.stats = stats
+        self._decoder: Any = _decoder(encoding)
+
+    def feed(self, chunk: bytes) -> bytes:
+        self.stats.wire_bytes += len(chunk)
+        if self._decoder is None:
+            out = chunk
+        else:
+            out = self._decoder.decompress(chunk)
+            # Concatenated gzip members: start a fresh decoder on the remainder
+            while self._decoder.eof and self._decoder.unused_data:
+                rest = self._decoder.unused_data
+                self._decoder = _decoder(self.encoding)
+                out += self._decoder.decompress(rest)
+        self.stats.body_bytes += len(out)
+        return out
+
+    def finish(self) -> bytes:
+        if self._decoder is None:
+            return b""
+        tail: bytes = self._decoder.flush()
+        if not self._decoder.eof:
+            raise ValueError(f"truncated {self.encoding} response body")
+        self.stats.body_bytes += len(tail)
+        return tail
+
+
+def iter_decoded(
+    resp: Any, stats: FetchStats | None = None, *, chunk_size: int = CHUNK_SIZE
+) -> Iterator[bytes]:
+    """Yield the decoded body of `resp` chunk by chunk.
+
+    Streams from `resp.raw` (requests/urllib3 style, read with
+    `decode_content=False`) and inflates gzip or deflate on the fly. Sessions
+    without a raw stream fall back to the already-buffered `resp.content`.
+    """
+    stats = stats if stats is not None else FetchStats()
+    raw = getattr(resp, "raw", None)
+    if raw is None:
+        data = resp.content
+        stats.wire_bytes += len(data)
+        stats.body_bytes += len(data)
+        yield data
+        return
+
+    headers = getattr(resp, "headers", None) or {}
+    decoder = BodyDecoder(str(headers.get("Content-Encoding") or ""), stats)
+    while True:
+        chunk = raw.read(chunk_size, decode_content=False)
+        if not chunk:
+            break
+        if out := decoder.feed(chunk):
+            yield out
+    if tail := decoder.finish():
+        yield tail
@@ -0,0 +1,184 @@
+"""Persistent formatted-label cache shared across years (optional, SQLite).
+
+Most recipients' addresses do not change from one year to the next, so the
+formatted `Country` and `Line1`–`Line5` are stored keyed by a hash of the
+normalized input row plus a hash of the templates and the formatter version
+("template version").
+Builds look rows up in batches, format only the misses and insert those in
+one transaction per batch. Opening the cache with a new template version
+deletes the entries of every other version, so an edited template or an
+upgraded formatter never serves a stale label.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+import hashlib
+from itertools import islice
+import json
+from pathlib import Path
+import sqlite3
+import threading
+from types import TracebackType
+from typing import Any
+
+from . import __version__
+from .addresses import FORMAT_VERSION, LabelBuilder, has_address
+
+# Rows per lookup/insert batch (also keeps `IN (...)` under SQLite's variable limit)
+BATCH_SIZE = 500
+CACHED_FIELDS = ("Country", "Line1", "Line2", "Line3", "Line4", "Line5")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS labels (
+    key TEXT PRIMARY KEY,
+    version TEXT NOT NULL,
+    country TEXT NOT NULL,
+    line1 TEXT NOT NULL,
+    line2 TEXT NOT NULL,
+    line3 TEXT NOT NULL,
+    line4 TEXT NOT NULL,
+    line5 TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS labels_version ON labels (version);
+"""
+
+
+def template_version(templates: Mapping[str, Any]) -> str:
+    """Stable fingerprint of the parsed templates (key order does not matter).
+
+    The package and formatter versions are part of it, so labels cached by
+    an older release are not reused after the formatting code changed.
+    """
+    text = json.dumps(
+        [__version__, FORMAT_VERSION, templates], sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def row_key(row: Mapping[str, str], version: str) -> str:
+    """Hash of a normalized row's non-empty fields and the template version."""
+    items = sorted((k, v) for k, v in row.items() if v)
+    text = json.dumps([version, items], ensure_ascii=False)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class LabelCache:
+    """Formatted labels by row hash, for one template version.
+
+    Safe to share between threads (one connection behind a lock), e.g. by
+    the multi-year build.
+    """
+
+    def __init__(self, path: Path, version: str) -> None:
+        self.path = path
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            row = self._conn.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+            if row is None or row[0] != version:
+                cur = self._conn.execute("DELETE FROM labels WHERE version != ?", (version,))
+                self.evicted = cur.rowcount
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (name, value) VALUES ('version', ?)", (version,)
+                )
+
+    def __enter__(self) -> LabelCache:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int(self._conn.execute("SELECT COUNT(*) FROM labels").fetchone()[0])
+
+    def lookup(self, keys: Sequence[str]) -> dict[str, tuple[str, ...]]:
+        """Cached values (in `CACHED_FIELDS` order) for the keys that are present."""
+        found: dict[str, tuple[str, ...]] = {}
+        with self._lock:
+            for start in range(0, len(keys), BATCH_SIZE):
+                chunk = keys[start : start + BATCH_SIZE]
+                marks = ",".join("?" * len(chunk))
+                cur = self._conn.execute(
+                    "SELECT key, country, line1, line2, line3, line4, line5 FROM labels "
+                    f"WHERE version = ? AND key IN ({marks})",
+                    (self.version, *chunk),
+                )
+                found.update((key, tuple(values)) for key, *values in cur)
+        return found
+
+    def store(self, items: Iterable[tuple[str, Sequence[str]]]) -> int:
+        """Insert (key, values) pairs in one transaction; returns how many."""
+        rows = [(key, self.version, *values) for key, values in items]
+        if rows:
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO labels VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+                )
+        return len(rows)
+
+    def _tally(self, *, hits: int, misses: int) -> None:
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def summary(self) -> str:
+        text = f"label cache: {self.hits} hit(s), {self.misses} formatted"
+        if self.evicted:
+            text += f", {self.evicted} stale entr{'y' if self.evicted == 1 else 'ies'} evicted"
+        return text
+
+
+def open_cache(path: Path, builder: LabelBuilder) -> LabelCache:
+    """Open (or create) the cache at `path` for `builder`'s templates."""
+    return LabelCache(path, template_version(builder.templates))
+
+
+def build_cached(
+    builder: LabelBuilder,
+    rows: Iterable[dict[str, str]],
+    cache: LabelCache,
+    *,
+    batch_size: int = BATCH_SIZE,
+) -> Iterator[dict[str, str]]:
+    """`builder.build(rows)` for normalized rows, served from `cache` where possible.
+
+    Rows are taken in batches: one lookup per batch, the misses are
+    formatted and stored together, and labels come out in input order.
+    """
+    it = (row for row in rows if has_address(row))
+    while batch := list(islice(it, batch_size)):
+        keys = [row_key(row, cache.version) for row in batch]
+        cached = cache.lookup(keys)
+        fresh: dict[str, tuple[str, ...]] = {}
+        for key, row in zip(keys, batch, strict=True):
+            values = cached.get(key) or fresh.get(key)
+            if values is None:
+                label = builder.build_one(row)
+                assert label is not None  # rows without an address were filtered above
+                values = fresh[key] = tuple(label[f] for f in CACHED_FIELDS)
+            yield {
+                "Prefix": row.get("prefix", ""),
+                "FirstName": row.get("first_name", ""),
+                "LastName": row.get("last_name", ""),
+                **dict(zip(CACHED_FIELDS, values, strict=True)),
+            }
+        cache.store(fresh.items())
+        cache._tally(hits=len(batch) - len(fresh), misses=len(fresh))
@@ -0,0 +1,95 @@
+"""Fused download-and-build: one pass from HTTP stream to labels CSV.
+
+The sheet stream is teed into `data/raw/<year>/mailing_list.csv` while the
+same bytes are decoded, parsed and formatted, so the processed labels are
+complete as soon as the last byte of the download arrives.
+"""
+
+from __future__ import annotations
+
+import codecs
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+
+from .addresses import (
+    LABELS_FILENAME,
+    iter_csv_rows,
+    iter_transform_rows,
+    load_templates,
+    write_labels,
+)
+from .config import ensure_dir, load_paths
+from .http_retry import FetchStats
+from .sheets import open_sheet_stream
+
+
+@dataclass
+class PipelineResult:
+    raw_path: Path
+    labels_path: Path
+    rows: int
+
+
+def iter_text_lines(chunks: Iterable[bytes], encoding: str = "utf-8") -> Iterator[str]:
+    """Decode byte chunks incrementally and yield lines with their endings.
+
+    Only `\\n` splits lines (so `\\r\\n` pairs split across chunks stay
+    intact); multi-line quoted CSV fields are reassembled by `csv.reader`.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    buf = ""
+    for chunk in chunks:
+        buf += decoder.decode(chunk)
+        parts = buf.split("\n")
+        buf = parts.pop()
+        for part in parts:
+            yield part + "\n"
+    buf += decoder.decode(b"", final=True)
+    if buf:
+        yield buf
+
+
+def _tee(chunks: Iterable[bytes], sink: BinaryIO) -> Iterator[bytes]:
+    for chunk in chunks:
+        sink.write(chunk)
+        yield chunk
+
+
+def download_and_build(
+    year: int,
+    *,
+    sheet_url: str | None = None,
+    raw_out: Path | None = None,
+    labels_out: Path | None = None,
+    stats: FetchStats | None = None,
+    backend: str | None = None,
+) -> PipelineResult:
+    """Download the sheet and build labels in a single streaming pass.
+
+    Both outputs are written to `.part` files and only renamed into place once
+    the whole stream was parsed, so a failure leaves earlier copies untouched.
+    """
+    paths = load_paths()
+    # Load templates before touching the network so a bad config fails fast
+    templates = load_templates(paths.templates)
+    chunks = open_sheet_stream(sheet_url=sheet_url, stats=stats, backend=backend)
+
+    raw_out = raw_out or paths.raw_dir(year) / "mailing_list.csv"
+    labels_out = labels_out or paths.processed_dir(year) / LABELS_FILENAME
+    ensure_dir(raw_out.parent)
+    ensure_dir(labels_out.parent)
+
+    raw_part = raw_out.with_name(raw_out.name + ".part")
+    labels_part = labels_out.with_name(labels_out.name + ".part")
+    try:
+        with raw_part.open("wb") as raw_f:
+            rows = iter_csv_rows(iter_text_lines(_tee(chunks, raw_f)))
+            count = write_labels(iter_transform_rows(rows, templates), labels_part)
+        raw_part.replace(raw_out)
+        labels_part.replace(labels_out)
+    finally:
+        raw_part.unlink(missing_ok=True)
+        labels_part.unlink(missing_ok=True)
+    return PipelineResult(raw_path=raw_out, labels_path=labels_out, rows=count)
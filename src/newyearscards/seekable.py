@@ -0,0 +1,200 @@
+"""Seekable encrypted backup archives for selective restore.
+
+Unlike a `.tgz.age`, where the whole archive is one age stream, every member
+here is compressed and age-encrypted on its own, and an encrypted index at
+the end records where each member's ciphertext starts. Restoring one file
+decrypts the index plus that member's bytes and nothing else.
+
+Layout of `addresses-<stamp>.sar`::
+
+    MAGIC                         9 bytes
+    member ciphertexts ...        one age stream per regular file
+    index ciphertext              age-encrypted JSON (paths, metadata, offsets)
+    footer                        index offset, index length, MAGIC (u64, u64, 8s)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import os
+from pathlib import Path
+import struct
+import time
+from typing import IO, Any, cast
+
+from .backup import (
+    age_decrypt_bytes,
+    age_encrypt_bytes,
+    age_encrypt_stream,
+    member_selected,
+    safe_target,
+    sha256_stream,
+    walk_sources,
+)
+from .compression import ArchiveStats, CountingWriter, open_compressor, open_decompressor
+from .config import ensure_dir
+
+MAGIC = b"NYCSEEK1\n"
+SEEKABLE_SUFFIX = ".sar"
+_FOOTER = struct.Struct("<QQ8s")
+_COPY_SIZE = 1 << 20
+
+
+def is_seekable(path: Path) -> bool:
+    with path.open("rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def write_seekable_archive(
+    sources: list[Path],
+    out: Path,
+    recipients: list[str],
+    *,
+    compression: str = "gzip",
+    level: int | None = None,
+    only: str | None = None,
+) -> ArchiveStats:
+    """Write `sources` (stored under their base names) as a seekable archive.
+
+    `only` limits each source to one subdirectory (see `backup.walk_sources`).
+    """
+    if compression == "pgzip":
+        # Members are compressed one by one; parallel gzip buys nothing per file
+        compression = "gzip"
+    stats = ArchiveStats()
+    start = time.perf_counter()
+    entries: list[dict[str, Any]] = []
+    try:
+        # Unbuffered, so tell() sees what each age child appended to the fd
+        with out.open("wb", buffering=0) as f:
+            f.write(MAGIC)
+            for rel, path in walk_sources(sources, only=only):
+                st = path.stat()
+                entry: dict[str, Any] = {
+                    "path": rel,
+                    "mode": st.st_mode & 0o7777,
+                    "mtime": st.st_mtime,
+                }
+                if path.is_dir():
+                    entry["type"] = "dir"
+                    entries.append(entry)
+                    continue
+                offset = f.tell()
+                h = hashlib.sha256()
+                size = 0
+                with path.open("rb") as src, age_encrypt_stream(recipients, f) as sink:
+                    counted = CountingWriter(sink)
+                    comp = open_compressor(cast(IO[bytes], counted), compression, level=level)
+                    try:
+                        while block := src.read(_COPY_SIZE):
+                            h.update(block)
+                            comp.write(block)
+                            size += len(block)
+                    finally:
+                        comp.close()
+                entry.update(
+                    type="file",
+                    size=size,
+                    sha256=h.hexdigest(),
+                    offset=offset,
+                    length=f.tell() - offset,
+                )
+                entries.append(entry)
+                stats.files.append({"path": rel, "size": size, "sha256": entry["sha256"]})
+                stats.raw_bytes += size
+                stats.compressed_bytes += counted.count
+
+            index = {"version": 1, "compression": compression, "entries": entries}
+            index_offset = f.tell()
+            f.write(age_encrypt_bytes(json.dumps(index).encode("utf-8"), recipients))
+            f.write(_FOOTER.pack(index_offset, f.tell() - index_offset, MAGIC[:8]))
+    except BaseException:
+        out.unlink(missing_ok=True)
+        raise
+    stats.seconds = time.perf_counter() - start
+    return stats
+
+
+def read_index(archive: Path, identity: Path) -> dict[str, Any]:
+    """Decrypt just the index of a seekable archive."""
+    with archive.open("rb") as f:
+        f.seek(-_FOOTER.size, os.SEEK_END)
+        offset, length, magic = _FOOTER.unpack(f.read(_FOOTER.size))
+        if magic != MAGIC[:8]:
+            raise ValueError(f"Not a seekable backup (bad footer): {archive}")
+        f.seek(offset)
+        data: dict[str, Any] = json.loads(age_decrypt_bytes(f.read(length), identity))
+    return data
+
+
+def select_entries(entries: list[dict[str, Any]], wanted: list[str]) -> list[dict[str, Any]]:
+    """Entries matching any of `wanted` (see `backup.member_selected`)."""
+    selected = [e for e in entries if member_selected(e["path"], wanted)]
+    missing = [w for w in wanted if not any(member_selected(e["path"], [w]) for e in selected)]
+    if missing:
+        raise ValueError(f"Path not in backup: {', '.join(missing)}")
+    return selected
+
+
+def _member_stream(
+    f: IO[bytes], entry: dict[str, Any], identity: Path, compression: str
+) -> IO[bytes]:
+    f.seek(entry["offset"])
+    plain = age_decrypt_bytes(f.read(entry["length"]), identity)
+    return open_decompressor(io.BytesIO(plain), compression)
+
+
+def hash_members(archive: Path, identity: Path) -> dict[str, str]:
+    """SHA-256 of every file member, decrypted and decompressed in memory."""
+    index = read_index(archive, identity)
+    hashes: dict[str, str] = {}
+    with archive.open("rb") as f:
+        for entry in index["entries"]:
+            if entry["type"] == "file":
+                stream = _member_stream(f, entry, identity, index["compression"])
+                hashes[entry["path"]] = sha256_stream(stream)
+    return hashes
+
+
+def extract_seekable(
+    archive: Path, identity: Path, out_dir: Path, paths: list[str] | None = None
+) -> list[str]:
+    """Restore all members, or only those under `paths`; returns restored file names.
+
+    Only the index and the selected members are read and decrypted; each file
+    is checked against its recorded SHA-256.
+    """
+    index = read_index(archive, identity)
+    entries: list[dict[str, Any]] = index["entries"]
+    if paths:
+        entries = select_entries(entries, paths)
+    compression = index["compression"]
+
+    restored: list[str] = []
+    dirs: list[tuple[Path, dict[str, Any]]] = []
+    with archive.open("rb") as f:
+        for entry in entries:
+            target = safe_target(out_dir, entry["path"])
+            if entry["type"] == "dir":
+                ensure_dir(target)
+                dirs.append((target, entry))
+                continue
+            stream = _member_stream(f, entry, identity, compression)
+            ensure_dir(target.parent)
+            h = hashlib.sha256()
+            with target.open("wb") as out:
+                while block := stream.read(_COPY_SIZE):
+                    h.update(block)
+                    out.write(block)
+            if h.hexdigest() != entry["sha256"]:
+                raise ValueError(f"Checksum mismatch restoring {entry['path']}")
+            os.chmod(target, entry["mode"])
+            os.utime(target, (entry["mtime"], entry["mtime"]))
+            restored.append(entry["path"])
+    # Directory metadata last, since writing files bumps their mtimes
+    for target, entry in reversed(dirs):
+        os.chmod(target, entry["mode"])
+        os.utime(target, (entry["mtime"], entry["mtime"]))
+    return restored
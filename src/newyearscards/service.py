@@ -0,0 +1,290 @@
+"""Long-running label formatting service (`newyearscards serve`).
+
+Templates are loaded once at startup and the country resolver stays warm
+across requests, so a web front end can format addresses without paying for
+interpreter startup, `.env` loading and template parsing on every call.
+
+Endpoints (HTTP/1.1 over TCP or a Unix socket; JSON unless noted):
+
+    GET  /healthz   liveness probe
+    GET  /metrics   request counts and latency percentiles per endpoint
+    POST /format    one record             -> {"label": {...} | null}
+    POST /batch     {"rows": [records]}    -> {"labels": [...], "count": N}
+    POST /csv       raw mailing-list CSV   -> labels CSV (text/csv)
+
+Records may use the sheet's headers ("First Name") or normalized keys
+("first_name"). Requests are handled on a thread each; the shared state is
+read-only apart from the metrics, which take a lock.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+import csv
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import io
+import json
+import os
+from pathlib import Path
+import socketserver
+import stat
+import threading
+import time
+from typing import Any, cast
+
+from .addresses import LABEL_FIELDS, LabelBuilder, iter_csv_rows
+
+MAX_BODY_BYTES = 16 * 1024 * 1024
+# Latencies kept per endpoint for the percentiles in /metrics
+LATENCY_WINDOW = 2048
+
+
+class RequestError(Exception):
+    """A client error, reported with its HTTP status."""
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class EndpointStats:
+    count: int = 0
+    errors: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    recent: deque[float] = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+
+    def as_dict(self) -> dict[str, Any]:
+        ordered = sorted(self.recent)
+
+        def pct(q: float) -> float:
+            if not ordered:
+                return 0.0
+            return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "mean_ms": round(self.total_seconds / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+            "max_ms": round(self.max_seconds * 1000, 3),
+        }
+
+
+class Metrics:
+    """Thread-safe request counters and latency samples."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.in_flight = 0
+        self.endpoints: dict[str, EndpointStats] = {}
+
+    def begin(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def observe(self, endpoint: str, seconds: float, ok: bool) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            stats = self.endpoints.setdefault(endpoint, EndpointStats())
+            stats.count += 1
+            stats.errors += not ok
+            stats.total_seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            stats.recent.append(seconds)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "uptime_s": round(time.time() - self.started, 1),
+                "in_flight": self.in_flight,
+                "endpoints": {k: v.as_dict() for k, v in sorted(self.endpoints.items())},
+            }
+
+
+class LabelService:
+    """Warm state shared by all request threads."""
+
+    def __init__(self, builder: LabelBuilder) -> None:
+        self.builder = builder
+        self.metrics = Metrics()
+
+    @classmethod
+    def from_path(cls, path: Path) -> LabelService:
+        return cls(LabelBuilder(path))
+
+    def format_records(self, records: list[Any]) -> list[dict[str, str]]:
+        for i, record in enumerate(records):
+            if not isinstance(record, dict):
+                raise RequestError(400, f"row {i}: expected a JSON object")
+        return list(self.builder.build(records))
+
+    def format_csv(self, text: str) -> tuple[str, int]:
+        out = io.StringIO()
+        writer = csv.DictWriter(out, fieldnames=LABEL_FIELDS)
+        writer.writeheader()
+        count = 0
+        try:
+            for label in self.builder.build(iter_csv_rows(io.StringIO(text))):
+                writer.writerow(label)
+                count += 1
+        except ValueError as e:
+            raise RequestError(400, str(e)) from e
+        return out.getvalue(), count
+
+    def handle(self, method: str, path: str, body: bytes) -> tuple[int, str, bytes, int | None]:
+        """Route one request; returns (status, content type, body, label rows)."""
+        route = path.split("?", 1)[0].rstrip("/") or "/"
+        if method == "GET" and route == "/healthz":
+            return _json(200, {"status": "ok"})
+        if method == "GET" and route == "/metrics":
+            return _json(200, self.metrics.snapshot())
+        if method == "POST" and route == "/format":
+            labels = self.format_records([_load_json(body)])
+            return _json(200, {"label": labels[0] if labels else None}, len(labels))
+        if method == "POST" and route == "/batch":
+            data = _load_json(body)
+            records = data.get("rows") if isinstance(data, dict) else data
+            if not isinstance(records, list):
+                raise RequestError(400, 'expected {"rows": [...]} or a JSON array')
+            labels = self.format_records(records)
+            return _json(200, {"labels": labels, "count": len(labels)}, len(labels))
+        if method == "POST" and route == "/csv":
+            try:
+                text = body.decode("utf-8-sig")
+            except UnicodeDecodeError as e:
+                raise RequestError(400, "CSV upload must be UTF-8") from e
+            csv_text, count = self.format_csv(text)
+            return 200, "text/csv; charset=utf-8", csv_text.encode("utf-8"), count
+        if route in _ROUTES:
+            raise RequestError(405, f"{method} not allowed on {route}")
+        raise RequestError(404, f"no route for {method} {route}")
+
+
+_ROUTES = ("/healthz", "/metrics", "/format", "/batch", "/csv")
+
+
+def _json(
+    status: int, payload: Any, rows: int | None = None
+) -> tuple[int, str, bytes, int | None]:
+    return status, "application/json", json.dumps(payload).encode("utf-8"), rows
+
+
+def _load_json(body: bytes) -> Any:
+    try:
+        return json.loads(body or b"null")
+    except ValueError as e:
+        raise RequestError(400, f"invalid JSON: {e}") from e
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "newyearscards"
+
+    @property
+    def service(self) -> LabelService:
+        return cast(_ServiceServer, self.server).service
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server naming
+        self._dispatch()
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server naming
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        metrics = self.service.metrics
+        metrics.begin()
+        start = time.perf_counter()
+        route = self.path.split("?", 1)[0].rstrip("/") or "/"
+        status = 500
+        try:
+            status, ctype, payload, rows = self.service.handle(
+                self.command, self.path, self._read_body()
+            )
+        except RequestError as e:
+            status, ctype, payload, rows = _json(e.status, {"error": str(e)})
+        except Exception as e:  # pragma: no cover - defensive
+            status, ctype, payload, rows = _json(500, {"error": f"{type(e).__name__}: {e}"})
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(payload)))
+            if rows is not None:
+                self.send_header("X-Label-Rows", str(rows))
+            self.end_headers()
+            self.wfile.write(payload)
+        finally:
+            endpoint = route if route in _ROUTES else "other"
+            metrics.observe(endpoint, time.perf_counter() - start, status < 400)
+
+    def _read_body(self) -> bytes:
+        value = self.headers.get("Content-Length") or "0"
+        try:
+            length = int(value)
+        except ValueError:
+            length = -1
+        if length < 0:
+            # The body cannot be delimited, so the connection cannot be reused
+            self.close_connection = True
+            raise RequestError(400, f"invalid Content-Length: {value!r}")
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            raise RequestError(413, f"request body over {MAX_BODY_BYTES} bytes")
+        return self.rfile.read(length) if length else b""
+
+    def address_string(self) -> str:
+        # Unix-socket peers have no (host, port)
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        if cast(_ServiceServer, self.server).verbose:
+            super().log_message(format, *args)
+
+
+class _ServiceServer(socketserver.ThreadingMixIn):
+    daemon_threads = True
+    service: LabelService
+    verbose = False
+
+
+class _TCPServer(_ServiceServer, ThreadingHTTPServer):
+    pass
+
+
+class _UnixServer(_ServiceServer, socketserver.UnixStreamServer):
+    pass
+
+
+def make_server(
+    service: LabelService,
+    *,
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    socket_path: Path | None = None,
+    verbose: bool = False,
+) -> socketserver.BaseServer:
+    """Bind the service to a TCP port, or to `socket_path` when given."""
+    server: _TCPServer | _UnixServer
+    if socket_path is not None:
+        # Replace a stale socket from an earlier run, but never a regular file
+        if socket_path.exists() and stat.S_ISSOCK(socket_path.stat().st_mode):
+            socket_path.unlink()
+        server = _UnixServer(str(socket_path), _Handler)
+        os.chmod(socket_path, 0o600)
+    else:
+        server = _TCPServer((host, port), _Handler)
+    server.service = service
+    server.verbose = verbose
+    return server
+
+
+def server_url(server: socketserver.BaseServer) -> str:
+    address = cast(Any, server).server_address
+    if isinstance(address, tuple):
+        return f"http://{address[0]}:{address[1]}"
+    return f"unix:{address}"
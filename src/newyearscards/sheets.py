@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+from collections.abc import Iterable, Iterator
 import os
 from pathlib import Path
 import re
+from typing import Any
 from urllib.parse import parse_qs, urlparse
 
 try:
@@ -13,9 +15,14 @@ except Exception:  # pragma: no cover
         return False
 
 
+from . import token_cache
 from .config import ensure_dir, load_paths
+from .http_retry import ACCEPT_COMPRESSED, FetchStats, stream_with_retry
 
 SCOPES = ["https://www.googleapis.com/auth/drive.readonly"]
+EXPORT_BASE = "https://docs.google.com/spreadsheets/d"
+# "export": full CSV export; "values": Sheets API batchGet of mapped columns only
+BACKENDS = ("export", "values")
 
 
 def extract_ids(sheet_url: str) -> tuple[str, str]:
@@ -42,47 +49,118 @@ def extract_ids(sheet_url: str) -> tuple[str, str]:
     return spreadsheet_id, gid
 
 
-def download_sheet(
-    year: int, *, sheet_url: str | None = None, out_path: Path | None = None
-) -> Path:
-    """
-    Download the specified Google Sheet as CSV via service-account credentials.
-    Saves to data/raw/<year>/mailing_list.csv by default.
-    """
-    load_dotenv()
-    paths = load_paths()
-
+def resolve_sheet(sheet_url: str | None) -> tuple[str, str]:
+    """Spreadsheet id and gid of `sheet_url`, falling back to SHEET_URL."""
     if not sheet_url:
         sheet_url = os.getenv("SHEET_URL")
     if not sheet_url:
         raise RuntimeError("SHEET_URL is not set (provide --url or set in .env)")
+    return extract_ids(sheet_url)
 
-    spreadsheet_id, gid = extract_ids(sheet_url)
 
-    # Import heavy google deps lazily to keep module import light for tests
-    from google.auth.transport.requests import AuthorizedSession
+def export_url(spreadsheet_id: str, gid: str) -> str:
+    return f"{EXPORT_BASE}/{spreadsheet_id}/export?format=csv&gid={gid}"
+
+
+def load_credentials(key_path: Path) -> tuple[Any, str, Path | None]:
+    """Service-account credentials seeded from the token cache.
+
+    Returns (credentials, cache key, cache file) for `save_credentials_token`.
+    """
     from google.oauth2 import service_account
 
-    key_path = paths.key_path
     if not key_path.exists():
         raise FileNotFoundError(f"Service account key not found at {key_path}")
 
     creds = service_account.Credentials.from_service_account_file(
         str(key_path), scopes=SCOPES
     )
+    # Reuse a cached access token when possible to skip the JWT exchange
+    cache_file = token_cache.cache_path()
+    cache_key = token_cache.cache_key(key_path, SCOPES)
+    token_cache.apply_cached_token(creds, cache_key, cache_file)
+    return creds, cache_key, cache_file
+
+
+def open_sheet_stream(
+    *,
+    sheet_url: str | None = None,
+    stats: FetchStats | None = None,
+    backend: str | None = None,
+) -> Iterator[bytes]:
+    """
+    Authenticate and start fetching the sheet; returns an iterator of decoded CSV bytes.
+    Configuration and HTTP errors are raised here, before any bytes are consumed.
+    Transient failures are retried, including a connection dropped mid-body;
+    attempt counts and waits land in `stats`.
+    The export is requested gzip-compressed and inflated as it is read.
+    The "values" backend fetches only the label columns via the Sheets API.
+    """
+    load_dotenv()
+    paths = load_paths()
+
+    backend = backend or os.getenv("SHEET_BACKEND") or "export"
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown download backend: {backend!r}")
+
+    spreadsheet_id, gid = resolve_sheet(sheet_url)
+
+    # Import heavy google deps lazily to keep module import light for tests
+    from google.auth.transport.requests import AuthorizedSession
+
+    creds, cache_key, cache_file = load_credentials(paths.key_path)
     authed_session = AuthorizedSession(creds)
 
-    export_url = f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}/export?format=csv&gid={gid}"
+    chunks: Iterable[bytes]
+    if backend == "values":
+        from .sheets_api import fetch_projected_csv
+
+        chunks = [fetch_projected_csv(authed_session, spreadsheet_id, gid, stats=stats)]
+    else:
+        chunks = stream_with_retry(
+            authed_session,
+            export_url(spreadsheet_id, gid),
+            timeout=30,
+            stats=stats,
+            headers=ACCEPT_COMPRESSED,
+        )
+
+    def _stream() -> Iterator[bytes]:
+        yield from chunks
+        token_cache.save_credentials_token(creds, cache_key, cache_file)
+
+    return _stream()
+
 
-    resp = authed_session.get(export_url, timeout=30)
-    resp.raise_for_status()
+def download_sheet(
+    year: int,
+    *,
+    sheet_url: str | None = None,
+    out_path: Path | None = None,
+    stats: FetchStats | None = None,
+    backend: str | None = None,
+) -> Path:
+    """
+    Download the specified Google Sheet as CSV via service-account credentials.
+    Saves to data/raw/<year>/mailing_list.csv by default.
+    See `open_sheet_stream` for retries, compression and backends.
+    """
+    chunks = open_sheet_stream(sheet_url=sheet_url, stats=stats, backend=backend)
 
     if out_path is None:
-        target_dir = paths.raw_dir(year)
+        target_dir = load_paths().raw_dir(year)
         ensure_dir(target_dir)
         out_path = target_dir / "mailing_list.csv"
     else:
         ensure_dir(out_path.parent)
 
-    out_path.write_bytes(resp.content)
+    # Write to a sibling temp file so a failed transfer never truncates the last good copy
+    part = out_path.with_name(out_path.name + ".part")
+    try:
+        with part.open("wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+        part.replace(out_path)
+    finally:
+        part.unlink(missing_ok=True)
     return out_path
@@ -0,0 +1,106 @@
+"""Sheets API `values.batchGet` download backend with column projection.
+
+Instead of exporting every column as CSV, this reads the header row first,
+then fetches only the columns that `NORMALIZE_MAP` knows about and renders
+them as a CSV with the same header names the export would have produced.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+from typing import Any
+from urllib.parse import quote, urlencode
+
+from .addresses import NORMALIZE_MAP, normalize_headers
+from .http_retry import ACCEPT_COMPRESSED, FetchStats, stream_with_retry
+
+SHEETS_API_BASE = "https://sheets.googleapis.com/v4/spreadsheets"
+
+_MAPPED_KEYS = frozenset(NORMALIZE_MAP.values())
+
+
+def column_letter(index: int) -> str:
+    """Zero-based column index to A1 notation letters (0 -> A, 26 -> AA)."""
+    letters = ""
+    n = index + 1
+    while n:
+        n, rem = divmod(n - 1, 26)
+        letters = chr(ord("A") + rem) + letters
+    return letters
+
+
+def mapped_columns(header: list[str]) -> list[int]:
+    """Indices of header cells that map onto a label field (first occurrence wins)."""
+    seen: set[str] = set()
+    indices: list[int] = []
+    for i, key in enumerate(normalize_headers(header)):
+        if key in _MAPPED_KEYS and key not in seen:
+            seen.add(key)
+            indices.append(i)
+    return indices
+
+
+def _quote_title(title: str) -> str:
+    return "'" + title.replace("'", "''") + "'"
+
+
+def _get_json(session: Any, url: str, stats: FetchStats | None) -> Any:
+    chunks = stream_with_retry(session, url, timeout=30, stats=stats, headers=ACCEPT_COMPRESSED)
+    return json.loads(b"".join(chunks))
+
+
+def sheet_title(
+    session: Any, spreadsheet_id: str, gid: str, *, stats: FetchStats | None = None
+) -> str:
+    """Resolve a worksheet gid to its title (needed for A1 ranges)."""
+    url = f"{SHEETS_API_BASE}/{spreadsheet_id}?" + urlencode(
+        {"fields": "sheets.properties(sheetId,title)"}
+    )
+    data = _get_json(session, url, stats)
+    for sheet in data.get("sheets", []):
+        props = sheet.get("properties", {})
+        if str(props.get("sheetId")) == gid:
+            return str(props["title"])
+    raise ValueError(f"No worksheet with gid={gid} in spreadsheet {spreadsheet_id}")
+
+
+def fetch_projected_csv(
+    session: Any, spreadsheet_id: str, gid: str, *, stats: FetchStats | None = None
+) -> bytes:
+    """Fetch the header plus mapped columns and return them as CSV bytes."""
+    title = _quote_title(sheet_title(session, spreadsheet_id, gid, stats=stats))
+
+    header_range = quote(f"{title}!1:1", safe="")
+    data = _get_json(session, f"{SHEETS_API_BASE}/{spreadsheet_id}/values/{header_range}", stats)
+    rows = data.get("values") or [[]]
+    header = [str(h) for h in rows[0]]
+    if not header:
+        raise ValueError("Input sheet has no header row")
+
+    indices = mapped_columns(header)
+    if not indices:
+        raise ValueError("No known address columns found in sheet header")
+
+    ranges = [f"{title}!{column_letter(i)}2:{column_letter(i)}" for i in indices]
+    query = urlencode(
+        [("ranges", r) for r in ranges]
+        + [("majorDimension", "COLUMNS"), ("valueRenderOption", "FORMATTED_VALUE")]
+    )
+    data = _get_json(session, f"{SHEETS_API_BASE}/{spreadsheet_id}/values:batchGet?{query}", stats)
+
+    # Each value range holds one column; trailing empty cells are omitted by the API
+    columns: list[list[str]] = []
+    for vr in data.get("valueRanges", []):
+        values = vr.get("values") or [[]]
+        columns.append([str(v) for v in values[0]])
+    columns += [[] for _ in range(len(indices) - len(columns))]
+    n_rows = max((len(c) for c in columns), default=0)
+
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\r\n")
+    writer.writerow([header[i] for i in indices])
+    for r in range(n_rows):
+        writer.writerow([col[r] if r < len(col) else "" for col in columns])
+    return buf.getvalue().encode("utf-8")
@@ -0,0 +1,207 @@
+"""List statistics and country inventory (`newyearscards stats`).
+
+One streaming pass over a raw mailing list or a processed labels CSV (told
+apart by the header). Rows are cut into chunks; each chunk is summarized into
+a `ListStats` (counters only, so partial results merge by addition), and for
+large files the chunks are summarized on a process pool while the file is
+still being read.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from collections.abc import Iterable, Iterator, Mapping
+from concurrent.futures import Future, ProcessPoolExecutor
+import csv
+from dataclasses import dataclass, field
+from itertools import islice
+import os
+from pathlib import Path
+from typing import Any
+
+from .addresses import (
+    LABEL_FIELDS,
+    RAW_FIELDS,
+    TemplateEntry,
+    country_resolution,
+    has_address,
+    iter_csv_rows,
+    iter_transform_rows,
+)
+
+CHUNK_ROWS = 5000
+# Files smaller than this are summarized in-process by default
+PARALLEL_MIN_BYTES = 4 * 1024 * 1024
+LINES = ("Line1", "Line2", "Line3", "Line4", "Line5")
+RESOLUTIONS = ("alias", "canonical", "state", "unresolved", "empty")
+
+
+@dataclass
+class ListStats:
+    """Counters for one chunk or a whole file; `merge` adds another one in."""
+
+    processed: bool = False
+    rows: int = 0
+    # Raw rows without address1/address2/city (dropped by `transform_rows`)
+    skipped: int = 0
+    countries: Counter[str] = field(default_factory=Counter)
+    country_names: dict[str, str] = field(default_factory=dict)
+    resolution: Counter[str] = field(default_factory=Counter)
+    empty: Counter[str] = field(default_factory=Counter)
+    # Length of each non-empty label line -> count, per line
+    line_lengths: dict[str, Counter[int]] = field(
+        default_factory=lambda: {name: Counter() for name in LINES}
+    )
+
+    @property
+    def fields(self) -> tuple[str, ...]:
+        return tuple(LABEL_FIELDS) if self.processed else RAW_FIELDS
+
+    def merge(self, other: ListStats) -> None:
+        self.rows += other.rows
+        self.skipped += other.skipped
+        self.countries.update(other.countries)
+        for code, name in other.country_names.items():
+            self.country_names.setdefault(code, name)
+        self.resolution.update(other.resolution)
+        self.empty.update(other.empty)
+        for name, lengths in other.line_lengths.items():
+            self.line_lengths[name].update(lengths)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "kind": "processed" if self.processed else "raw",
+            "rows": self.rows,
+            "skipped": self.skipped,
+            "countries": [
+                {"code": code, "name": self.country_names.get(code, code), "rows": n}
+                for code, n in self.countries.most_common()
+            ],
+            "resolution": {path: self.resolution[path] for path in RESOLUTIONS},
+            "empty_rate": {
+                f: round(self.empty[f] / self.rows, 4) if self.rows else 0.0 for f in self.fields
+            },
+            "line_lengths": {
+                name: _distribution(lengths) for name, lengths in self.line_lengths.items()
+            },
+        }
+
+    def format(self) -> str:
+        data = self.to_dict()
+        out = [f"{self.rows} {data['kind']} rows"]
+        if not self.processed:
+            out[0] += f", {self.skipped} skipped (no address)"
+        out.append("")
+        out.append(f"Countries ({len(self.countries)}):")
+        for item in data["countries"]:
+            label = item["code"] or "(none)"
+            name = f"  {item['name']}" if item["name"] != item["code"] else ""
+            out.append(f"  {label:<8}{item['rows']:>7}{name}")
+        out.append("")
+        paths = ", ".join(f"{path} {n}" for path, n in data["resolution"].items())
+        out.append(f"Country resolution: {paths}")
+        out.append("")
+        out.append("Empty fields:")
+        for f, rate in data["empty_rate"].items():
+            out.append(f"  {f:<12}{rate:>7.1%}")
+        out.append("")
+        out.append("Line lengths (non-empty):   count   p50   p95   max")
+        for name, dist in data["line_lengths"].items():
+            out.append(
+                f"  {name:<24}{dist['count']:>7}{dist['p50']:>6}{dist['p95']:>6}{dist['max']:>6}"
+            )
+        return "\n".join(out)
+
+
+def _distribution(lengths: Counter[int]) -> dict[str, int]:
+    total = sum(lengths.values())
+    dist = {"count": total, "p50": 0, "p95": 0, "max": max(lengths, default=0)}
+    seen = 0
+    targets = [("p50", 0.5), ("p95", 0.95)]
+    for length in sorted(lengths):
+        seen += lengths[length]
+        while targets and seen >= targets[0][1] * total:
+            dist[targets.pop(0)[0]] = length
+    return dist
+
+
+def chunk_stats(
+    rows: list[dict[str, str]],
+    processed: bool,
+    templates: Mapping[str, TemplateEntry] | None = None,
+) -> ListStats:
+    """Summarize one chunk (runs in a worker process for large files).
+
+    Raw rows are normalized ones (`iter_csv_rows`) and are formatted with
+    `templates` to measure label lines; country counts and resolution paths
+    only cover rows that get a label.
+    """
+    stats = ListStats(processed=processed, rows=len(rows))
+    for row in rows:
+        for f in stats.fields:
+            if not row.get(f):
+                stats.empty[f] += 1
+    if processed:
+        labels: Iterable[dict[str, str]] = rows
+        for row in rows:
+            _count_country(stats, {"country": row.get("Country") or ""})
+    else:
+        kept = [row for row in rows if has_address(row)]
+        stats.skipped = len(rows) - len(kept)
+        for row in kept:
+            _count_country(stats, row)
+        labels = iter_transform_rows(kept, dict(templates or {}))
+    for label in labels:
+        for name in LINES:
+            if value := label.get(name):
+                stats.line_lengths[name][len(value)] += 1
+    return stats
+
+
+def _count_country(stats: ListStats, row: dict[str, str]) -> None:
+    code, display, path = country_resolution(row)
+    stats.countries[code] += 1
+    stats.country_names.setdefault(code, display)
+    stats.resolution[path] += 1
+
+
+def _chunks(rows: Iterator[dict[str, str]], size: int) -> Iterator[list[dict[str, str]]]:
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+def collect_stats(
+    path: Path,
+    templates: Mapping[str, TemplateEntry],
+    *,
+    jobs: int | None = None,
+    chunk_rows: int = CHUNK_ROWS,
+) -> ListStats:
+    """Stats for the CSV at `path` in one pass, on `jobs` processes.
+
+    `jobs=None` picks one (in-process) for files under `PARALLEL_MIN_BYTES`
+    and the CPU count otherwise. At most two chunks per worker are in flight,
+    so memory stays bounded however long the file is.
+    """
+    if jobs is None:
+        jobs = (os.cpu_count() or 1) if path.stat().st_size >= PARALLEL_MIN_BYTES else 1
+    with path.open("r", encoding="utf-8", newline="") as f:
+        processed = next(csv.reader([f.readline()]), [])[: len(LABEL_FIELDS)] == LABEL_FIELDS
+        f.seek(0)
+        rows: Iterator[dict[str, str]] = csv.DictReader(f) if processed else iter_csv_rows(f)
+        total = ListStats(processed=processed)
+        if jobs <= 1:
+            for chunk in _chunks(rows, chunk_rows):
+                total.merge(chunk_stats(chunk, processed, templates))
+            return total
+
+        plain = dict(templates)
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            pending: list[Future[ListStats]] = []
+            for chunk in _chunks(rows, chunk_rows):
+                pending.append(pool.submit(chunk_stats, chunk, processed, plain))
+                if len(pending) >= 2 * jobs:
+                    total.merge(pending.pop(0).result())
+            for fut in pending:
+                total.merge(fut.result())
+        return total
@@ -0,0 +1,206 @@
+"""Local address book: every year's mailing list in one indexed SQLite file.
+
+`newyearscards ingest` loads a downloaded `mailing_list.csv` (normalized
+rows, plus the resolved country code) under its year; re-ingesting a year
+replaces it, other years are kept as history. Rows are inserted in batches,
+one transaction each, under a new generation of the year; one final
+transaction points the `years` entry at it and drops the previous
+generation, so readers see either the old or the new list, and a failed load
+leaves the old one in place. Country code, postal code and name are indexed, so
+`build-labels --from-store`, `--dry-run --country` and `lookup` run queries
+instead of scanning whole CSV files.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator
+from datetime import UTC, datetime
+from itertools import islice
+from pathlib import Path
+import sqlite3
+from types import TracebackType
+
+from .addresses import RAW_FIELDS, infer_country
+
+# Rows per insert transaction during ingest
+BATCH_SIZE = 1000
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS years (
+    year INTEGER PRIMARY KEY,
+    generation INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    ingested_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS addresses (
+    year INTEGER NOT NULL,
+    generation INTEGER NOT NULL,
+    row_no INTEGER NOT NULL,
+    {", ".join(f"{f} TEXT NOT NULL" for f in RAW_FIELDS)},
+    country_code TEXT NOT NULL,
+    PRIMARY KEY (year, generation, row_no)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS addresses_country ON addresses (
+    country_code COLLATE NOCASE, year, generation
+);
+CREATE INDEX IF NOT EXISTS addresses_zip ON addresses (zip, year, generation);
+CREATE INDEX IF NOT EXISTS addresses_name ON addresses (
+    last_name COLLATE NOCASE, first_name COLLATE NOCASE, year, generation
+);
+"""
+
+
+class AddressStore:
+    """The SQLite address book at `path` (created on first use)."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+
+    def __enter__(self) -> AddressStore:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def years(self) -> list[int]:
+        """Years with a completed ingest, oldest first."""
+        return [y for (y,) in self._conn.execute("SELECT year FROM years ORDER BY year")]
+
+    def ingest(
+        self,
+        year: int,
+        rows: Iterable[dict[str, str]],
+        *,
+        source: str = "",
+        batch_size: int = BATCH_SIZE,
+    ) -> int:
+        """Replace `year` with `rows` (normalized, as from `iter_csv_rows`); returns the count.
+
+        If loading fails half-way, the rows loaded so far are removed and the
+        previously ingested list for `year` (if any) stays current.
+        """
+        with self._conn:
+            current = self._conn.execute(
+                "SELECT generation FROM years WHERE year = ?", (year,)
+            ).fetchone()
+            # Leftovers of an earlier load that never finished (e.g. a killed process)
+            self._conn.execute(
+                "DELETE FROM addresses WHERE year = ? AND generation != ?",
+                (year, current[0] if current else -1),
+            )
+        generation = current[0] + 1 if current else 0
+        placeholders = ", ".join("?" * (len(RAW_FIELDS) + 4))
+        sql = f"INSERT INTO addresses VALUES ({placeholders})"
+        count = 0
+        it = iter(rows)
+        try:
+            while batch := list(islice(it, batch_size)):
+                values = []
+                for row in batch:
+                    fields = [row.get(f) or "" for f in RAW_FIELDS]
+                    values.append((year, generation, count, *fields, infer_country(row)[0]))
+                    count += 1
+                with self._conn:
+                    self._conn.executemany(sql, values)
+        except BaseException:
+            with self._conn:
+                self._conn.execute(
+                    "DELETE FROM addresses WHERE year = ? AND generation = ?", (year, generation)
+                )
+            raise
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO years VALUES (?, ?, ?, ?, ?)",
+                (
+                    year,
+                    generation,
+                    source,
+                    count,
+                    datetime.now(UTC).isoformat(timespec="seconds"),
+                ),
+            )
+            self._conn.execute(
+                "DELETE FROM addresses WHERE year = ? AND generation != ?", (year, generation)
+            )
+        return count
+
+    def rows(
+        self,
+        year: int | None = None,
+        *,
+        country: str | None = None,
+        zip_code: str | None = None,
+        name: str | None = None,
+        limit: int | None = None,
+    ) -> Iterator[tuple[int, dict[str, str]]]:
+        """Stream (year, normalized row) pairs matching every filter.
+
+        `country` is a code or any spelling `infer_country` understands;
+        `name` matches a last name, or "first last" exactly (case-insensitive).
+        Rows come in year order, then in their original file order.
+        """
+        sql, params = _select(year, country, zip_code, name, limit)
+        for year_, *values in self._conn.execute(sql, params):
+            yield year_, dict(zip(RAW_FIELDS, values, strict=True))
+
+    def explain(
+        self,
+        year: int | None = None,
+        *,
+        country: str | None = None,
+        zip_code: str | None = None,
+        name: str | None = None,
+    ) -> str:
+        """SQLite's query plan for the same `rows()` call (to check an index is used)."""
+        sql, params = _select(year, country, zip_code, name, None)
+        plan = self._conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        return "\n".join(str(r[-1]) for r in plan)
+
+
+def _select(
+    year: int | None,
+    country: str | None,
+    zip_code: str | None,
+    name: str | None,
+    limit: int | None,
+) -> tuple[str, list[object]]:
+    where = ["(year, generation) IN (SELECT year, generation FROM years)"]
+    params: list[object] = []
+    if year is not None:
+        where.append("year = ?")
+        params.append(year)
+    if country:
+        where.append("country_code = ? COLLATE NOCASE")
+        params.append(infer_country({"country": country})[0])
+    if zip_code:
+        where.append("zip = ?")
+        params.append(zip_code.strip())
+    if name:
+        first, _, last = name.strip().rpartition(" ")
+        where.append("last_name = ? COLLATE NOCASE")
+        params.append(last)
+        if first:
+            where.append("first_name = ? COLLATE NOCASE")
+            params.append(first.strip())
+    sql = (
+        f"SELECT year, {', '.join(RAW_FIELDS)} FROM addresses "
+        f"WHERE {' AND '.join(where)} ORDER BY year, row_no"
+    )
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return sql, params
@@ -0,0 +1,134 @@
+"""Persistent OAuth access-token cache shared across CLI runs.
+
+Tokens live in a small JSON file written with 0600 permissions and are keyed
+by a fingerprint of the service-account key plus the requested scopes, so a
+rotated key or a different scope set never picks up a stale token.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from contextlib import suppress
+from datetime import UTC, datetime, timedelta
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+# Cached tokens are treated as expired this long before their real expiry,
+# so the next run refreshes proactively instead of failing mid-download.
+REFRESH_MARGIN = timedelta(minutes=5)
+
+_DISABLED_VALUES = {"0", "off", "none", "false", "no"}
+
+
+def _utcnow() -> datetime:
+    # google-auth keeps `Credentials.expiry` as a naive UTC datetime
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+def cache_path() -> Path | None:
+    """Return the token cache file, or None when caching is disabled.
+
+    `TOKEN_CACHE` overrides the location (or disables it with `off`);
+    otherwise the file lives under `$XDG_CACHE_HOME/newyearscards/`.
+    """
+    value = os.getenv("TOKEN_CACHE", "").strip()
+    if value.lower() in _DISABLED_VALUES:
+        return None
+    if value:
+        return Path(value).expanduser()
+    base = os.getenv("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(base) / "newyearscards" / "tokens.json"
+
+
+def cache_key(key_path: Path, scopes: Iterable[str]) -> str:
+    """Fingerprint of the key file contents and the (order-independent) scopes."""
+    h = hashlib.sha256()
+    h.update(key_path.read_bytes())
+    h.update(b"\0")
+    h.update(" ".join(sorted(scopes)).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _read(path: Path) -> dict[str, Any]:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _entry_expiry(entry: Any) -> datetime | None:
+    if not isinstance(entry, dict) or not entry.get("token"):
+        return None
+    try:
+        return datetime.fromisoformat(str(entry["expiry"]))
+    except (KeyError, ValueError):
+        return None
+
+
+def load_token(
+    path: Path, key: str, *, now: datetime | None = None
+) -> tuple[str, datetime] | None:
+    """Return `(token, expiry)` if a cached token is still comfortably valid."""
+    entry: Any = _read(path).get(key)
+    expiry = _entry_expiry(entry)
+    if expiry is None or expiry - REFRESH_MARGIN <= (now or _utcnow()):
+        return None
+    return str(entry["token"]), expiry
+
+
+def store_token(
+    path: Path, key: str, token: str, expiry: datetime, *, now: datetime | None = None
+) -> None:
+    """Persist a token atomically, dropping entries that have already expired."""
+    current = now or _utcnow()
+    data: dict[str, Any] = {}
+    for k, entry in _read(path).items():
+        exp = _entry_expiry(entry)
+        if exp is not None and exp > current:
+            data[k] = entry
+    data[key] = {"token": token, "expiry": expiry.isoformat()}
+
+    path.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+    tmp = path.with_name(path.name + ".tmp")
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    # O_CREAT's mode is ignored for a leftover temp file, so enforce it explicitly
+    os.chmod(tmp, 0o600)
+    os.replace(tmp, path)
+
+
+def apply_cached_token(creds: Any, key: str, path: Path | None) -> bool:
+    """Seed `creds` with a cached token so no token exchange is needed.
+
+    Returns True when a cached token was applied. Never raises.
+    """
+    if path is None:
+        return False
+    cached = load_token(path, key)
+    if cached is None:
+        return False
+    try:
+        creds.token, creds.expiry = cached
+    except AttributeError:
+        return False
+    return True
+
+
+def save_credentials_token(creds: Any, key: str, path: Path | None) -> None:
+    """Store the token currently held by `creds`, if any. Never raises."""
+    if path is None:
+        return
+    token = getattr(creds, "token", None)
+    expiry = getattr(creds, "expiry", None)
+    if not token or not isinstance(expiry, datetime):
+        return
+    cached = load_token(path, key)
+    if cached is not None and cached[0] == token:
+        return
+    with suppress(OSError):
+        store_token(path, key, token, expiry)
@@ -0,0 +1,169 @@
+"""`build-labels --watch`: debounced, incremental label rebuilds.
+
+The input CSV and the templates file are polled for changes (mtime and
+size; no extra dependency). A burst of saves is debounced into one rebuild.
+Formatted labels are memoized per row, so a CSV edit re-renders only new or
+changed rows, and a template edit re-renders only rows of the countries
+whose template entry changed (every row that falls back to `default` when
+that entry changes).
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+import sys
+import time
+
+from .addresses import (
+    TemplateEntry,
+    infer_country,
+    iter_csv_rows,
+    iter_transform_rows,
+    load_templates,
+    write_labels,
+)
+from .config import ensure_dir
+
+Stamp = tuple[int, int] | None
+
+
+def _stamp(path: Path) -> Stamp:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def changed_templates(old: dict[str, TemplateEntry], new: dict[str, TemplateEntry]) -> set[str]:
+    """Template keys (country codes or "default") added, removed or edited."""
+    return {k for k in old.keys() | new.keys() if old.get(k) != new.get(k)}
+
+
+@dataclass
+class RebuildResult:
+    rows: int
+    rendered: int
+    seconds: float
+    reason: str
+
+    def summary(self) -> str:
+        return (
+            f"{self.rows} rows, {self.rendered} re-rendered ({self.reason}) "
+            f"in {self.seconds * 1000:.1f} ms"
+        )
+
+
+class IncrementalBuild:
+    """Labels for one input CSV, re-rendering only rows affected by a change."""
+
+    def __init__(self, in_csv: Path, out_csv: Path, templates_path: Path) -> None:
+        self.in_csv = in_csv
+        self.out_csv = out_csv
+        self.templates_path = templates_path
+        self.templates: dict[str, TemplateEntry] = {}
+        self._rows: list[dict[str, str]] = []
+        # Row contents -> (country code, label or None for rows without an address)
+        self._cache: dict[tuple[tuple[str, str], ...], tuple[str, dict[str, str] | None]] = {}
+
+    def rebuild(self, *, csv_changed: bool = True, templates_changed: bool = True) -> RebuildResult:
+        start = time.perf_counter()
+        reasons = []
+        if templates_changed or not self.templates:
+            new = load_templates(self.templates_path)
+            changed = changed_templates(self.templates, new)
+            self.templates = new
+            self._evict(changed)
+            reasons.append(f"templates: {', '.join(sorted(changed)) or 'no change'}")
+        if csv_changed or not self._rows:
+            with self.in_csv.open("r", encoding="utf-8", newline="") as f:
+                self._rows = list(iter_csv_rows(f))
+            reasons.append("input")
+
+        rendered = 0
+        labels: list[dict[str, str]] = []
+        cache: dict[tuple[tuple[str, str], ...], tuple[str, dict[str, str] | None]] = {}
+        for row in self._rows:
+            key = tuple(row.items())
+            hit = cache.get(key) or self._cache.get(key)
+            if hit is None:
+                label = next(iter_transform_rows([row], self.templates), None)
+                hit = (infer_country(row)[0], label)
+                rendered += 1
+            cache[key] = hit
+            if hit[1] is not None:
+                labels.append(hit[1])
+        # Keep only rows still in the input
+        self._cache = cache
+
+        ensure_dir(self.out_csv.parent)
+        part = self.out_csv.with_name(self.out_csv.name + ".part")
+        try:
+            write_labels(labels, part)
+            part.replace(self.out_csv)
+        finally:
+            part.unlink(missing_ok=True)
+        return RebuildResult(
+            rows=len(labels),
+            rendered=rendered,
+            seconds=time.perf_counter() - start,
+            reason="; ".join(reasons),
+        )
+
+    def _evict(self, changed: set[str]) -> None:
+        if not changed:
+            return
+        default_changed = "default" in changed
+        self._cache = {
+            key: (code, label)
+            for key, (code, label) in self._cache.items()
+            if code not in changed and not (default_changed and code not in self.templates)
+        }
+
+
+def watch(
+    build: IncrementalBuild,
+    *,
+    interval: float = 0.5,
+    debounce: float = 0.3,
+    on_rebuild: Callable[[RebuildResult], None] = lambda r: print(r.summary(), flush=True),
+    on_error: Callable[[Exception], None] = lambda e: print(f"Error: {e}", file=sys.stderr),
+    max_rebuilds: int | None = None,
+    sleep: Callable[[float], None] = time.sleep,
+) -> int:
+    """Build once, then rebuild whenever the input or templates settle after a change.
+
+    Runs until interrupted (or `max_rebuilds` builds, counting the first).
+    Returns the number of builds. A failed build (e.g. a half-saved YAML file)
+    is reported and the previous output stays in place; the changes it missed
+    are applied by the next build.
+    """
+    paths = (build.in_csv, build.templates_path)
+    seen = tuple(_stamp(p) for p in paths)
+    builds = 0
+    csv_changed = templates_changed = True
+    while True:
+        try:
+            on_rebuild(build.rebuild(csv_changed=csv_changed, templates_changed=templates_changed))
+            csv_changed = templates_changed = False
+        except Exception as e:
+            on_error(e)
+        builds += 1
+        if max_rebuilds is not None and builds >= max_rebuilds:
+            return builds
+
+        # Wait for a change ...
+        while (current := tuple(_stamp(p) for p in paths)) == seen:
+            sleep(interval)
+        # ... then for the burst of writes to settle
+        while True:
+            sleep(debounce)
+            settled = tuple(_stamp(p) for p in paths)
+            if settled == current:
+                break
+            current = settled
+        csv_changed |= current[0] != seen[0]
+        templates_changed |= current[1] != seen[1]
+        seen = current
@@ -0,0 +1,130 @@
+"""Local stand-in HTTP server and a tiny requests-like session for tests."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass, field
+import gzip
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import time
+from typing import Any
+import urllib.error
+import urllib.request
+
+
+@dataclass
+class StubResponse:
+    status: int = 200
+    body: bytes = b""
+    headers: dict[str, str] = field(default_factory=dict)
+    delay: float = 0.0
+
+
+@dataclass
+class SeenRequest:
+    path: str
+    headers: dict[str, str]
+
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request: Any, client_address: Any) -> None:
+        # Clients in timeout tests hang up early; the broken pipe is expected
+        return None
+
+
+class StubServer:
+    """Serve responses produced by `handler(path)` on an ephemeral local port."""
+
+    def __init__(self, handler: Callable[[str], StubResponse]) -> None:
+        self.handler = handler
+        self.seen: list[SeenRequest] = []
+        outer = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802 - http.server API
+                outer.seen.append(SeenRequest(self.path, dict(self.headers.items())))
+                resp = outer.handler(self.path)
+                if resp.delay:
+                    time.sleep(resp.delay)
+                self.send_response(resp.status)
+                for k, v in resp.headers.items():
+                    self.send_header(k, v)
+                self.send_header("Content-Length", str(len(resp.body)))
+                self.end_headers()
+                self.wfile.write(resp.body)
+
+            def log_message(self, *_args: Any) -> None:
+                return None
+
+        self._server = _QuietServer(("127.0.0.1", 0), _Handler)
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+        )
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> StubServer:
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_exc: Any) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class RawStream:
+    """urllib3-style raw body: `read(n, decode_content=False)` returns wire bytes."""
+
+    def __init__(self, fp: Any) -> None:
+        self._fp = fp
+
+    def read(self, amt: int = -1, decode_content: bool = False) -> bytes:
+        assert decode_content is False
+        return self._fp.read(amt)
+
+    def close(self) -> None:
+        self._fp.close()
+
+
+class UrllibResponse:
+    def __init__(self, status: int, headers: Any, fp: Any) -> None:
+        self.status_code = status
+        self.headers = headers
+        self.raw = RawStream(fp)
+        self._content: bytes | None = None
+
+    @property
+    def content(self) -> bytes:
+        # Like requests, `.content` is transparently decompressed
+        if self._content is None:
+            data = self.raw.read()
+            if (self.headers.get("Content-Encoding") or "").lower() == "gzip":
+                data = gzip.decompress(data)
+            self._content = data
+        return self._content
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise OSError(f"HTTP {self.status_code}")
+
+    def close(self) -> None:
+        self.raw.close()
+
+
+class UrllibSession:
+    """Just enough of `requests.Session.get` for the code under test."""
+
+    def get(self, url: str, timeout: float = 30, headers: dict[str, str] | None = None,
+            **_kwargs: Any) -> UrllibResponse:
+        req = urllib.request.Request(url, headers=headers or {})
+        try:
+            raw = urllib.request.urlopen(req, timeout=timeout)  # noqa: S310 - local test server
+        except urllib.error.HTTPError as err:
+            return UrllibResponse(err.code, err.headers, err)
+        return UrllibResponse(raw.status, raw.headers, raw)
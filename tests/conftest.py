@@ -1,9 +1,141 @@
+import os
 from pathlib import Path
+import random
 import sys
 
+import pytest
+
+from _http_stub import UrllibSession
+
 # Ensure package under src/ is importable
 ROOT = Path(__file__).resolve().parent.parent
 SRC = ROOT / "src"
 if str(SRC) not in sys.path:
     sys.path.insert(0, str(SRC))
 
+
+@pytest.fixture(autouse=True)
+def _isolate_token_cache(monkeypatch):
+    # Never read or write the developer's real OAuth token cache from tests
+    monkeypatch.setenv("TOKEN_CACHE", "off")
+
+
+@pytest.fixture
+def fake_google(tmp_path, monkeypatch):
+    """Stub google-auth so downloads hit a local stand-in server via urllib."""
+    from newyearscards import http_retry
+
+    key = tmp_path / "key.json"
+    key.write_text("{}", encoding="utf-8")
+    monkeypatch.setenv("SERVICE_ACCOUNT_KEY", str(key))
+    monkeypatch.setenv("SHEET_URL", "https://docs.google.com/spreadsheets/d/abc/edit#gid=0")
+    monkeypatch.setattr(http_retry, "_default_limiter", http_retry.TokenBucket(1000, 1000))
+
+    class ModAuthReq:
+        class AuthorizedSession(UrllibSession):
+            def __init__(self, _creds):
+                pass
+
+    class ModOAuth2:
+        class service_account:
+            class Credentials:
+                @classmethod
+                def from_service_account_file(cls, path, scopes):
+                    return object()
+
+    monkeypatch.setitem(sys.modules, "google.auth.transport.requests", ModAuthReq())
+    monkeypatch.setitem(sys.modules, "google.oauth2", ModOAuth2())
+
+
+FAKE_AGE = '''#!{python}
+"""Reversible stand-in for the age CLI (encrypt: header + XOR; decrypt: inverse)."""
+import json
+import os
+import sys
+
+MAGIC = b"FAKEAGE1\\n"
+args = sys.argv[1:]
+log = os.environ.get("FAKE_AGE_LOG")
+if log:
+    with open(log, "a", encoding="utf-8") as f:
+        f.write(json.dumps(args) + "\\n")
+out = identity = src = None
+decrypt = False
+i = 0
+while i < len(args):
+    a = args[i]
+    if a in ("-r", "-o", "-i"):
+        if a == "-o":
+            out = args[i + 1]
+        elif a == "-i":
+            identity = args[i + 1]
+        i += 2
+        continue
+    if a == "-d":
+        decrypt = True
+    else:
+        src = a
+    i += 1
+data = open(src, "rb").read() if src else sys.stdin.buffer.read()
+if os.environ.get("FAKE_AGE_FAIL"):
+    sys.exit(1)
+if decrypt:
+    if identity is None or not os.path.exists(identity) or not data.startswith(MAGIC):
+        sys.stderr.write("fake age: cannot decrypt\\n")
+        sys.exit(1)
+    data = bytes(b ^ 0x5A for b in data[len(MAGIC):])
+else:
+    data = MAGIC + bytes(b ^ 0x5A for b in data)
+if out:
+    with open(out, "wb") as f:
+        f.write(data)
+else:
+    sys.stdout.buffer.write(data)
+'''
+
+
+@pytest.fixture
+def fake_age(tmp_path_factory, monkeypatch):
+    """Put a reversible fake `age` executable on PATH; returns the argv log path."""
+    bin_dir = tmp_path_factory.mktemp("fakebin")
+    exe = bin_dir / "age"
+    exe.write_text(FAKE_AGE.replace("{python}", sys.executable), encoding="utf-8")
+    exe.chmod(0o755)
+    log = bin_dir / "age-calls.jsonl"
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}")
+    monkeypatch.setenv("FAKE_AGE_LOG", str(log))
+    identity = bin_dir / "identity.agekey"
+    identity.write_text("AGE-SECRET-KEY-FAKE\n", encoding="utf-8")
+    monkeypatch.setenv("AGE_IDENTITY", str(identity))
+    return log
+
+
+def decrypt_fake(path: Path) -> bytes:
+    """Decode a file written by the `fake_age` stand-in (inverse of its XOR)."""
+    data = path.read_bytes()
+    assert data.startswith(b"FAKEAGE1\n")
+    return bytes(b ^ 0x5A for b in data[len(b"FAKEAGE1\n") :])
+
+
+@pytest.fixture
+def backup_tree(tmp_path):
+    """Raw and processed data dirs under `tmp_path` for backup tests; returns the two sources.
+
+    raw/2023 is a compressible 10 kB list with a fixed mtime, raw/2024 300 kB of noise (several
+    content-defined chunks, also with a fixed mtime), raw/2025 a tiny `0640` file, and
+    processed/ holds one label CSV plus an empty directory.
+    """
+    raw = tmp_path / "data" / "raw"
+    proc = tmp_path / "data" / "processed"
+    for year in (2023, 2024, 2025):
+        (raw / str(year)).mkdir(parents=True)
+    (proc / "2024").mkdir(parents=True)
+    (proc / "empty").mkdir(parents=True)
+    (raw / "2023" / "mailing_list.csv").write_text("year,2023\n" * 1000, encoding="utf-8")
+    (raw / "2024" / "mailing_list.csv").write_bytes(random.Random(7).randbytes(300_000))
+    (raw / "2025" / "mailing_list.csv").write_text("a,b\n1,2\n", encoding="utf-8")
+    os.chmod(raw / "2025" / "mailing_list.csv", 0o640)
+    (proc / "2024" / "labels_for_mailmerge.csv").write_text("x,y\n", encoding="utf-8")
+    for year in (2023, 2024):
+        os.utime(raw / str(year) / "mailing_list.csv", (1_600_000_000, 1_600_000_000))
+    return [raw, proc]
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+from pathlib import Path
+
+import pytest
+
+from _http_stub import StubResponse, StubServer
+from newyearscards import aio, http_retry, sheets
+from newyearscards.addresses import LabelBuilder, build_labels
+from newyearscards.http_retry import FetchStats, TokenBucket
+
+ROOT = Path(__file__).resolve().parent.parent
+HEADER = "First Name,Last Name,Address 1,City,Zip Code,Country\n"
+ROW = "Frank,Prager,Satower Str. 26,Stäbelow,18198,Germany\n"
+
+
+class FakeCreds:
+    valid = True
+    token = "tok"
+
+
+@pytest.fixture
+def sheet_env(tmp_path, monkeypatch):  # type: ignore[no-untyped-def]
+    pytest.importorskip("httpx")
+    monkeypatch.setenv("SHEET_URL", "https://docs.google.com/spreadsheets/d/abc/edit#gid=7")
+    monkeypatch.setenv("TOKEN_CACHE", "off")
+    monkeypatch.setattr(sheets, "load_credentials", lambda _key: (FakeCreds(), "k", None))
+    monkeypatch.setattr(http_retry, "_default_limiter", TokenBucket(rate=1000, capacity=1000))
+    return tmp_path
+
+
+def test_download_retries_and_decodes(sheet_env, monkeypatch):
+    body = (HEADER + ROW * 20).encode("utf-8")
+    responses = [
+        StubResponse(503, headers={"Retry-After": "0"}),
+        StubResponse(200, gzip.compress(body), {"Content-Encoding": "gzip"}),
+    ]
+    with StubServer(lambda _p: responses.pop(0)) as srv:
+        monkeypatch.setattr(sheets, "EXPORT_BASE", srv.url)
+        stats = FetchStats()
+        out = sheet_env / "raw.csv"
+        path = asyncio.run(aio.download_sheet_async(2025, out_path=out, stats=stats))
+
+    assert path == out and out.read_bytes() == body
+    assert srv.seen[-1].path == "/abc/export?format=csv&gid=7"
+    assert srv.seen[-1].headers["Authorization"] == "Bearer tok"
+    assert stats.attempts == 2 and stats.body_bytes == len(body) > stats.wire_bytes
+
+
+def test_download_timeout_leaves_no_partial_file(sheet_env, monkeypatch):
+    with StubServer(lambda _p: StubResponse(200, b"a,b\n", delay=2.0)) as srv:
+        monkeypatch.setattr(sheets, "EXPORT_BASE", srv.url)
+        out = sheet_env / "raw.csv"
+
+        async def run() -> None:
+            async with asyncio.timeout(0.3):
+                await aio.download_sheet_async(2025, out_path=out)
+
+        with pytest.raises(TimeoutError):
+            asyncio.run(run())
+    assert list(sheet_env.glob("raw.csv*")) == []
+
+
+def test_build_matches_sync_and_yields_between_batches(tmp_path, monkeypatch):
+    monkeypatch.setenv("ADDRESS_TEMPLATES", str(ROOT / "config" / "address_formats.yml"))
+    in_csv = tmp_path / "mailing_list.csv"
+    in_csv.write_text(HEADER + ROW * 7, encoding="utf-8")
+    expected = build_labels(in_csv, tmp_path / "sync.csv").read_text(encoding="utf-8")
+
+    ticks = 0
+
+    async def ticker() -> None:
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0)
+
+    async def run() -> Path:
+        task = asyncio.create_task(ticker())
+        try:
+            return await aio.build_labels_async(in_csv, tmp_path / "async.csv", batch_size=2)
+        finally:
+            task.cancel()
+
+    out = asyncio.run(run())
+    assert out.read_text(encoding="utf-8") == expected
+    assert ticks >= 4
+
+
+def test_build_rejects_empty_batches(tmp_path):
+    in_csv = tmp_path / "mailing_list.csv"
+    in_csv.write_text(HEADER + ROW, encoding="utf-8")
+    builder = LabelBuilder(ROOT / "config" / "address_formats.yml")
+    for size in (0, -1):
+        out = tmp_path / "out.csv"
+        coro = aio.build_labels_async(in_csv, out, builder=builder, batch_size=size)
+        with pytest.raises(ValueError, match="batch_size"):
+            asyncio.run(asyncio.wait_for(coro, 2))
+    assert not list(tmp_path.glob("out.csv*"))
+
+
+def test_build_cancellation_removes_partial_output(tmp_path):
+    in_csv = tmp_path / "mailing_list.csv"
+    in_csv.write_text(HEADER + ROW * 50_000, encoding="utf-8")
+    out = tmp_path / "labels.csv"
+    builder = LabelBuilder(ROOT / "config" / "address_formats.yml")
+
+    async def run() -> None:
+        task = asyncio.create_task(
+            aio.build_labels_async(in_csv, out, builder=builder, batch_size=100)
+        )
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await task
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(run())
+    assert not out.exists()
+    assert not out.with_name(out.name + ".part").exists()
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import fcntl
+from pathlib import Path
+import sys
+import time
+import types
+
+import pytest
+
+from newyearscards import backup_queue, cli as cli_mod
+
+
+def _fake_sheets(monkeypatch: pytest.MonkeyPatch) -> None:
+    fake = types.ModuleType("newyearscards.sheets")
+
+    def fake_download_sheet(year: int, *, out_path=None, **_kwargs):  # type: ignore[no-untyped-def]
+        out_path = Path("data/raw") / str(year) / "mailing_list.csv"
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        out_path.write_text("a,b\n1,2\n", encoding="utf-8")
+        return out_path
+
+    fake.download_sheet = fake_download_sheet  # type: ignore[attr-defined]
+    monkeypatch.setitem(sys.modules, "newyearscards.sheets", fake)
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch, fake_age):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("RAW_DATA_DIR", str(tmp_path / "data" / "raw"))
+    monkeypatch.setenv("PROCESSED_DATA_DIR", str(tmp_path / "data" / "processed"))
+    monkeypatch.setenv("AGE_RECIPIENT", "age1abc")
+    _fake_sheets(monkeypatch)
+    return tmp_path
+
+
+def test_dispatch_mode(monkeypatch):
+    monkeypatch.delenv("BACKUP_DISPATCH", raising=False)
+    assert backup_queue.dispatch_mode() == "sync"
+    monkeypatch.setenv("BACKUP_DISPATCH", "Queue")
+    assert backup_queue.dispatch_mode() == "queue"
+    assert backup_queue.dispatch_mode("off") == "off"
+    with pytest.raises(ValueError):
+        backup_queue.dispatch_mode("later")
+
+
+def test_queue_drains_once_per_year(tmp_path):
+    for year in (2024, 2025, 2024):
+        backup_queue.enqueue(tmp_path, year)
+    with backup_queue.worker_claim(tmp_path) as claim:
+        assert backup_queue.drain(tmp_path, claim) == [2024, 2025]
+        assert backup_queue.drain(tmp_path, claim) == []
+        # Our own claim is held, so nothing is taken back
+        assert backup_queue.recover(tmp_path) == 0
+        backup_queue.finish(claim, 2024)
+        backup_queue.finish(claim, 2025)
+    assert not list(tmp_path.glob(backup_queue.CLAIM_GLOB))
+
+
+def test_claim_unlinked_before_locking_is_recreated(tmp_path, monkeypatch):
+    real_flock = fcntl.flock
+    raced = []
+
+    def racing_flock(f, op):  # type: ignore[no-untyped-def]
+        # Another worker's `recover` removes the empty file before we lock it
+        if op == fcntl.LOCK_EX and "claimed-" in f.name and not raced:
+            raced.append(f.name)
+            Path(f.name).unlink()
+        return real_flock(f, op)
+
+    monkeypatch.setattr(fcntl, "flock", racing_flock)
+    backup_queue.enqueue(tmp_path, 2025)
+    with backup_queue.worker_claim(tmp_path) as claim:
+        assert raced and claim.exists()
+        assert backup_queue.drain(tmp_path, claim) == [2025]
+        # The claim is locked, so the job is not handed out again
+        assert backup_queue.recover(tmp_path) == 0
+        assert backup_queue.drain(tmp_path, claim) == []
+        backup_queue.finish(claim, 2025)
+    assert not claim.exists()
+
+
+def test_jobs_of_a_killed_worker_are_requeued(tmp_path):
+    for year in (2024, 2025):
+        backup_queue.enqueue(tmp_path, year)
+    # A worker that claimed both jobs and died before finishing 2025
+    dead = tmp_path / "claimed-1.jsonl"
+    assert backup_queue.drain(tmp_path, dead) == [2024, 2025]
+    backup_queue.finish(dead, 2024)
+    backup_queue.enqueue(tmp_path, 2023)
+
+    assert backup_queue.recover(tmp_path) == 1
+    assert not dead.exists()
+    with backup_queue.worker_claim(tmp_path) as claim:
+        assert backup_queue.drain(tmp_path, claim) == [2025, 2023]
+
+
+def test_year_lock_is_exclusive(tmp_path):
+    with backup_queue.year_lock(tmp_path, 2025):
+        with (tmp_path / "locks" / "2025.lock").open("a") as other, pytest.raises(BlockingIOError):
+            fcntl.flock(other, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        # Other years are independent
+        with backup_queue.year_lock(tmp_path, 2024):
+            pass
+
+
+def test_download_queues_and_worker_processes(workdir, capsys):
+    assert cli_mod.main(["download", "--year", "2025", "--backup", "queue"]) == 0
+    assert "Queued backup for 2025" in capsys.readouterr().out
+    assert not (workdir / "backups" / "2025").exists()
+
+    assert cli_mod.main(["backup-worker", "--once"]) == 0
+    assert len(list((workdir / "backups" / "2025").glob("*.tgz.age"))) == 1
+    log = (workdir / "backups" / "backup.log").read_text(encoding="utf-8")
+    assert "backup year=2025 started" in log
+    assert "Encrypted backup: backups/2025/" in log
+    assert "backup year=2025 finished" in log
+
+
+def test_download_detach_returns_before_backup(workdir, capsys):
+    assert cli_mod.main(["download", "--year", "2025", "--backup", "detach"]) == 0
+    assert "running in background" in capsys.readouterr().out
+
+    log = workdir / "backups" / "backup.log"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if log.exists() and "finished" in log.read_text(encoding="utf-8"):
+            break
+        time.sleep(0.05)
+    assert "backup year=2025 finished" in log.read_text(encoding="utf-8")
+    assert len(list((workdir / "backups" / "2025").glob("*.tgz.age"))) == 1
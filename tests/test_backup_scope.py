@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import io
+from pathlib import Path
+import tarfile
+
+from conftest import decrypt_fake
+from newyearscards import backup, backup_queue, catalog, cli as cli_mod
+
+
+def _names(archive: Path) -> set[str]:
+    with tarfile.open(fileobj=io.BytesIO(decrypt_fake(archive)), mode="r:gz") as tar:
+        return set(tar.getnames())
+
+
+def _setup(tmp_path, monkeypatch) -> None:  # type: ignore[no-untyped-def]
+    monkeypatch.chdir(tmp_path)
+    for kind in ("raw", "processed"):
+        for year in (2024, 2025):
+            d = tmp_path / "data" / kind / str(year)
+            d.mkdir(parents=True)
+            (d / f"{kind}.csv").write_text("a,b\n", encoding="utf-8")
+    monkeypatch.setenv("RAW_DATA_DIR", str(tmp_path / "data" / "raw"))
+    monkeypatch.setenv("PROCESSED_DATA_DIR", str(tmp_path / "data" / "processed"))
+    monkeypatch.setenv("AGE_RECIPIENT", "age1abc")
+    monkeypatch.setenv("BACKUP_SCOPE", "year")
+
+
+def test_walk_sources_only(tmp_path):
+    (tmp_path / "raw" / "2024").mkdir(parents=True)
+    (tmp_path / "raw" / "2025" / "sub").mkdir(parents=True)
+    (tmp_path / "raw" / "2025" / "sub" / "f.csv").write_text("x")
+    names = [n for n, _ in backup.walk_sources([tmp_path / "raw"], only="2025")]
+    assert names == ["raw", "raw/2025", "raw/2025/sub", "raw/2025/sub/f.csv"]
+    assert [n for n, _ in backup.walk_sources([tmp_path / "raw"], only="1999")] == ["raw"]
+
+
+def test_year_scope_with_periodic_full_backup(tmp_path, monkeypatch, fake_age):
+    _setup(tmp_path, monkeypatch)
+
+    # No full backup yet: the first run archives every year under backups/full/
+    cli_mod._attempt_encrypted_backup(2025)
+    (full,) = (tmp_path / "backups" / "full").glob("*.tgz.age")
+    assert "raw/2024/raw.csv" in _names(full)
+
+    cli_mod._attempt_encrypted_backup(2025)
+    (scoped,) = (tmp_path / "backups" / "2025").glob("*.tgz.age")
+    assert _names(scoped) == {
+        "raw",
+        "raw/2025",
+        "raw/2025/raw.csv",
+        "processed",
+        "processed/2025",
+        "processed/2025/processed.csv",
+    }
+
+    entries = catalog.read_catalog(tmp_path / "backups")
+    assert [(e.scope, e.year) for e in entries] == [("all", None), ("year", 2025)]
+
+
+def test_periodic_full_can_be_disabled(tmp_path, monkeypatch, fake_age):
+    _setup(tmp_path, monkeypatch)
+    monkeypatch.setenv("BACKUP_FULL_EVERY_DAYS", "0")
+
+    cli_mod._attempt_encrypted_backup(2024)
+
+    assert not (tmp_path / "backups" / "full").exists()
+    (scoped,) = (tmp_path / "backups" / "2024").glob("*.tgz.age")
+    assert "raw/2025/raw.csv" not in _names(scoped)
+
+
+def test_full_backup_takes_all_years_lock(tmp_path, monkeypatch, fake_age, capsys):
+    _setup(tmp_path, monkeypatch)
+    monkeypatch.setenv("BACKUP_FULL_EVERY_DAYS", "soon")
+    locked: list[int | None] = []
+    original = backup_queue.year_lock
+
+    def spy(root, year):  # type: ignore[no-untyped-def]
+        locked.append(year)
+        return original(root, year)
+
+    monkeypatch.setattr(backup_queue, "year_lock", spy)
+
+    # A bad interval falls back to the default instead of failing the download
+    cli_mod._attempt_encrypted_backup(2025)
+    assert "invalid BACKUP_FULL_EVERY_DAYS='soon'" in capsys.readouterr().err
+    assert len(list((tmp_path / "backups" / "full").glob("*.tgz.age"))) == 1
+    cli_mod._attempt_encrypted_backup(2025)
+    assert locked == [None, 2025]
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from newyearscards import addresses, batch, cli as cli_mod
+from newyearscards.batch import parse_years
+
+ROOT = Path(__file__).resolve().parent.parent
+HEADER = "First Name,Last Name,Address 1,City,Zip Code,Country\n"
+
+
+def _years(tmp_path, monkeypatch, years):  # type: ignore[no-untyped-def]
+    monkeypatch.setenv("RAW_DATA_DIR", str(tmp_path / "raw"))
+    monkeypatch.setenv("PROCESSED_DATA_DIR", str(tmp_path / "processed"))
+    monkeypatch.setenv("ADDRESS_TEMPLATES", str(ROOT / "config" / "address_formats.yml"))
+    for year, rows in years.items():
+        d = tmp_path / "raw" / str(year)
+        d.mkdir(parents=True)
+        body = "".join(f"P{i},L,Street {i},Berlin,10115,Germany\n" for i in range(rows))
+        (d / "mailing_list.csv").write_text(HEADER + body, encoding="utf-8")
+    (tmp_path / "raw" / "notes").mkdir()
+
+
+def test_parse_years():
+    assert parse_years("2019-2021,2024, 2020") == [2019, 2020, 2021, 2024]
+    for bad in ("2025-2019", "20x5", ","):
+        with pytest.raises(ValueError):
+            parse_years(bad)
+
+
+def test_all_years_loads_templates_once(tmp_path, monkeypatch, capsys):
+    _years(tmp_path, monkeypatch, {2023: 2, 2024: 3, 2025: 1})
+    loads = []
+    real = addresses.load_templates
+    monkeypatch.setattr(addresses, "load_templates", lambda p: loads.append(p) or real(p))
+
+    assert cli_mod.main(["build-labels", "--all-years", "--jobs", "2"]) == 0
+
+    assert len(loads) == 1
+    out = capsys.readouterr().out.splitlines()
+    assert [line.split(":")[0] for line in out[:3]] == ["2023", "2024", "2025"]
+    assert "3 rows in" in out[1] and out[-1].startswith("Built 3 of 3 year(s)")
+    labels = tmp_path / "processed" / "2024" / "labels_for_mailmerge.csv"
+    assert len(labels.read_text(encoding="utf-8").splitlines()) == 4
+
+
+def test_years_range_reports_missing_year(tmp_path, monkeypatch, capsys):
+    _years(tmp_path, monkeypatch, {2024: 1})
+    assert cli_mod.main(["build-labels", "--years", "2023-2024"]) == 2
+    captured = capsys.readouterr()
+    assert "2023: failed: input CSV not found" in captured.err
+    assert "Built 1 of 2 year(s)" in captured.out
+    assert cli_mod.main(["build-labels", "--years", "2024", "--year", "2024"]) == 2
+    for jobs in ("0", "-1"):
+        assert cli_mod.main(["build-labels", "--years", "2024", "--jobs", jobs]) == 2
+        assert "--jobs must be at least 1" in capsys.readouterr().err
+
+
+def test_failed_write_keeps_previous_labels(tmp_path, monkeypatch, capsys):
+    _years(tmp_path, monkeypatch, {2024: 2})
+    labels = tmp_path / "processed" / "2024" / "labels_for_mailmerge.csv"
+    labels.parent.mkdir(parents=True)
+    labels.write_text("previous", encoding="utf-8")
+
+    def failing_write(rows, path):  # type: ignore[no-untyped-def]
+        path.write_text("partial", encoding="utf-8")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(batch, "write_labels", failing_write)
+    assert cli_mod.main(["build-labels", "--years", "2024"]) == 2
+    assert "2024: failed: disk full" in capsys.readouterr().err
+    assert labels.read_text(encoding="utf-8") == "previous"
+    assert list(labels.parent.iterdir()) == [labels]
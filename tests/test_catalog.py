@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+from datetime import datetime
+import hashlib
+import json
+from pathlib import Path
+import threading
+
+import pytest
+
+from newyearscards import catalog, cli as cli_mod
+
+
+def _entry(archive: str, created: str, year: int | None = 2025) -> catalog.CatalogEntry:
+    return catalog.CatalogEntry(archive, year, created, 10, "gzip", "")
+
+
+def _seed(root: Path, entries: list[catalog.CatalogEntry]) -> None:
+    for e in entries:
+        (root / e.archive).parent.mkdir(parents=True, exist_ok=True)
+        (root / e.archive).write_bytes(b"x")
+    catalog._write_catalog(root, entries)
+
+
+def test_select_kept_policies_are_a_union():
+    entries = [
+        _entry("a", "2023-06-01T10:00:00"),
+        _entry("b", "2024-12-30T09:00:00"),
+        _entry("c", "2024-12-31T09:00:00"),
+        _entry("d", "2024-12-31T18:00:00"),
+        _entry("e", "2025-01-01T08:00:00"),
+    ]
+    assert catalog.select_kept(entries, keep_last=2) == {"e", "d"}
+    # Newest of each of the last 2 days with backups
+    assert catalog.select_kept(entries, keep_daily=2) == {"e", "d"}
+    assert catalog.select_kept(entries, keep_yearly=3) == {"e", "d", "a"}
+    assert catalog.select_kept(entries, keep_last=1, keep_daily=3) == {"e", "d", "b"}
+
+
+def test_prune_per_year_and_untracked_files_survive(tmp_path):
+    entries = [
+        _entry("2024/old.tgz.age", "2024-01-01T00:00:00", 2024),
+        _entry("2024/new.tgz.age", "2024-02-01T00:00:00", 2024),
+        _entry("2025/old.tgz.age", "2025-01-01T00:00:00", 2025),
+        _entry("2025/new.tgz.age", "2025-02-01T00:00:00", 2025),
+    ]
+    _seed(tmp_path, entries)
+    (tmp_path / "2025" / "untracked.tgz.age").write_bytes(b"x")
+
+    dry = catalog.prune(tmp_path, keep_last=1, dry_run=True)
+    assert {e.archive for e in dry} == {"2024/old.tgz.age", "2025/old.tgz.age"}
+    assert (tmp_path / "2024" / "old.tgz.age").exists()
+
+    removed = catalog.prune(tmp_path, keep_last=1, year=2025)
+    assert [e.archive for e in removed] == ["2025/old.tgz.age"]
+    assert not (tmp_path / "2025" / "old.tgz.age").exists()
+    assert (tmp_path / "2025" / "untracked.tgz.age").exists()
+    assert [e.archive for e in catalog.read_catalog(tmp_path)] == [
+        "2024/old.tgz.age",
+        "2024/new.tgz.age",
+        "2025/new.tgz.age",
+    ]
+
+    with pytest.raises(ValueError, match="retention policy"):
+        catalog.prune(tmp_path)
+
+
+def test_backup_is_catalogued_and_searchable(tmp_path, monkeypatch, fake_age, capsys):
+    monkeypatch.chdir(tmp_path)
+    raw = tmp_path / "data" / "raw" / "2025"
+    raw.mkdir(parents=True)
+    (raw / "mailing_list.csv").write_text("a,b\n1,2\n", encoding="utf-8")
+    monkeypatch.setenv("RAW_DATA_DIR", str(tmp_path / "data" / "raw"))
+    monkeypatch.setenv("PROCESSED_DATA_DIR", str(tmp_path / "data" / "processed"))
+    monkeypatch.setenv("AGE_RECIPIENT", "age1abc")
+
+    cli_mod._attempt_encrypted_backup(2025)
+
+    (entry,) = catalog.read_catalog(tmp_path / "backups")
+    (archive,) = (tmp_path / "backups" / "2025").glob("*.tgz.age")
+    assert entry.archive == f"2025/{archive.name}"
+    assert entry.year == 2025 and entry.size == archive.stat().st_size
+    datetime.fromisoformat(entry.created)
+    # The file list is not readable from the plaintext catalog
+    assert "mailing_list" not in (tmp_path / "backups" / "catalog.jsonl").read_text()
+
+    details = catalog.read_details(entry, fake_age.parent / "identity.agekey")
+    (f,) = details["files"]
+    assert f["path"] == "raw/2025/mailing_list.csv" and f["size"] == 8
+    assert f["sha256"] == hashlib.sha256(b"a,b\n1,2\n").hexdigest()
+    assert set(details["sources"]) == {"raw"}
+
+    capsys.readouterr()
+    assert cli_mod.main(["backups", "list", "--contains", "mailing_list"]) == 0
+    out = capsys.readouterr().out
+    assert archive.name in out and "raw/2025/mailing_list.csv" in out
+
+    assert cli_mod.main(["backups", "list", "--contains", "nope"]) == 0
+    assert archive.name not in capsys.readouterr().out
+
+    assert cli_mod.main(["backups", "prune", "--keep-last", "1"]) == 0
+    assert "Removed 0 backup(s)." in capsys.readouterr().out
+    assert json.loads((tmp_path / "backups" / "catalog.jsonl").read_text())["year"] == 2025
+
+
+def test_backup_recorded_during_prune_is_kept(tmp_path, monkeypatch, fake_age):
+    _seed(tmp_path, [_entry("2025/old.tgz.age", "2025-01-01T00:00:00")])
+    archive = tmp_path / "2025" / "new.tgz.age"
+    archive.write_bytes(b"x")
+
+    def record() -> None:
+        catalog.record_backup(
+            tmp_path, archive, [], [], ["age1abc"], year=2025,
+            created=datetime(2025, 2, 1), compression="gzip",
+        )
+
+    writer = threading.Thread(target=record)
+    real_read = catalog.read_catalog
+
+    def read_then_race(root):  # type: ignore[no-untyped-def]
+        entries = real_read(root)
+        # A backup finishing between prune's read and its rewrite has to wait
+        writer.start()
+        writer.join(0.3)
+        assert writer.is_alive()
+        return entries
+
+    monkeypatch.setattr(catalog, "read_catalog", read_then_race)
+    removed = catalog.prune(tmp_path, keep_last=1)
+    writer.join(5)
+    monkeypatch.setattr(catalog, "read_catalog", real_read)
+
+    assert removed == []
+    assert [e.archive for e in catalog.read_catalog(tmp_path)] == [
+        "2025/old.tgz.age",
+        "2025/new.tgz.age",
+    ]
+
+
+def test_record_backup_uses_archive_time_checksums(tmp_path, fake_age):
+    # The sources are not read again: what was hashed while archiving is recorded
+    archive = tmp_path / "a.tgz.age"
+    archive.write_bytes(b"x")
+    files = [{"path": "raw/x.csv", "size": 3, "sha256": "ab" * 32}]
+    entry = catalog.record_backup(
+        tmp_path,
+        archive,
+        files,
+        [tmp_path / "raw"],
+        ["age1abc"],
+        year=None,
+        created=datetime(2025, 1, 1),
+        compression="gzip",
+    )
+    details = catalog.read_details(entry, fake_age.parent / "identity.agekey")
+    assert details["files"] == files
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+import random
+
+import pytest
+
+from newyearscards import backup, chunkstore, cli as cli_mod
+
+KEY = b"k" * 32
+
+
+def test_chunk_spans_cover_data_and_are_content_defined():
+    data = random.Random(1).randbytes(600_000)
+    spans = list(chunkstore.chunk_spans(data))
+    assert spans[0][0] == 0 and spans[-1][1] == len(data)
+    assert all(a == prev_b for (a, _), (_, prev_b) in zip(spans[1:], spans, strict=False))
+    assert all(b - a <= chunkstore.MAX_CHUNK for a, b in spans)
+
+    # Inserting bytes up front only disturbs the chunks around the edit
+    shifted = b"inserted" + data
+    before = {data[a:b] for a, b in spans}
+    after = {shifted[a:b] for a, b in chunkstore.chunk_spans(shifted)}
+    assert len(before & after) >= len(before) - 2
+
+
+def test_unchanged_data_costs_only_a_manifest(tmp_path, backup_tree, fake_age):
+    sources = backup_tree
+    store = tmp_path / "backups" / "store"
+
+    first = chunkstore.create_snapshot(sources, store, ["age1x"], key=KEY)
+    assert first.new_chunks == first.chunks > 1
+    packs = list((store / "packs").iterdir())
+
+    second = chunkstore.create_snapshot(sources, store, ["age1x"], key=KEY)
+    assert second.new_chunks == 0
+    assert second.bytes_new == 0
+    assert list((store / "packs").iterdir()) == packs
+    assert len(list((store / "snapshots").iterdir())) == 2
+
+
+def test_small_edit_stores_few_new_chunks(tmp_path, backup_tree, fake_age):
+    sources = backup_tree
+    store = tmp_path / "store"
+    first = chunkstore.create_snapshot(sources, store, ["age1x"], key=KEY)
+
+    big = tmp_path / "data" / "raw" / "2024" / "mailing_list.csv"
+    data = bytearray(big.read_bytes())
+    data[150_000:150_010] = b"0123456789"
+    big.write_bytes(bytes(data))
+
+    second = chunkstore.create_snapshot(sources, store, ["age1x"], key=KEY)
+    assert 0 < second.new_chunks <= 3
+    assert second.bytes_new < first.bytes_new / 2
+
+
+def test_restore_reproduces_exact_tree(tmp_path, backup_tree, fake_age):
+    sources = backup_tree
+    store = tmp_path / "store"
+    result = chunkstore.create_snapshot(sources, store, ["age1x"], key=KEY)
+    # A second, deduplicated run must not disturb restoring it
+    chunkstore.create_snapshot(sources, store, ["age1x"], key=KEY)
+    snap = result.path
+
+    out = tmp_path / "restored"
+    identity = Path(os.environ["AGE_IDENTITY"])
+    assert chunkstore.restore_snapshot(snap, identity, out) == 4
+
+    for src in sources:
+        for path in src.rglob("*"):
+            twin = out / src.name / path.relative_to(src)
+            assert twin.exists(), twin
+            if path.is_file():
+                assert twin.read_bytes() == path.read_bytes()
+                assert twin.stat().st_mode == path.stat().st_mode
+    restored_big = out / "raw" / "2024" / "mailing_list.csv"
+    assert restored_big.stat().st_mtime == 1_600_000_000
+    assert (out / "processed" / "empty").is_dir()
+
+
+def test_restore_keeps_few_packs_decrypted(tmp_path, backup_tree, monkeypatch, fake_age):
+    sources = backup_tree
+    store = tmp_path / "store"
+    # One pack per chunk, and room for a single decrypted pack during restore
+    monkeypatch.setattr(chunkstore, "PACK_TARGET_SIZE", 1)
+    monkeypatch.setattr(chunkstore, "PACK_CACHE_SIZE", 1)
+    result = chunkstore.create_snapshot(sources, store, ["age1x"], key=KEY)
+    assert len(list((store / "packs").iterdir())) == result.chunks > 2
+    assert chunkstore.is_snapshot(result.path)
+    assert not chunkstore.is_snapshot(store / "index.jsonl")
+
+    decrypted = []
+    real = chunkstore.age_decrypt_bytes
+
+    def counting(data, identity):  # type: ignore[no-untyped-def]
+        decrypted.append(len(data))
+        return real(data, identity)
+
+    monkeypatch.setattr(chunkstore, "age_decrypt_bytes", counting)
+    out = tmp_path / "restored"
+    assert chunkstore.restore_snapshot(result.path, Path(os.environ["AGE_IDENTITY"]), out) == 4
+    # The manifest plus each pack once: files are packed in the order they are restored
+    assert len(decrypted) == 1 + result.chunks
+    big = tmp_path / "data" / "raw" / "2024" / "mailing_list.csv"
+    assert (out / "raw" / "2024" / "mailing_list.csv").read_bytes() == big.read_bytes()
+
+
+def test_store_holds_no_plaintext(tmp_path, backup_tree, fake_age):
+    sources = backup_tree
+    store = tmp_path / "store"
+    chunkstore.create_snapshot(sources, store, ["age1x"], key=KEY)
+    blob = b"".join(p.read_bytes() for p in store.rglob("*") if p.is_file())
+    assert b"mailing_list" not in blob
+    assert b"a,b\n1,2" not in blob
+
+
+def test_chunk_key_is_created_private(tmp_path, monkeypatch):
+    monkeypatch.setenv("BACKUP_CHUNK_KEY", str(tmp_path / "keys" / "chunk.key"))
+    key = chunkstore.load_chunk_key()
+    assert len(key) == 32
+    assert (tmp_path / "keys" / "chunk.key").stat().st_mode & 0o777 == 0o600
+    assert chunkstore.load_chunk_key() == key
+
+
+def test_restore_rejects_unsafe_paths(tmp_path):
+    with pytest.raises(ValueError):
+        backup.safe_target(tmp_path, "../escape")
+
+
+def test_cli_auto_backup_dedup_mode(tmp_path, backup_tree, monkeypatch, fake_age, capsys):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("RAW_DATA_DIR", str(tmp_path / "data" / "raw"))
+    monkeypatch.setenv("PROCESSED_DATA_DIR", str(tmp_path / "data" / "processed"))
+    monkeypatch.setenv("AGE_RECIPIENT", "age1abc")
+    monkeypatch.setenv("BACKUP_MODE", "dedup")
+    monkeypatch.setenv("BACKUP_CHUNK_KEY", str(tmp_path / "keys" / "chunk.key"))
+
+    cli_mod._attempt_encrypted_backup(2025)
+
+    snaps = list((tmp_path / "backups" / "store" / "snapshots").glob("*-2025.json.age"))
+    assert len(snaps) == 1
+    assert "Encrypted snapshot:" in capsys.readouterr().out
@@ -55,7 +55,7 @@ def test_cli_download_uses_mocked_sheets_module(tmp_path, monkeypatch, capsys):
     # Create a fake sheets module to satisfy lazy import
     fake = types.ModuleType("newyearscards.sheets")
 
-    def fake_download_sheet(year: int, *, sheet_url=None, out_path=None):
+    def fake_download_sheet(year: int, *, sheet_url=None, out_path=None, **_kwargs):
         # Simulate writing a CSV to out_path or default path
         if out_path is None:
             out_dir = Path("data/raw") / str(year)
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
-import os
+import io
+import json
 from pathlib import Path
-import types
+import tarfile
 
+from conftest import decrypt_fake
 from newyearscards import cli as cli_mod
 
 
@@ -18,7 +20,7 @@ def _write_dummy_data(base: Path) -> None:
     )
 
 
-def test_attempt_encrypted_backup_creates_age_file(tmp_path, monkeypatch):
+def test_attempt_encrypted_backup_creates_age_file(tmp_path, monkeypatch, fake_age):
     monkeypatch.chdir(tmp_path)
     _write_dummy_data(tmp_path)
 
@@ -27,26 +29,35 @@ def test_attempt_encrypted_backup_creates_age_file(tmp_path, monkeypatch):
     monkeypatch.setenv("PROCESSED_DATA_DIR", str(tmp_path / "data" / "processed"))
     monkeypatch.setenv("AGE_RECIPIENT", "age1testrecipientpublickey")
 
-    # Pretend age is available
-    monkeypatch.setenv("PATH", "/usr/bin:" + os.getenv("PATH", ""))
-    monkeypatch.setattr("shutil.which", lambda name: "/usr/bin/age" if name == "age" else None)
-
-    # Fake subprocess.run to create the output file passed after '-o'
-    def fake_run(argv, check):  # type: ignore[no-untyped-def]
-        assert check is True
-        assert "-o" in argv
-        out = Path(argv[argv.index("-o") + 1])
-        out.parent.mkdir(parents=True, exist_ok=True)
-        out.write_bytes(b"enc")
-        return types.SimpleNamespace(returncode=0)
-
-    monkeypatch.setattr("subprocess.run", fake_run)
-
     cli_mod._attempt_encrypted_backup(2025)
 
     files = list((tmp_path / "backups" / "2025").glob("*.tgz.age"))
     assert len(files) == 1
     assert files[0].stat().st_size > 0
+    # No plaintext archive is ever written next to the encrypted one
+    assert not list((tmp_path / "backups").rglob("*.tgz"))
+
+    # age read the archive from stdin (no input file argument)
+    argv = json.loads(fake_age.read_text(encoding="utf-8").splitlines()[0])
+    assert argv == ["-r", "age1testrecipientpublickey", "-o", str(files[0].relative_to(tmp_path))]
+
+    with tarfile.open(fileobj=io.BytesIO(decrypt_fake(files[0])), mode="r:gz") as tar:
+        names = tar.getnames()
+    assert "raw/2025/mailing_list.csv" in names
+    assert "processed/2025/labels_for_mailmerge.csv" in names
+
+
+def test_attempt_encrypted_backup_age_failure_leaves_nothing(tmp_path, monkeypatch, fake_age):
+    monkeypatch.chdir(tmp_path)
+    _write_dummy_data(tmp_path)
+    monkeypatch.setenv("RAW_DATA_DIR", str(tmp_path / "data" / "raw"))
+    monkeypatch.setenv("PROCESSED_DATA_DIR", str(tmp_path / "data" / "processed"))
+    monkeypatch.setenv("AGE_RECIPIENT", "age1abc")
+    monkeypatch.setenv("FAKE_AGE_FAIL", "1")
+
+    cli_mod._attempt_encrypted_backup(2025)
+
+    assert list((tmp_path / "backups" / "2025").iterdir()) == []
 
 
 def test_attempt_encrypted_backup_no_age_or_no_recipient_skips(tmp_path, monkeypatch):
@@ -89,7 +100,7 @@ def test_attempt_encrypted_backup_recipients_file_missing_skips_cleanly(tmp_path
     assert not (tmp_path / "backups" / "2025").exists()
 
 
-def test_attempt_encrypted_backup_uses_recipients_file(tmp_path, monkeypatch):
+def test_attempt_encrypted_backup_uses_recipients_file(tmp_path, monkeypatch, fake_age):
     monkeypatch.chdir(tmp_path)
     _write_dummy_data(tmp_path)
 
@@ -101,37 +112,23 @@ def test_attempt_encrypted_backup_uses_recipients_file(tmp_path, monkeypatch):
     rec_file.write_text("age1one\nage1two\n", encoding="utf-8")
     monkeypatch.setenv("AGE_RECIPIENTS_FILE", str(rec_file))
 
-    monkeypatch.setattr("shutil.which", lambda name: "/usr/bin/age" if name == "age" else None)
-
-    captured_args = {}
-
-    def fake_run(argv, check):  # type: ignore[no-untyped-def]
-        captured_args["argv"] = list(argv)
-        out = Path(argv[argv.index("-o") + 1])
-        out.parent.mkdir(parents=True, exist_ok=True)
-        out.write_bytes(b"enc")
-        return types.SimpleNamespace(returncode=0)
-
-    monkeypatch.setattr("subprocess.run", fake_run)
-
     cli_mod._attempt_encrypted_backup(2025)
 
     files = list((tmp_path / "backups" / "2025").glob("*.tgz.age"))
     assert len(files) == 1
-    argv = captured_args["argv"]
+    argv = json.loads(fake_age.read_text(encoding="utf-8").splitlines()[0])
     # Should contain two -r entries for both recipients
     r_indices = [i for i, v in enumerate(argv) if v == "-r"]
     assert len(r_indices) == 2
 
 
-def test_attempt_encrypted_backup_multiple_calls_unique(tmp_path, monkeypatch):
+def test_attempt_encrypted_backup_multiple_calls_unique(tmp_path, monkeypatch, fake_age):
     # Prepare env and data
     monkeypatch.chdir(tmp_path)
     _write_dummy_data(tmp_path)
     monkeypatch.setenv("RAW_DATA_DIR", str(tmp_path / "data" / "raw"))
     monkeypatch.setenv("PROCESSED_DATA_DIR", str(tmp_path / "data" / "processed"))
     monkeypatch.setenv("AGE_RECIPIENT", "age1abc")
-    monkeypatch.setattr("shutil.which", lambda name: "/usr/bin/age" if name == "age" else None)
 
     # Fake datetime.now to produce deterministic, distinct stamps
     from datetime import datetime as _dt
@@ -151,14 +148,6 @@ def test_attempt_encrypted_backup_multiple_calls_unique(tmp_path, monkeypatch):
 
     monkeypatch.setattr(cli_mod, "datetime", FakeDT)
 
-    def fake_run(argv, check):  # type: ignore[no-untyped-def]
-        out = Path(argv[argv.index("-o") + 1])
-        out.parent.mkdir(parents=True, exist_ok=True)
-        out.write_bytes(b"enc")
-        return types.SimpleNamespace(returncode=0)
-
-    monkeypatch.setattr("subprocess.run", fake_run)
-
     cli_mod._attempt_encrypted_backup(2025)
     cli_mod._attempt_encrypted_backup(2025)
 
@@ -82,7 +82,7 @@ def test_download_out_file_uses_exact_path(tmp_path, monkeypatch, capsys):
     # Fake sheets module
     fake = types.ModuleType("newyearscards.sheets")
 
-    def fake_download_sheet(year: int, *, sheet_url=None, out_path=None):  # noqa: ARG001
+    def fake_download_sheet(year: int, *, sheet_url=None, out_path=None, **_kwargs):  # noqa: ARG001
         p = Path(out_path)
         p.parent.mkdir(parents=True, exist_ok=True)
         p.write_text("ok", encoding="utf-8")
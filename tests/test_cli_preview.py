@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from newyearscards import cli as cli_mod
+from newyearscards.addresses import select_rows
+
+HEADER = "First Name,Last Name,Address 1,City,Zip Code,Country\n"
+
+
+def _csv(tmp_path, n: int):  # type: ignore[no-untyped-def]
+    lines = [HEADER]
+    for i in range(n):
+        country = "Germany" if i % 3 == 0 else "USA"
+        lines.append(f"P{i},L{i},Street {i},City,{10000 + i},{country}\n")
+    path = tmp_path / "mailing_list.csv"
+    path.write_text("".join(lines), encoding="utf-8")
+    return path
+
+
+def test_select_rows_stops_reading_at_limit():
+    def rows():  # type: ignore[no-untyped-def]
+        for i in range(3):
+            yield {"first_name": f"P{i}", "address1": "x", "country": "USA"}
+        raise AssertionError("read past the limit")
+
+    assert [r["first_name"] for r in select_rows(rows(), limit=3)] == ["P0", "P1", "P2"]
+
+
+def test_select_rows_filters_country_and_samples():
+    rows = [{"address1": "x", "country": "Germany" if i % 2 else "USA", "n": str(i)}
+            for i in range(1000)]
+    picked = list(select_rows(rows, sample=10, country="de", rng=random.Random(1)))
+    assert len(picked) == 10
+    assert all(r["country"] == "Germany" for r in picked)
+    idx = [int(r["n"]) for r in picked]
+    assert idx == sorted(idx) and idx != [2 * i + 1 for i in range(10)]
+    # Same seed, same sample
+    again = list(select_rows(rows, sample=10, country="Germany", rng=random.Random(1)))
+    assert again == picked
+
+
+def test_dry_run_limit_sample_country(tmp_path, capsys):
+    in_csv = _csv(tmp_path, 60)
+
+    assert cli_mod.main(["build-labels", "--input", str(in_csv), "--dry-run"]) == 0
+    out = capsys.readouterr().out.splitlines()
+    assert out[0].startswith("Prefix,FirstName") and len(out) == 1 + cli_mod.DRY_RUN_ROWS
+
+    argv = ["build-labels", "--input", str(in_csv), "--dry-run", "--country", "DE", "--limit", "3"]
+    assert cli_mod.main(argv) == 0
+    out = capsys.readouterr().out.splitlines()
+    assert len(out) == 4 and all(",Germany," in line for line in out[1:])
+
+    argv = ["build-labels", "--input", str(in_csv), "--dry-run", "--sample", "7", "--seed", "3"]
+    assert cli_mod.main(argv) == 0
+    first = capsys.readouterr().out
+    assert cli_mod.main(argv) == 0
+    assert capsys.readouterr().out == first and len(first.splitlines()) == 8
+    assert not (tmp_path / "labels_for_mailmerge.csv").exists()
+
+
+@pytest.mark.parametrize("extra", [["--limit", "2"], ["--country", "DE"]])
+def test_preview_options_need_dry_run(tmp_path, capsys, extra):
+    in_csv = _csv(tmp_path, 2)
+    assert cli_mod.main(["build-labels", "--input", str(in_csv), *extra]) == 2
+    assert "need --dry-run" in capsys.readouterr().err
@@ -1,5 +1,10 @@
 from __future__ import annotations
 
+import os
+from pathlib import Path
+import subprocess
+import sys
+
 import pytest
 
 from newyearscards import __version__, cli as cli_mod
@@ -13,3 +18,54 @@ def test_cli_version_flag_prints_and_exits(capsys):
     out = capsys.readouterr().out.strip()
     assert out.startswith("newyearscards ")
     assert __version__ in out
+
+
+def _loaded_modules(code: str) -> set[str]:
+    # A fresh interpreter, so modules imported by other tests don't count
+    src = str(Path(__file__).resolve().parent.parent / "src")
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([src, os.environ.get("PYTHONPATH", "")])}
+    out = subprocess.run(
+        [sys.executable, "-c", code + "\nprint(' '.join(sys.modules))"],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return set(out.split())
+
+
+def test_cli_version_skips_heavy_imports():
+    baseline = _loaded_modules("import sys")
+    loaded = _loaded_modules(
+        "import sys\n"
+        "from newyearscards import cli\n"
+        "try:\n"
+        "    cli.main(['--version'])\n"
+        "except SystemExit:\n"
+        "    pass"
+    )
+    heavy = {"tarfile", "subprocess", "tempfile", "yaml", "dotenv", "newyearscards.addresses"}
+    # Site hooks may import some of these before our code runs
+    assert not (heavy - baseline) & loaded
+
+
+def test_load_dotenv_looks_next_to_the_package_and_in_cwd(tmp_path, monkeypatch):
+    import dotenv
+
+    from newyearscards import config
+
+    calls = []
+    monkeypatch.setattr(dotenv, "load_dotenv", lambda *a, **k: calls.append(a) or True)
+    pkg, cwd = tmp_path / "checkout" / "src" / "newyearscards", tmp_path / "elsewhere"
+    pkg.mkdir(parents=True)
+    cwd.mkdir()
+    monkeypatch.setattr(config, "_PACKAGE_DIR", pkg)
+    monkeypatch.chdir(cwd)
+
+    assert config.load_dotenv() is False and calls == []
+    # A .env in the source checkout is found from any working directory, as before
+    (tmp_path / "checkout" / ".env").write_text("X=1\n", encoding="utf-8")
+    assert config.load_dotenv() is True and calls == [()]
+    (tmp_path / "checkout" / ".env").unlink()
+    (cwd / ".env").write_text("X=1\n", encoding="utf-8")
+    assert config.load_dotenv() is True and len(calls) == 2
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import gzip
+import io
+import os
+from pathlib import Path
+
+import pytest
+
+from conftest import decrypt_fake
+from newyearscards import cli as cli_mod
+from newyearscards.backup import open_tar_reader
+from newyearscards.compression import (
+    ArchiveStats,
+    ParallelGzipWriter,
+    archive_suffix,
+    compression_for_name,
+    compression_from_env,
+    open_compressor,
+)
+
+
+def _setup_data(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    raw = tmp_path / "data" / "raw" / "2025"
+    raw.mkdir(parents=True)
+    (raw / "mailing_list.csv").write_text("a,b\n1,2\n" * 5000, encoding="utf-8")
+    monkeypatch.setenv("RAW_DATA_DIR", str(tmp_path / "data" / "raw"))
+    monkeypatch.setenv("PROCESSED_DATA_DIR", str(tmp_path / "data" / "processed"))
+    monkeypatch.setenv("AGE_RECIPIENT", "age1abc")
+
+
+def test_parallel_gzip_is_a_standard_gzip_member():
+    # Several blocks with cross-block repetition and some incompressible noise
+    payload = (b"Jane Doe\n123 Main St\nSpringfield\n" * 20000) + os.urandom(50_000)
+    buf = io.BytesIO()
+    with ParallelGzipWriter(buf, threads=4, block_size=16 * 1024) as w:
+        for i in range(0, len(payload), 7000):
+            w.write(payload[i : i + 7000])
+    assert gzip.decompress(buf.getvalue()) == payload
+    assert len(buf.getvalue()) < len(payload)
+
+
+def test_parallel_gzip_empty_input():
+    buf = io.BytesIO()
+    ParallelGzipWriter(buf, threads=2).close()
+    assert gzip.decompress(buf.getvalue()) == b""
+
+
+def test_suffix_round_trips_through_name():
+    assert archive_suffix("gzip") == ".tgz"
+    assert archive_suffix("pgzip") == ".tgz"
+    assert archive_suffix("zstd", 19) == "-zstd19.tar.zst"
+    assert archive_suffix("zstd") == "-zstd3.tar.zst"
+    assert compression_for_name("addresses-1-zstd19.tar.zst.age") == "zstd"
+    assert compression_for_name("addresses-1.tgz.age") == "gzip"
+
+
+def test_compression_from_env(monkeypatch):
+    monkeypatch.setenv("BACKUP_COMPRESSION", "ZSTD")
+    monkeypatch.setenv("BACKUP_COMPRESSION_LEVEL", "7")
+    monkeypatch.setenv("BACKUP_THREADS", "2")
+    assert compression_from_env() == ("zstd", 7, 2)
+    monkeypatch.setenv("BACKUP_COMPRESSION", "lz4")
+    with pytest.raises(ValueError, match="BACKUP_COMPRESSION"):
+        compression_from_env()
+
+
+@pytest.mark.parametrize(
+    ("compression", "level", "threads", "message"),
+    [
+        ("gzip", "fast", "", "BACKUP_COMPRESSION_LEVEL must be an integer"),
+        ("gzip", "10", "", "gzip compression level must be 0-9, got 10"),
+        ("zstd", "0", "", "zstd compression level must be 1-22, got 0"),
+        ("pgzip", "", "0", "BACKUP_THREADS must be at least 1"),
+    ],
+)
+def test_compression_from_env_rejects_bad_values(monkeypatch, compression, level, threads, message):
+    monkeypatch.setenv("BACKUP_COMPRESSION", compression)
+    monkeypatch.setenv("BACKUP_COMPRESSION_LEVEL", level)
+    monkeypatch.setenv("BACKUP_THREADS", threads)
+    with pytest.raises(ValueError, match=message):
+        compression_from_env()
+
+
+@pytest.mark.parametrize("compression", ["gzip", "pgzip"])
+def test_gzip_level_zero_is_stored_not_defaulted(compression):
+    payload = b"Jane Doe\n123 Main St\n" * 5000
+    buf = io.BytesIO()
+    w = open_compressor(buf, compression, level=0, threads=2)
+    w.write(payload)
+    w.close()
+    assert gzip.decompress(buf.getvalue()) == payload
+    # Level 0 stores blocks uncompressed; the old `level or 9` would have shrunk this a lot
+    assert len(buf.getvalue()) > len(payload)
+
+
+def test_archive_stats_summary():
+    stats = ArchiveStats(raw_bytes=4_000_000, compressed_bytes=1_000_000, seconds=2.0)
+    assert stats.summary() == "ratio 4.00x, 2.0 MB/s"
+    assert ArchiveStats().summary() == "ratio 0.00x, 0.0 MB/s"
+
+
+def test_pgzip_backup_round_trip(tmp_path, monkeypatch, fake_age, capsys):
+    _setup_data(tmp_path, monkeypatch)
+    monkeypatch.setenv("BACKUP_COMPRESSION", "pgzip")
+
+    cli_mod._attempt_encrypted_backup(2025)
+
+    (out,) = (tmp_path / "backups" / "2025").glob("*.tgz.age")
+    assert "ratio " in capsys.readouterr().out
+    with open_tar_reader(io.BytesIO(decrypt_fake(out)), "gzip") as tar:
+        names = [m.name for m in tar]
+    assert "raw/2025/mailing_list.csv" in names
+
+
+def test_zstd_backup_records_level_in_name(tmp_path, monkeypatch, fake_age):
+    pytest.importorskip("zstandard")
+    _setup_data(tmp_path, monkeypatch)
+    monkeypatch.setenv("BACKUP_COMPRESSION", "zstd")
+    monkeypatch.setenv("BACKUP_COMPRESSION_LEVEL", "5")
+
+    cli_mod._attempt_encrypted_backup(2025)
+
+    (out,) = (tmp_path / "backups" / "2025").glob("*.age")
+    assert out.name.endswith("-zstd5.tar.zst.age")
+    with open_tar_reader(io.BytesIO(decrypt_fake(out)), compression_for_name(out.name)) as tar:
+        data = {m.name: tar.extractfile(m).read() for m in tar if m.isfile()}  # type: ignore[union-attr]
+    assert data["raw/2025/mailing_list.csv"] == b"a,b\n1,2\n" * 5000
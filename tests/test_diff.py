@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+
+from newyearscards import cli as cli_mod
+from newyearscards.diff import RAW_SPEC, DiffStats, diff_rows, read_rows
+
+HEADER = "First Name,Last Name,Address 1,City,Zip Code,Country\n"
+
+
+def _write(path, rows):  # type: ignore[no-untyped-def]
+    path.write_text(HEADER + "".join(f"{','.join(r)}\n" for r in rows), encoding="utf-8")
+    return path
+
+
+def _lists(tmp_path):  # type: ignore[no-untyped-def]
+    old = [(f"P{i}", f"L{i}", f"Street {i}", "City", str(10000 + i), "USA") for i in range(50)]
+    new = [r for r in old if r[0] not in ("P3", "P7")]
+    new[10] = (*new[10][:2], "Moved 1", *new[10][3:])
+    new.append(("New", "Person", "Elm St", "Town", "99999", "Canada"))
+    # Same person twice: the second occurrence is a separate recipient
+    new.append(old[0])
+    return _write(tmp_path / "old.csv", old), _write(tmp_path / "new.csv", new)
+
+
+def _records(old, new, **kw):  # type: ignore[no-untyped-def]
+    stats = DiffStats()
+    records = diff_rows(read_rows(old, RAW_SPEC), read_rows(new, RAW_SPEC), RAW_SPEC,
+                        stats=stats, **kw)
+    return {(r.status, r.key, tuple(r.changed)) for r in records}, stats
+
+
+def test_diff_in_memory_and_spilled_agree(tmp_path):
+    old, new = _lists(tmp_path)
+    records, stats = _records(old, new)
+    assert records == {
+        ("removed", "p3|l3", ()),
+        ("removed", "p7|l7", ()),
+        ("changed", "p12|l12", ("address1",)),
+        ("added", "new|person", ()),
+        ("added", "p0|l0#2", ()),
+    }
+    assert (stats.added, stats.removed, stats.changed, stats.unchanged) == (2, 2, 1, 47)
+    assert stats.partitions == 0
+
+    spilled, spill_stats = _records(old, new, max_rows=4, tmp_dir=tmp_path)
+    assert spilled == records
+    assert spill_stats.partitions > 0
+    assert spill_stats.summary().startswith("2 added, 2 removed, 1 changed, 47 unchanged")
+    # Temporary partitions are cleaned up
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["new.csv", "old.csv"]
+
+
+def test_diff_ignores_case_and_whitespace(tmp_path):
+    old = _write(tmp_path / "a.csv", [("Ann", "Lee", "1 Main  St", "X", "1", "USA")])
+    new = _write(tmp_path / "b.csv", [(" ann", "LEE", "1 Main St ", "X", "1", "USA")])
+    records, stats = _records(old, new)
+    assert records == set() and stats.unchanged == 1
+
+
+def test_diff_skips_blank_rows(tmp_path):
+    person = ("Ann", "Lee", "1 Main St", "X", "1", "USA")
+    blank = ("", "", "", "", "", "")
+    old = _write(tmp_path / "a.csv", [person, blank, ("", "", "", "", "", "USA")])
+    new = _write(tmp_path / "b.csv", [blank, person, blank, blank])
+    records, stats = _records(old, new)
+    assert records == set() and stats.unchanged == 1
+
+    # Nameless rows with an address are still recipients
+    new = _write(tmp_path / "b.csv", [person, ("", "", "2 Elm St", "Y", "2", "USA")])
+    records, _ = _records(old, new)
+    assert records == {("added", "2 elm st|", ())}
+
+
+def test_cli_diff_csv_and_json(tmp_path, capsys):
+    old, new = _lists(tmp_path)
+
+    assert cli_mod.main(["diff", "--from", str(old), "--to", str(new)]) == 0
+    captured = capsys.readouterr()
+    rows = list(csv.DictReader(io.StringIO(captured.out)))
+    assert {r["status"] for r in rows} == {"added", "removed", "changed"}
+    assert next(r for r in rows if r["status"] == "changed")["changed"] == "address1"
+    assert "2 added, 2 removed, 1 changed" in captured.err
+
+    out = tmp_path / "diff.json"
+    argv = ["diff", "--from", str(old), "--to", str(new), "--format", "json", "--out", str(out)]
+    assert cli_mod.main([*argv, "--max-rows", "5"]) == 0
+    data = json.loads(out.read_text(encoding="utf-8"))
+    assert len(data) == 5
+    moved = next(r for r in data if r["status"] == "changed")
+    assert moved["from"]["address1"] == "Street 12" and moved["to"]["address1"] == "Moved 1"
+
+    assert cli_mod.main(["diff", "--from", str(tmp_path / "nope.csv"), "--to", str(new)]) == 2
+    assert "input CSV not found" in capsys.readouterr().err
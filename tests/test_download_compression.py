@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import gzip
+
+import pytest
+
+from _http_stub import StubResponse, StubServer
+from newyearscards import sheets
+from newyearscards.http_retry import FetchStats, iter_decoded
+
+CSV = ("Prefix,First Name,Last Name,City\n" + "Fam.,Frank,Prager,Stäbelow\n" * 5000).encode()
+
+
+class BufferedResponse:
+    """Response whose raw stream is an in-memory buffer."""
+
+    def __init__(self, body: bytes, encoding: str = "") -> None:
+        import io
+
+        self.headers = {"Content-Encoding": encoding} if encoding else {}
+        self._buf = io.BytesIO(body)
+        self.raw = self
+
+    def read(self, n: int, decode_content: bool = False) -> bytes:
+        return self._buf.read(n)
+
+
+def gzip_if_accepted(body: bytes):
+    def handler(_path: str) -> StubResponse:
+        return StubResponse(200, gzip.compress(body), {"Content-Encoding": "gzip"})
+
+    return handler
+
+
+def test_download_requests_gzip_and_records_wire_bytes(tmp_path, monkeypatch, fake_google):
+    with StubServer(gzip_if_accepted(CSV)) as srv:
+        monkeypatch.setattr(sheets, "EXPORT_BASE", srv.url)
+        stats = FetchStats()
+        out = sheets.download_sheet(2033, out_path=tmp_path / "list.csv", stats=stats)
+        assert "gzip" in srv.seen[0].headers.get("Accept-Encoding", "")
+
+    assert out.read_bytes() == CSV
+    assert stats.body_bytes == len(CSV)
+    assert stats.wire_bytes == len(gzip.compress(CSV))
+    assert stats.wire_bytes < stats.body_bytes / 10
+    assert "bytes on the wire" in stats.summary()
+    assert not (tmp_path / "list.csv.part").exists()
+
+
+def test_uncompressed_response_passes_through(tmp_path, monkeypatch, fake_google):
+    with StubServer(lambda _p: StubResponse(200, CSV)) as srv:
+        monkeypatch.setattr(sheets, "EXPORT_BASE", srv.url)
+        stats = FetchStats()
+        out = sheets.download_sheet(2033, out_path=tmp_path / "list.csv", stats=stats)
+    assert out.read_bytes() == CSV
+    assert stats.wire_bytes == stats.body_bytes == len(CSV)
+
+
+def test_truncated_gzip_keeps_previous_file(tmp_path, monkeypatch, fake_google):
+    target = tmp_path / "list.csv"
+    target.write_bytes(b"previous")
+    broken = gzip.compress(CSV)[:-20]
+    handler = lambda _p: StubResponse(200, broken, {"Content-Encoding": "gzip"})  # noqa: E731
+    with StubServer(handler) as srv:
+        monkeypatch.setattr(sheets, "EXPORT_BASE", srv.url)
+        with pytest.raises(ValueError, match="truncated"):
+            sheets.download_sheet(2033, out_path=target)
+    assert target.read_bytes() == b"previous"
+    assert not (tmp_path / "list.csv.part").exists()
+
+
+def test_iter_decoded_is_incremental_and_handles_multiple_members():
+    body = gzip.compress(b"hello ") + gzip.compress(b"world")
+    stats = FetchStats()
+    chunks = list(iter_decoded(BufferedResponse(body, "gzip"), stats, chunk_size=7))
+    assert b"".join(chunks) == b"hello world"
+    assert len(chunks) > 1
+    assert stats.wire_bytes == len(body)
+
+
+def test_iter_decoded_deflate():
+    import zlib
+
+    body = zlib.compress(CSV)
+    assert b"".join(iter_decoded(BufferedResponse(body, "deflate"))) == CSV
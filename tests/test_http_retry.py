@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import sys
+import threading
+
+import pytest
+
+from _http_stub import StubResponse, StubServer, UrllibSession
+from newyearscards import cli as cli_mod, http_retry, sheets
+from newyearscards.http_retry import (
+    FetchStats,
+    RetryPolicy,
+    TokenBucket,
+    get_with_retry,
+    stream_with_retry,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def fast_limiter() -> TokenBucket:
+    return TokenBucket(rate=1000, capacity=1000)
+
+
+def scripted(*responses: StubResponse):
+    queue = list(responses)
+
+    def handler(_path: str) -> StubResponse:
+        return queue.pop(0) if len(queue) > 1 else queue[0]
+
+    return handler
+
+
+def test_token_bucket_bursts_then_throttles():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=2, clock=clock, sleep=clock.sleep)
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == pytest.approx(0.5)
+    assert clock.now == pytest.approx(0.5)
+
+
+def test_retries_transient_5xx_then_succeeds():
+    handler = scripted(StubResponse(503), StubResponse(502), StubResponse(200, b"ok"))
+    sleeps: list[float] = []
+    stats = FetchStats()
+    with StubServer(handler) as srv:
+        resp = get_with_retry(
+            UrllibSession(), srv.url + "/x", limiter=fast_limiter(), stats=stats,
+            sleep=sleeps.append,
+        )
+    assert resp.status_code == 200
+    assert resp.content == b"ok"
+    assert stats.attempts == 3
+    assert stats.retries == 2
+    assert stats.statuses == [503, 502, 200]
+    assert stats.backoff_wait == pytest.approx(sum(sleeps))
+    # Full jitter stays under the exponential cap
+    assert sleeps[0] <= 0.5 and sleeps[1] <= 1.0
+
+
+def test_honours_retry_after_on_429():
+    handler = scripted(StubResponse(429, headers={"Retry-After": "3"}), StubResponse(200, b"ok"))
+    sleeps: list[float] = []
+    with StubServer(handler) as srv:
+        resp = get_with_retry(
+            UrllibSession(), srv.url, limiter=fast_limiter(), sleep=sleeps.append
+        )
+    assert resp.status_code == 200
+    assert sleeps == [3.0]
+
+
+def test_budget_exhaustion_returns_last_error_response():
+    handler = scripted(StubResponse(503, headers={"Retry-After": "10"}))
+    policy = RetryPolicy(max_attempts=10, budget=15)
+    stats = FetchStats()
+    with StubServer(handler) as srv:
+        resp = get_with_retry(
+            UrllibSession(), srv.url, policy=policy, limiter=fast_limiter(), stats=stats,
+            sleep=lambda _s: None,
+        )
+    assert resp.status_code == 503
+    assert stats.attempts == 2
+    assert stats.backoff_wait == 10
+
+
+def test_non_retryable_status_is_returned_immediately():
+    with StubServer(scripted(StubResponse(404))) as srv:
+        stats = FetchStats()
+        resp = get_with_retry(UrllibSession(), srv.url, limiter=fast_limiter(), stats=stats)
+    assert resp.status_code == 404
+    assert stats.attempts == 1
+
+
+def test_slow_response_timeout_is_retried():
+    handler = scripted(StubResponse(200, b"late", delay=0.5), StubResponse(200, b"fast"))
+    with StubServer(handler) as srv:
+        stats = FetchStats()
+        resp = get_with_retry(
+            UrllibSession(), srv.url, timeout=0.1, limiter=fast_limiter(), stats=stats,
+            sleep=lambda _s: None,
+        )
+    assert resp.content == b"fast"
+    assert stats.attempts == 2
+
+
+def test_connection_errors_raise_after_max_attempts():
+    policy = RetryPolicy(max_attempts=3)
+    stats = FetchStats()
+    with pytest.raises(OSError):
+        get_with_retry(
+            UrllibSession(), "http://127.0.0.1:9/unreachable", timeout=0.5, policy=policy,
+            limiter=fast_limiter(), stats=stats, sleep=lambda _s: None,
+        )
+    assert stats.attempts == 3
+
+
+class DroppingSession:
+    """Serves `bodies` in turn; a body with `cut` set resets the connection after `cut` bytes."""
+
+    def __init__(self, *bodies: tuple[bytes, int | None]) -> None:
+        self.bodies = list(bodies)
+        self.calls = 0
+
+    def get(self, _url, **_kwargs):  # type: ignore[no-untyped-def]
+        body, cut = self.bodies[min(self.calls, len(self.bodies) - 1)]
+        self.calls += 1
+
+        class Response:
+            status_code = 200
+            headers: dict[str, str] = {}
+
+            def __init__(self) -> None:
+                self.raw = self
+                self.pos = 0
+
+            def read(self, n, decode_content=False):  # type: ignore[no-untyped-def]
+                if cut is not None and self.pos >= cut:
+                    raise ConnectionResetError("connection reset by peer")
+                end = self.pos + n if cut is None else min(self.pos + n, cut)
+                chunk, self.pos = body[self.pos : end], end
+                return chunk
+
+            def raise_for_status(self) -> None:
+                pass
+
+            def close(self) -> None:
+                pass
+
+        return Response()
+
+
+def test_stream_restarts_after_connection_drop_mid_body():
+    body = b"".join(b"row %d\n" % i for i in range(500))
+    session = DroppingSession((body, 1000), (body, 2500), (body, None))
+    stats = FetchStats()
+    sleeps: list[float] = []
+    chunks = stream_with_retry(
+        session, "http://x", limiter=fast_limiter(), stats=stats, sleep=sleeps.append
+    )
+    assert session.calls == 1  # the first request is made up front
+    assert b"".join(chunks) == body
+    assert (session.calls, stats.requests, stats.attempts, stats.retries) == (3, 1, 3, 2)
+    assert len(sleeps) == 2
+
+
+def test_stream_gives_up_within_the_same_attempts():
+    session = DroppingSession((b"a" * 100, 10))
+    chunks = stream_with_retry(
+        session, "http://x", policy=RetryPolicy(max_attempts=3), limiter=fast_limiter(),
+        sleep=lambda _s: None,
+    )
+    with pytest.raises(ConnectionResetError):
+        b"".join(chunks)
+    assert session.calls == 3
+
+
+def test_stream_refuses_to_splice_a_changed_body():
+    session = DroppingSession((b"a,b\n1,2\n", 6), (b"a,b\n9,9\n", None))
+    chunks = stream_with_retry(session, "http://x", limiter=fast_limiter(), sleep=lambda _s: None)
+    with pytest.raises(ValueError, match="changed"):
+        b"".join(chunks)
+
+
+def test_limiter_is_shared_across_concurrent_fetches():
+    bucket = TokenBucket(rate=20, capacity=1)
+    all_stats = [FetchStats() for _ in range(4)]
+    with StubServer(scripted(StubResponse(200, b"ok"))) as srv:
+        threads = [
+            threading.Thread(
+                target=get_with_retry,
+                args=(UrllibSession(), srv.url),
+                kwargs={"limiter": bucket, "stats": st},
+            )
+            for st in all_stats
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    # One token up front, the remaining three had to wait ~50ms each in turn
+    assert sum(st.throttle_wait for st in all_stats) >= 0.1
+
+
+def test_download_command_reports_attempts(tmp_path, monkeypatch, capsys):
+    key = tmp_path / "key.json"
+    key.write_text("{}", encoding="utf-8")
+    monkeypatch.setenv("SERVICE_ACCOUNT_KEY", str(key))
+    monkeypatch.setenv("SHEET_URL", "https://docs.google.com/spreadsheets/d/abc/edit#gid=0")
+    monkeypatch.delenv("AGE_RECIPIENT", raising=False)
+    monkeypatch.delenv("AGE_RECIPIENTS_FILE", raising=False)
+    monkeypatch.setattr(http_retry, "_default_limiter", fast_limiter())
+
+    class ModAuthReq:
+        class AuthorizedSession(UrllibSession):  # type: ignore[no-redef]
+            def __init__(self, _creds):
+                pass
+
+    class ModOAuth2:
+        class service_account:  # type: ignore[no-redef]
+            class Credentials:
+                @classmethod
+                def from_service_account_file(cls, path, scopes):  # type: ignore[no-untyped-def]
+                    return object()
+
+    monkeypatch.setitem(sys.modules, "google.auth.transport.requests", ModAuthReq())
+    monkeypatch.setitem(sys.modules, "google.oauth2", ModOAuth2())
+
+    handler = scripted(StubResponse(500), StubResponse(200, b"a,b\n1,2\n"))
+    with StubServer(handler) as srv:
+        monkeypatch.setattr(sheets, "EXPORT_BASE", srv.url)
+        out = tmp_path / "out.csv"
+        code = cli_mod.main(["download", "--year", "2031", "--out", str(out)])
+        assert srv.seen[0].path.startswith("/abc/export?format=csv&gid=0")
+
+    assert code == 0
+    assert out.read_bytes() == b"a,b\n1,2\n"
+    assert "Fetch: 2 attempt(s), 1 retried" in capsys.readouterr().out
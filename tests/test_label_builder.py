@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from newyearscards.addresses import LabelBuilder, build_labels
+
+ROOT = Path(__file__).resolve().parent.parent
+TEMPLATES = {
+    "default": {"lines": ["{first_name} {last_name}", "{address1}", "{zip} {city}", "{country}"]},
+    "DE": {"lines": ["{first_name} {last_name}", "{address1}", "{zip} {city}", "Germany"]},
+}
+HEADERS = ("First Name", "Last Name", "Address 1", "City", "Zip Code", "Country")
+ROW = ("Frank", "Prager", "Satower Str. 26", "Stäbelow", "18198", "Germany")
+
+
+def test_build_from_mapping_dicts_and_tuples():
+    builder = LabelBuilder(TEMPLATES)
+    from_dict = builder.build_one(dict(zip(HEADERS, ROW, strict=True)))
+    assert from_dict is not None
+    assert (from_dict["Line1"], from_dict["Line4"]) == ("Frank Prager", "GERMANY")
+
+    # Tuples: header row first (csv.reader style), or explicit headers
+    assert list(builder.build([HEADERS, ROW])) == [from_dict]
+    assert list(builder.build([ROW], headers=HEADERS)) == [from_dict]
+    assert builder.build_one({"first_name": "No address"}) is None
+
+
+def test_build_is_lazy_and_templates_are_copied():
+    source = {k: {"lines": list(v["lines"])} for k, v in TEMPLATES.items()}
+    builder = LabelBuilder(source)
+    source["DE"]["lines"].append("{zip}")
+
+    seen: list[int] = []
+
+    def rows():  # type: ignore[no-untyped-def]
+        for i in range(3):
+            seen.append(i)
+            yield dict(zip(HEADERS, ROW, strict=True))
+
+    labels = builder.build(rows())
+    assert seen == []
+    first = next(labels)
+    assert seen == [0] and first["Line5"] == ""
+
+
+def test_from_path_threads_and_build_labels(tmp_path):
+    builder = LabelBuilder(ROOT / "config" / "address_formats.yml")
+    expected = list(builder.build([HEADERS, ROW]))
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda _: list(builder.build([HEADERS, ROW])), range(32)))
+    assert all(r == expected for r in results)
+
+    in_csv = tmp_path / "mailing_list.csv"
+    in_csv.write_text(",".join(HEADERS) + "\n" + ",".join(ROW) + "\n", encoding="utf-8")
+    out = build_labels(in_csv, tmp_path / "labels.csv", builder=builder)
+    assert "SATOWER" not in out.read_text(encoding="utf-8")
+    assert "Satower Str. 26" in out.read_text(encoding="utf-8")
+
+
+def test_invalid_templates():
+    with pytest.raises(ValueError, match="missing 'lines'"):
+        LabelBuilder({"default": {"uppercase_last_n_lines": 1}})  # type: ignore[typeddict-item]
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+import subprocess
+import sys
+
+from newyearscards import cli as cli_mod, label_cache
+from newyearscards.addresses import LabelBuilder, iter_csv_rows
+from newyearscards.config import label_cache_path
+from newyearscards.label_cache import LabelCache, build_cached, open_cache
+
+ROOT = Path(__file__).resolve().parent.parent
+TEMPLATES = {
+    "default": {"lines": ["{first_name} {last_name}", "{address1}", "{zip} {city}", "{country}"]},
+    "DE": {"lines": ["{first_name} {last_name}", "{address1}", "{zip} {city}", "Germany"]},
+}
+CSV = (
+    "First Name,Last Name,Address 1,City,Zip Code,Country\n"
+    "Frank,Prager,Satower Str. 26,Stäbelow,18198,Germany\n"
+    "Ann,Lee,1 Main St,Springfield,62701,USA\n"
+    "Nobody,Here,,,,\n"
+    "Ann,Lee,1 Main St,Springfield,62701,USA\n"
+)
+
+
+def _rows(text: str = CSV):  # type: ignore[no-untyped-def]
+    return list(iter_csv_rows(text.splitlines(keepends=True)))
+
+
+def test_cached_build_matches_and_reuses(tmp_path):
+    builder = LabelBuilder(TEMPLATES)
+    expected = list(builder.build(_rows()))
+    db = tmp_path / "labels.sqlite3"
+
+    with open_cache(db, builder) as cache:
+        assert list(build_cached(builder, _rows(), cache, batch_size=2)) == expected
+        # The repeated row (second batch) is served from what the first batch stored
+        assert (cache.hits, cache.misses, len(cache)) == (1, 2, 2)
+    with open_cache(db, builder) as cache:
+        assert list(build_cached(builder, _rows(), cache)) == expected
+        assert (cache.hits, cache.misses, cache.evicted) == (3, 0, 0)
+
+
+def test_template_change_evicts(tmp_path):
+    db = tmp_path / "labels.sqlite3"
+    builder = LabelBuilder(TEMPLATES)
+    with open_cache(db, builder) as cache:
+        list(build_cached(builder, _rows(), cache))
+
+    edited = LabelBuilder({**TEMPLATES, "DE": {**TEMPLATES["DE"], "uppercase_last_n_lines": 2}})
+    with open_cache(db, edited) as cache:
+        assert cache.evicted == 2 and len(cache) == 0
+        labels = list(build_cached(edited, _rows(), cache))
+        assert cache.misses == 2 and "evicted" in cache.summary()
+    assert labels[0]["Line3"] == "18198 STÄBELOW"
+
+
+def test_formatter_upgrade_evicts(tmp_path, monkeypatch):
+    db = tmp_path / "labels.sqlite3"
+    builder = LabelBuilder(TEMPLATES)
+    with open_cache(db, builder) as cache:
+        list(build_cached(builder, _rows(), cache))
+
+    monkeypatch.setattr(label_cache, "FORMAT_VERSION", label_cache.FORMAT_VERSION + 1)
+    with open_cache(db, builder) as cache:
+        assert cache.evicted == 2
+        list(build_cached(builder, _rows(), cache))
+    monkeypatch.setattr(label_cache, "__version__", "99.0")
+    with open_cache(db, builder) as cache:
+        assert cache.evicted == 2
+
+
+def test_lookup_batches_and_label_cache_path(tmp_path, monkeypatch):
+    with LabelCache(tmp_path / "c.sqlite3", "v1") as cache:
+        keys = [f"k{i}" for i in range(1200)]
+        assert cache.store((k, ("US", k, "", "", "", "")) for k in keys) == 1200
+        found = cache.lookup([*keys, "missing"])
+        assert len(found) == 1200 and found["k999"][1] == "k999"
+
+    monkeypatch.delenv("LABEL_CACHE", raising=False)
+    assert label_cache_path() is None
+    assert label_cache_path("off") is None
+    assert label_cache_path(str(tmp_path / "x.db")) == tmp_path / "x.db"
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.setenv("LABEL_CACHE", "on")
+    assert label_cache_path() == tmp_path / "newyearscards" / "labels.sqlite3"
+
+
+def test_cli_build_labels_with_cache(tmp_path, capsys):
+    in_csv = tmp_path / "in.csv"
+    in_csv.write_text(CSV, encoding="utf-8")
+    db = tmp_path / "labels.sqlite3"
+    argv = ["build-labels", "--input", str(in_csv), "--out", str(tmp_path / "out.csv")]
+
+    assert cli_mod.main([*argv, "--cache", str(db)]) == 0
+    assert "1 hit(s), 2 formatted" in capsys.readouterr().err
+    first = (tmp_path / "out.csv").read_text(encoding="utf-8")
+    assert cli_mod.main([*argv, "--cache", str(db)]) == 0
+    assert "3 hit(s), 0 formatted" in capsys.readouterr().err
+    assert (tmp_path / "out.csv").read_text(encoding="utf-8") == first
+
+
+def test_build_without_cache_does_not_load_sqlite(tmp_path):
+    in_csv = tmp_path / "in.csv"
+    in_csv.write_text(CSV, encoding="utf-8")
+    code = (
+        "import sys\n"
+        "from newyearscards import cli\n"
+        f"assert cli.main(['build-labels', '--input', {str(in_csv)!r}, "
+        f"'--out', {str(tmp_path / 'out.csv')!r}, '--cache', 'off']) == 0\n"
+        "print('sqlite3' in sys.modules)\n"
+    )
+    env = {**os.environ, "PYTHONPATH": str(ROOT / "src")}
+    out = subprocess.run(
+        [sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True
+    )
+    assert out.stdout.splitlines()[-1] == "False"
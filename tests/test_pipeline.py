@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import csv
+import gzip
+import io
+
+import pytest
+
+from _http_stub import StubResponse, StubServer
+from newyearscards import cli as cli_mod, sheets
+from newyearscards.addresses import build_labels
+from newyearscards.pipeline import download_and_build, iter_text_lines
+
+HEADER = ["Prefix", "First Name", "Last Name", "Address 1", "Address 2", "City", "State",
+          "Zip Code", "Country"]
+ROWS = [
+    ["Fam.", "Frank", "Prager", "Satower Str. 26", "", "Stäbelow", "", "18198", "Germany"],
+    ["", "Jane", "Doe", "1 Main St", "Apt 2\nBack door", "Springfield", "IL", "62701", "US"],
+    ["", "No", "Address", "", "", "", "", "", ""],
+]
+
+
+def sheet_csv() -> bytes:
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    w.writerow(HEADER)
+    w.writerows(ROWS * 50)
+    return buf.getvalue().encode("utf-8")
+
+
+def test_iter_text_lines_handles_split_multibyte_and_crlf():
+    data = "a,ä\r\nb,ö\r\nlast".encode()
+    # Split after every byte: multibyte chars and \r\n pairs straddle chunks
+    chunks = [data[i : i + 1] for i in range(len(data))]
+    assert list(iter_text_lines(chunks)) == ["a,ä\r\n", "b,ö\r\n", "last"]
+
+
+def test_download_and_build_tees_raw_and_builds_labels(tmp_path, monkeypatch, fake_google):
+    body = sheet_csv()
+    monkeypatch.setenv("RAW_DATA_DIR", str(tmp_path / "raw"))
+    monkeypatch.setenv("PROCESSED_DATA_DIR", str(tmp_path / "processed"))
+    handler = lambda _p: StubResponse(200, gzip.compress(body), {"Content-Encoding": "gzip"})  # noqa: E731
+    with StubServer(handler) as srv:
+        monkeypatch.setattr(sheets, "EXPORT_BASE", srv.url)
+        result = download_and_build(2034)
+
+    assert result.raw_path == tmp_path / "raw" / "2034" / "mailing_list.csv"
+    assert result.raw_path.read_bytes() == body
+    assert result.rows == 100  # the address-less rows are skipped
+
+    # Same output as the two-step download + build-labels flow
+    expected = build_labels(result.raw_path, out_csv=tmp_path / "expected.csv")
+    assert result.labels_path.read_text(encoding="utf-8") == expected.read_text(encoding="utf-8")
+    assert not list(tmp_path.rglob("*.part"))
+
+
+def test_download_and_build_failure_leaves_no_outputs(tmp_path, monkeypatch, fake_google):
+    broken = gzip.compress(sheet_csv())[:-30]
+    monkeypatch.setenv("RAW_DATA_DIR", str(tmp_path / "raw"))
+    monkeypatch.setenv("PROCESSED_DATA_DIR", str(tmp_path / "processed"))
+    handler = lambda _p: StubResponse(200, broken, {"Content-Encoding": "gzip"})  # noqa: E731
+    with StubServer(handler) as srv:
+        monkeypatch.setattr(sheets, "EXPORT_BASE", srv.url)
+        with pytest.raises(ValueError):
+            download_and_build(2034)
+    assert not [p for p in tmp_path.rglob("*") if p.is_file() and p.suffix != ".json"]
+
+
+def test_cli_download_build(tmp_path, monkeypatch, fake_google, capsys):
+    monkeypatch.delenv("AGE_RECIPIENT", raising=False)
+    monkeypatch.delenv("AGE_RECIPIENTS_FILE", raising=False)
+    with StubServer(lambda _p: StubResponse(200, sheet_csv())) as srv:
+        monkeypatch.setattr(sheets, "EXPORT_BASE", srv.url)
+        code = cli_mod.main([
+            "download-build", "--year", "2034",
+            "--raw-out", str(tmp_path / "raw"), "--out", str(tmp_path / "labels.csv"),
+        ])
+    assert code == 0
+    out = capsys.readouterr().out
+    assert f"Saved CSV to {tmp_path / 'raw' / 'mailing_list.csv'}" in out
+    assert "(100 rows)" in out
+    assert (tmp_path / "labels.csv").exists()
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import importlib.util
+import io
+import os
+from pathlib import Path
+import tarfile
+
+import pytest
+
+from newyearscards import backup, catalog, cli as cli_mod
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _backup(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.chdir(tmp_path)
+    for year in (2023, 2024):
+        d = tmp_path / "data" / "raw" / str(year)
+        d.mkdir(parents=True)
+        (d / "mailing_list.csv").write_text(f"a,b\n{year},2\n", encoding="utf-8")
+    monkeypatch.setenv("RAW_DATA_DIR", str(tmp_path / "data" / "raw"))
+    monkeypatch.setenv("PROCESSED_DATA_DIR", str(tmp_path / "data" / "processed"))
+    monkeypatch.setenv("AGE_RECIPIENT", "age1abc")
+    cli_mod._attempt_encrypted_backup(2024)
+    (archive,) = (tmp_path / "backups" / "2024").glob("*.tgz.age")
+    return archive
+
+
+def _script():  # type: ignore[no-untyped-def]
+    spec = importlib.util.spec_from_file_location("age_backup", ROOT / "scripts" / "age_backup.py")
+    assert spec is not None and spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_streaming_restore_leaves_no_plaintext_archive(tmp_path, monkeypatch, fake_age):
+    archive = _backup(tmp_path, monkeypatch)
+    identity = Path(os.environ["AGE_IDENTITY"])
+    out = tmp_path / "out"
+
+    result = backup.restore_archive(archive, identity, out)
+
+    assert sorted(result.files) == ["raw/2023/mailing_list.csv", "raw/2024/mailing_list.csv"]
+    assert (out / "raw" / "2023" / "mailing_list.csv").read_text() == "a,b\n2023,2\n"
+    assert sorted(p.name for p in archive.parent.iterdir()) == [archive.name]
+
+
+def test_path_filter_and_parallel_verify(tmp_path, monkeypatch, fake_age):
+    archive = _backup(tmp_path, monkeypatch)
+    identity = Path(os.environ["AGE_IDENTITY"])
+    found = catalog.find_entry(archive)
+    assert found is not None
+    expected = catalog.expected_checksums(found[1], identity)
+
+    out = tmp_path / "out"
+    result = backup.restore_archive(
+        archive, identity, out, paths=["data/raw/2023"], expected=expected, workers=2
+    )
+    assert result.files == ["raw/2023/mailing_list.csv"]
+    assert result.verified == 1 and result.mismatched == []
+    assert not (out / "raw" / "2024").exists()
+
+    expected["raw/2023/mailing_list.csv"] = "0" * 64
+    result = backup.restore_archive(archive, identity, out, paths=["raw/2023"], expected=expected)
+    assert result.mismatched == ["raw/2023/mailing_list.csv"]
+
+
+def test_unsafe_member_is_refused(tmp_path, fake_age):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w:gz") as tar:
+        info = tarfile.TarInfo("../escape.txt")
+        info.size = 3
+        tar.addfile(info, io.BytesIO(b"bad"))
+    archive = tmp_path / "evil.tgz.age"
+    archive.write_bytes(b"FAKEAGE1\n" + bytes(b ^ 0x5A for b in buf.getvalue()))
+
+    with pytest.raises(tarfile.FilterError):
+        backup.restore_archive(archive, Path(os.environ["AGE_IDENTITY"]), tmp_path / "out")
+    assert not (tmp_path / "escape.txt").exists()
+
+
+def test_script_restore_verify(tmp_path, monkeypatch, fake_age, capsys):
+    archive = _backup(tmp_path, monkeypatch)
+    rc = _script().main(
+        ["restore", "--input", str(archive), "--out-dir", str(tmp_path / "r"), "--verify"]
+    )
+    assert rc == 0
+    out = capsys.readouterr().out
+    assert "Restored 2 file(s)" in out and "Verified 2 file(s)" in out
+
+
+def test_script_rejects_missing_recipients_file(tmp_path, monkeypatch, fake_age, capsys):
+    _backup(tmp_path, monkeypatch)
+    script = _script()
+    argv = ["backup", "--recipient", "age1abc", "--recipients-file", str(tmp_path / "nope.txt")]
+    assert script.main(argv) == 2
+    assert "Recipients file not found" in capsys.readouterr().err
+    assert len(list((tmp_path / "backups").glob("*.age"))) == 0
+
+    # From the environment, a missing file is only a note
+    monkeypatch.setenv("AGE_RECIPIENTS_FILE", str(tmp_path / "nope.txt"))
+    assert script.main(["backup", "--recipient", "age1abc"]) == 0
+    assert "Note: AGE_RECIPIENTS_FILE not found" in capsys.readouterr().err
+    assert len(list((tmp_path / "backups").glob("*.age"))) == 1
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+import json
+from pathlib import Path
+import socket
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from newyearscards.service import LabelService, make_server, server_url
+
+ROOT = Path(__file__).resolve().parent.parent
+ROW = {
+    "First Name": "Frank",
+    "Last Name": "Prager",
+    "Address 1": "Satower Str. 26",
+    "City": "Stäbelow",
+    "Zip Code": "18198",
+    "Country": "Germany",
+}
+
+
+@pytest.fixture
+def base_url() -> Iterator[str]:
+    service = LabelService.from_path(ROOT / "config" / "address_formats.yml")
+    server = make_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server_url(server)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _post(url: str, body: bytes, ctype: str = "application/json") -> tuple[int, bytes]:
+    req = urllib.request.Request(url, data=body, headers={"Content-Type": ctype})
+    try:
+        with urllib.request.urlopen(req, timeout=5) as resp:
+            return resp.status, resp.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+def test_format_single_and_batch(base_url):
+    status, body = _post(base_url + "/format", json.dumps(ROW).encode())
+    assert status == 200
+    label = json.loads(body)["label"]
+    assert label["Country"] == "Germany"
+    assert label["Line3"] == "18198 STÄBELOW" and label["Line4"] == "GERMANY"
+
+    rows = [ROW, {"first_name": "Empty"}, {**ROW, "Country": "USA", "State": "IL"}]
+    status, body = _post(base_url + "/batch", json.dumps({"rows": rows}).encode())
+    data = json.loads(body)
+    assert status == 200 and data["count"] == 2
+    assert [lbl["Country"] for lbl in data["labels"]] == ["Germany", "United States"]
+
+
+def test_csv_upload(base_url):
+    csv_text = ",".join(ROW) + "\n" + ",".join(ROW.values()) + "\n"
+    status, body = _post(base_url + "/csv", csv_text.encode("utf-8"), "text/csv")
+    assert status == 200
+    lines = body.decode("utf-8").splitlines()
+    assert lines[0].startswith("Prefix,FirstName,LastName,Country")
+    assert len(lines) == 2 and ",Germany," in lines[1]
+
+
+def test_errors_and_metrics(base_url):
+    assert _post(base_url + "/format", b"{not json")[0] == 400
+    assert _post(base_url + "/batch", b'{"rows": [1]}')[0] == 400
+    assert _post(base_url + "/nope", b"{}")[0] == 404
+    assert _post(base_url + "/healthz", b"{}")[0] == 405
+
+    with ThreadPoolExecutor(8) as pool:
+        statuses = list(
+            pool.map(lambda _: _post(base_url + "/format", json.dumps(ROW).encode())[0], range(40))
+        )
+    assert statuses == [200] * 40
+
+    with urllib.request.urlopen(base_url + "/metrics", timeout=5) as resp:
+        metrics = json.loads(resp.read())
+    fmt = metrics["endpoints"]["/format"]
+    assert fmt["count"] == 41 and fmt["errors"] == 1
+    assert 0 < fmt["p50_ms"] <= fmt["p99_ms"] <= fmt["max_ms"]
+    assert metrics["endpoints"]["other"]["errors"] == 1
+
+
+def _raw_post(base_url: str, length: str) -> bytes:
+    # No body: the server answers from the headers alone, so nothing is left unread
+    host, port = base_url.removeprefix("http://").split(":")
+    with socket.create_connection((host, int(port)), timeout=5) as s:
+        s.sendall(
+            f"POST /format HTTP/1.1\r\nHost: x\r\nContent-Length: {length}\r\n\r\n".encode()
+        )
+        response = b""
+        while chunk := s.recv(65536):
+            response += chunk
+    return response
+
+
+def test_bad_content_length(base_url):
+    for length in ("abc", "-5"):
+        response = _raw_post(base_url, length)
+        assert response.split(b" ")[1] == b"400"
+        assert b"invalid Content-Length" in response
+    assert _raw_post(base_url, str(10**12)).split(b" ")[1] == b"413"
+
+
+def test_unix_socket(tmp_path):
+    path = tmp_path / "labels.sock"
+    server = make_server(
+        LabelService.from_path(ROOT / "config" / "address_formats.yml"), socket_path=path
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        body = json.dumps(ROW).encode()
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.connect(str(path))
+            s.sendall(
+                b"POST /format HTTP/1.1\r\nHost: x\r\nConnection: close\r\n"
+                + f"Content-Length: {len(body)}\r\n\r\n".encode()
+                + body
+            )
+            response = b""
+            while chunk := s.recv(65536):
+                response += chunk
+    finally:
+        server.shutdown()
+        server.server_close()
+    head, _, payload = response.partition(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 200")
+    assert json.loads(payload)["label"]["LastName"] == "Prager"
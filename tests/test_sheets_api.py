@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+import sys
+from urllib.parse import parse_qs, unquote, urlparse
+
+import pytest
+
+from _http_stub import StubResponse, StubServer, UrllibSession
+from newyearscards import http_retry, sheets, sheets_api
+from newyearscards.addresses import build_labels
+from newyearscards.http_retry import FetchStats, TokenBucket
+
+HEADER = [
+    "Prefix", "First Name", "Last Name", "Phone", "Address 1", "Address 2",
+    "City", "Notes", "State", "Zip Code", "Country", "History",
+]
+# Column-major data for rows 2.. (the API omits trailing empty cells)
+COLUMNS = {
+    "A": ["Fam.", ""],
+    "B": ["Frank", "Jane"],
+    "C": ["Prager", "Doe"],
+    "E": ["Satower Str. 26", "1 Main St"],
+    "F": [],
+    "G": ["Stäbelow", "Springfield"],
+    "I": ["", "IL"],
+    "J": ["18198", "62701"],
+    "K": ["Germany"],
+}
+
+
+def sheets_handler(path: str) -> StubResponse:
+    parsed = urlparse(path)
+    if parsed.path == "/abc":
+        body = {"sheets": [
+            {"properties": {"sheetId": 0, "title": "Other"}},
+            {"properties": {"sheetId": 77, "title": "Mailing 'List'"}},
+        ]}
+    elif parsed.path.startswith("/abc/values:batchGet"):
+        qs = parse_qs(parsed.query)
+        assert qs["majorDimension"] == ["COLUMNS"]
+        ranges = []
+        for r in qs["ranges"]:
+            assert r.startswith("'Mailing ''List'''!")
+            col = r.split("!")[1].split("2:")[0]
+            vr = {"range": r}
+            if COLUMNS[col]:
+                vr["values"] = [COLUMNS[col]]
+            ranges.append(vr)
+        body = {"valueRanges": ranges}
+    elif parsed.path.startswith("/abc/values/"):
+        assert unquote(parsed.path.rsplit("/", 1)[1]) == "'Mailing ''List'''!1:1"
+        body = {"values": [HEADER]}
+    else:
+        return StubResponse(404)
+    return StubResponse(200, json.dumps(body).encode("utf-8"))
+
+
+@pytest.fixture
+def stub_api(monkeypatch):
+    monkeypatch.setattr(http_retry, "_default_limiter", TokenBucket(1000, 1000))
+    with StubServer(sheets_handler) as srv:
+        monkeypatch.setattr(sheets_api, "SHEETS_API_BASE", srv.url)
+        yield srv
+
+
+def test_column_letter():
+    assert [sheets_api.column_letter(i) for i in (0, 25, 26, 51, 701, 702)] == [
+        "A", "Z", "AA", "AZ", "ZZ", "AAA",
+    ]
+
+
+def test_mapped_columns_skips_unknown_and_duplicate_headers():
+    assert sheets_api.mapped_columns(["Notes", "City", "Town", "Zip Code"]) == [1, 3]
+
+
+def test_fetch_projected_csv_requests_only_mapped_columns(stub_api):
+    stats = FetchStats()
+    data = sheets_api.fetch_projected_csv(UrllibSession(), "abc", "77", stats=stats)
+
+    rows = list(csv.reader(io.StringIO(data.decode("utf-8"))))
+    assert rows[0] == [
+        "Prefix", "First Name", "Last Name", "Address 1", "Address 2",
+        "City", "State", "Zip Code", "Country",
+    ]
+    assert rows[1] == ["Fam.", "Frank", "Prager", "Satower Str. 26", "", "Stäbelow", "", "18198",
+                       "Germany"]
+    assert rows[2] == ["", "Jane", "Doe", "1 Main St", "", "Springfield", "IL", "62701", ""]
+    assert stats.requests == 3
+
+    batch = next(r.path for r in stub_api.seen if "batchGet" in r.path)
+    requested = parse_qs(urlparse(batch).query)["ranges"]
+    assert not any(r.endswith(("!D2:D", "!H2:H", "!L2:L")) for r in requested)
+
+
+def test_fetch_projected_csv_unknown_gid(stub_api):
+    with pytest.raises(ValueError, match="gid=5"):
+        sheets_api.fetch_projected_csv(UrllibSession(), "abc", "5")
+
+
+def test_download_sheet_values_backend_feeds_build_labels(tmp_path, monkeypatch, stub_api):
+    key = tmp_path / "key.json"
+    key.write_text("{}", encoding="utf-8")
+    monkeypatch.setenv("RAW_DATA_DIR", str(tmp_path / "raw"))
+    monkeypatch.setenv("SERVICE_ACCOUNT_KEY", str(key))
+    monkeypatch.setenv("SHEET_URL", "https://docs.google.com/spreadsheets/d/abc/edit#gid=77")
+
+    class ModAuthReq:
+        class AuthorizedSession(UrllibSession):  # type: ignore[no-redef]
+            def __init__(self, _creds):
+                pass
+
+    class ModOAuth2:
+        class service_account:  # type: ignore[no-redef]
+            class Credentials:
+                @classmethod
+                def from_service_account_file(cls, path, scopes):  # type: ignore[no-untyped-def]
+                    return object()
+
+    monkeypatch.setitem(sys.modules, "google.auth.transport.requests", ModAuthReq())
+    monkeypatch.setitem(sys.modules, "google.oauth2", ModOAuth2())
+
+    raw = sheets.download_sheet(2032, backend="values")
+    assert raw == tmp_path / "raw" / "2032" / "mailing_list.csv"
+
+    labels = build_labels(raw, out_csv=tmp_path / "labels.csv")
+    out = labels.read_text(encoding="utf-8")
+    assert "18198 STÄBELOW" in out
+    assert "SPRINGFIELD IL 62701" in out
+
+
+def test_download_sheet_rejects_unknown_backend(monkeypatch):
+    monkeypatch.setenv("SHEET_URL", "https://docs.google.com/spreadsheets/d/abc/edit")
+    with pytest.raises(ValueError, match="backend"):
+        sheets.download_sheet(2032, backend="ftp")
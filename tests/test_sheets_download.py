@@ -52,7 +52,7 @@ def test_download_sheet_writes_default_and_custom_paths(tmp_path, monkeypatch):
             def __init__(self, _creds):
                 pass
 
-            def get(self, url: str, timeout: int = 30) -> FakeResponse:
+            def get(self, url: str, timeout: int = 30, **_kwargs) -> FakeResponse:
                 return FakeResponse(b"a,b\n1,2\n")
 
     class ModOAuth2:
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+from newyearscards import cli as cli_mod
+from newyearscards.addresses import build_labels, country_resolution, load_templates
+from newyearscards.stats import collect_stats
+
+ROOT = Path(__file__).resolve().parent.parent
+TEMPLATES = load_templates(ROOT / "config" / "address_formats.yml")
+CSV = (
+    "First Name,Last Name,Address 1,City,State,Zip Code,Country\n"
+    "Frank,Prager,Satower Str. 26,Stäbelow,,18198,Germany\n"
+    "Ann,Lee,1 Main St,Springfield,IL,62701,\n"
+    "Bob,Ray,2 Elm St,Chicago,IL,60601,USA\n"
+    "Kenji,Sato,1-2-3 Ginza,Tokyo,,104-0061,Japan\n"
+    "Nobody,Here,,,,,\n"
+)
+
+
+def test_country_resolution_paths():
+    assert country_resolution({"country": "Germany"})[2] == "canonical"
+    assert country_resolution({"state": "IL"})[2] == "state"
+    assert country_resolution({"country": "Japan"}) == ("Japan", "Japan", "unresolved")
+    assert country_resolution({})[2] == "empty"
+
+
+def test_collect_stats_raw_serial_and_parallel_agree(tmp_path):
+    in_csv = tmp_path / "mailing_list.csv"
+    in_csv.write_text(CSV + CSV.split("\n", 1)[1] * 20, encoding="utf-8")
+
+    stats = collect_stats(in_csv, TEMPLATES, jobs=1, chunk_rows=7)
+    assert (stats.rows, stats.skipped) == (105, 21)
+    assert stats.countries == {"US": 42, "DE": 21, "Japan": 21}
+    assert sum(stats.resolution.values()) == 84 and stats.resolution["state"] == 21
+    data = stats.to_dict()
+    assert data["empty_rate"]["country"] == round(42 / 105, 4)
+    assert data["line_lengths"]["Line1"]["count"] == 84
+    assert data["line_lengths"]["Line1"]["max"] == len("Frank Prager")
+
+    parallel = collect_stats(in_csv, TEMPLATES, jobs=2, chunk_rows=7)
+    assert parallel.to_dict() == data
+
+
+def test_collect_stats_processed(tmp_path):
+    in_csv = tmp_path / "2025" / "mailing_list.csv"
+    in_csv.parent.mkdir()
+    in_csv.write_text(CSV, encoding="utf-8")
+    labels = build_labels(in_csv, tmp_path / "labels.csv")
+
+    stats = collect_stats(labels, TEMPLATES)
+    assert stats.processed and (stats.rows, stats.skipped) == (4, 0)
+    assert stats.countries == {"US": 2, "DE": 1, "Japan": 1}
+    assert "Prefix" in stats.to_dict()["empty_rate"]
+
+
+def test_cli_stats_latest_year(tmp_path, monkeypatch, capsys):
+    for year in (2024, 2025):
+        d = tmp_path / "raw" / str(year)
+        d.mkdir(parents=True)
+        text = CSV if year == 2025 else CSV.replace("Japan", "France")
+        (d / "mailing_list.csv").write_text(text, encoding="utf-8")
+    monkeypatch.setenv("RAW_DATA_DIR", str(tmp_path / "raw"))
+
+    assert cli_mod.main(["stats", "--countries"]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == "US\t2\tUnited States" and "Japan\t1\tJapan" in lines
+
+    assert cli_mod.main(["stats", "--year", "2024", "--json"]) == 0
+    data = json.loads(capsys.readouterr().out)
+    assert {c["code"] for c in data["countries"]} == {"US", "DE", "FR"}
+    assert data["skipped"] == 1
+
+    assert cli_mod.main(["stats", "--year", "2025"]) == 0
+    out = capsys.readouterr().out
+    assert "5 raw rows, 1 skipped (no address)" in out and "Line lengths" in out
+    assert cli_mod.main(["stats", "--year", "2019"]) == 2
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import csv
+import io
+
+import pytest
+
+from newyearscards import cli as cli_mod
+from newyearscards.store import AddressStore
+
+HEADER = "First Name,Last Name,Address 1,City,Zip Code,Country\n"
+Y2024 = (
+    HEADER
+    + "Frank,Prager,Satower Str. 26,Stäbelow,18198,Germany\n"
+    + "Ann,Lee,1 Main St,Springfield,62701,USA\n"
+)
+Y2025 = Y2024.replace("1 Main St", "9 Oak Ave") + "Marie,Curie,1 Rue X,Paris,75005,France\n"
+
+
+@pytest.fixture
+def raw_dirs(tmp_path, monkeypatch):  # type: ignore[no-untyped-def]
+    for year, text in ((2024, Y2024), (2025, Y2025)):
+        d = tmp_path / "raw" / str(year)
+        d.mkdir(parents=True)
+        (d / "mailing_list.csv").write_text(text, encoding="utf-8")
+    monkeypatch.setenv("RAW_DATA_DIR", str(tmp_path / "raw"))
+    monkeypatch.setenv("PROCESSED_DATA_DIR", str(tmp_path / "processed"))
+    monkeypatch.setenv("ADDRESS_STORE", str(tmp_path / "book.sqlite3"))
+    return tmp_path
+
+
+def test_ingest_batches_history_and_indexed_queries(tmp_path):
+    rows = [{"first_name": f"P{i}", "last_name": "Lee", "zip": str(i % 7), "country": "USA"}
+            for i in range(25)]
+    with AddressStore(tmp_path / "s.sqlite3") as store:
+        assert store.ingest(2024, rows, batch_size=10) == 25
+        assert store.ingest(2025, rows[:3]) == 3
+        assert store.years() == [2024, 2025]
+        # Re-ingesting replaces only that year
+        assert store.ingest(2025, rows[:2]) == 2
+        assert [y for y, _ in store.rows(name="lee")].count(2025) == 2
+
+        history = list(store.rows(name="P1 LEE"))
+        assert [(y, r["zip"]) for y, r in history] == [(2024, "1"), (2025, "1")]
+        assert len(list(store.rows(2024, country="United States", zip_code="3"))) == 4
+        assert "addresses_zip" in store.explain(zip_code="3")
+        assert "addresses_name" in store.explain(name="P1 Lee")
+        assert "addresses_country" in store.explain(country="us")
+
+        def failing():  # type: ignore[no-untyped-def]
+            yield from rows[:15]
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            store.ingest(2023, failing(), batch_size=10)
+        assert store.years() == [2024, 2025]
+        assert list(store.rows(2023)) == []
+
+        # A failed re-ingest keeps the year's previous list
+        with pytest.raises(ValueError):
+            store.ingest(2024, failing(), batch_size=10)
+        assert store.years() == [2024, 2025]
+        assert len(list(store.rows(2024))) == 25
+        assert store.ingest(2024, rows[:4]) == 4
+        assert len(list(store.rows(2024))) == 4
+
+
+def test_cli_ingest_lookup_and_build_from_store(raw_dirs, capsys):
+    assert cli_mod.main(["ingest", "--all-years"]) == 0
+    out = capsys.readouterr().out
+    assert "Ingested 2 rows for 2024" in out and "Ingested 3 rows for 2025" in out
+
+    assert cli_mod.main(["lookup", "--name", "ann lee"]) == 0
+    rows = list(csv.DictReader(io.StringIO(capsys.readouterr().out)))
+    assert [(r["year"], r["address1"]) for r in rows] == [
+        ("2024", "1 Main St"),
+        ("2025", "9 Oak Ave"),
+    ]
+
+    assert cli_mod.main(["build-labels", "--year", "2025", "--from-store"]) == 0
+    from_store = (raw_dirs / "processed" / "2025" / "labels_for_mailmerge.csv").read_text("utf-8")
+    capsys.readouterr()
+    assert cli_mod.main(["build-labels", "--year", "2025"]) == 0
+    from_csv = (raw_dirs / "processed" / "2025" / "labels_for_mailmerge.csv").read_text("utf-8")
+    assert from_store == from_csv
+    capsys.readouterr()
+
+    argv = ["build-labels", "--year", "2025", "--from-store", "--dry-run", "--country", "fr"]
+    assert cli_mod.main(argv) == 0
+    preview = capsys.readouterr().out.splitlines()
+    assert len(preview) == 2 and "Curie" in preview[1]
+
+    assert cli_mod.main(["build-labels", "--year", "2019", "--from-store"]) == 2
+    assert "run ingest" in capsys.readouterr().err
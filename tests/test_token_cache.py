@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+import stat
+import sys
+
+from newyearscards import sheets, token_cache
+
+NOW = datetime(2030, 1, 1, 12, 0, 0)
+
+
+def test_store_and_load_round_trip_with_private_permissions(tmp_path):
+    cache = tmp_path / "cache" / "tokens.json"
+    token_cache.store_token(cache, "k1", "tok", NOW + timedelta(hours=1), now=NOW)
+
+    assert stat.S_IMODE(cache.stat().st_mode) == 0o600
+    assert token_cache.load_token(cache, "k1", now=NOW) == ("tok", NOW + timedelta(hours=1))
+    assert token_cache.load_token(cache, "other", now=NOW) is None
+
+
+def test_load_token_refreshes_before_expiry(tmp_path):
+    cache = tmp_path / "tokens.json"
+    expiry = NOW + token_cache.REFRESH_MARGIN - timedelta(seconds=1)
+    token_cache.store_token(cache, "k1", "tok", expiry, now=NOW)
+    # Within the refresh margin the token is no longer handed out
+    assert token_cache.load_token(cache, "k1", now=NOW) is None
+
+
+def test_store_token_drops_expired_entries(tmp_path):
+    cache = tmp_path / "tokens.json"
+    earlier = NOW - timedelta(hours=1)
+    token_cache.store_token(cache, "old", "t0", NOW - timedelta(minutes=1), now=earlier)
+    token_cache.store_token(cache, "new", "t1", NOW + timedelta(hours=1), now=NOW)
+    assert "old" not in cache.read_text(encoding="utf-8")
+
+
+def test_cache_key_depends_on_key_contents_and_scopes(tmp_path):
+    key = tmp_path / "key.json"
+    key.write_text('{"a": 1}', encoding="utf-8")
+    k1 = token_cache.cache_key(key, ["s1", "s2"])
+    assert k1 == token_cache.cache_key(key, ["s2", "s1"])
+    assert k1 != token_cache.cache_key(key, ["s1"])
+    key.write_text('{"a": 2}', encoding="utf-8")
+    assert k1 != token_cache.cache_key(key, ["s1", "s2"])
+
+
+def test_cache_path_env_override_and_disable(tmp_path, monkeypatch):
+    monkeypatch.setenv("TOKEN_CACHE", str(tmp_path / "t.json"))
+    assert token_cache.cache_path() == tmp_path / "t.json"
+    monkeypatch.setenv("TOKEN_CACHE", "off")
+    assert token_cache.cache_path() is None
+    monkeypatch.delenv("TOKEN_CACHE")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    assert token_cache.cache_path() == tmp_path / "newyearscards" / "tokens.json"
+
+
+class FakeTokenEndpoint:
+    """Stands in for the OAuth token exchange and counts how often it is hit."""
+
+    exchanges = 0
+
+    @classmethod
+    def issue(cls) -> tuple[str, datetime]:
+        cls.exchanges += 1
+        return f"token-{cls.exchanges}", token_cache._utcnow() + timedelta(hours=1)
+
+
+class FakeCreds:
+    def __init__(self) -> None:
+        self.token: str | None = None
+        self.expiry: datetime | None = None
+
+    @classmethod
+    def from_service_account_file(cls, path: str, scopes: list[str]):  # type: ignore[no-untyped-def]
+        return cls()
+
+
+class FakeResponse:
+    content = b"a,b\n1,2\n"
+
+    def raise_for_status(self) -> None:
+        return None
+
+
+def test_download_sheet_reuses_cached_token_across_runs(tmp_path, monkeypatch):
+    key = tmp_path / "key.json"
+    key.write_text("{}", encoding="utf-8")
+    monkeypatch.setenv("RAW_DATA_DIR", str(tmp_path / "raw"))
+    monkeypatch.setenv("SERVICE_ACCOUNT_KEY", str(key))
+    monkeypatch.setenv("SHEET_URL", "https://docs.google.com/spreadsheets/d/abc/edit#gid=0")
+    monkeypatch.setenv("TOKEN_CACHE", str(tmp_path / "tokens.json"))
+    FakeTokenEndpoint.exchanges = 0
+    seen_tokens: list[str] = []
+
+    class ModAuthReq:
+        class AuthorizedSession:  # type: ignore[no-redef]
+            def __init__(self, creds):
+                self.creds = creds
+
+            def get(self, url: str, timeout: int = 30, **_kwargs) -> FakeResponse:
+                # Mimic google-auth: only exchange a token when none is held
+                if not self.creds.token:
+                    self.creds.token, self.creds.expiry = FakeTokenEndpoint.issue()
+                seen_tokens.append(self.creds.token)
+                return FakeResponse()
+
+    class ModOAuth2:
+        class service_account:  # type: ignore[no-redef]
+            Credentials = FakeCreds
+
+    monkeypatch.setitem(sys.modules, "google.auth.transport.requests", ModAuthReq())
+    monkeypatch.setitem(sys.modules, "google.oauth2", ModOAuth2())
+
+    sheets.download_sheet(2030)
+    sheets.download_sheet(2030)
+
+    assert FakeTokenEndpoint.exchanges == 1
+    assert seen_tokens == ["token-1", "token-1"]
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+
+from newyearscards import catalog, cli as cli_mod, verify
+
+
+def _backups(tmp_path, monkeypatch) -> Path:  # type: ignore[no-untyped-def]
+    monkeypatch.chdir(tmp_path)
+    raw = tmp_path / "data" / "raw" / "2025"
+    raw.mkdir(parents=True)
+    (raw / "mailing_list.csv").write_text("a,b\n1,2\n" * 2000, encoding="utf-8")
+    monkeypatch.setenv("RAW_DATA_DIR", str(tmp_path / "data" / "raw"))
+    monkeypatch.setenv("PROCESSED_DATA_DIR", str(tmp_path / "data" / "processed"))
+    monkeypatch.setenv("AGE_RECIPIENT", "age1abc")
+    cli_mod._attempt_encrypted_backup(2025)
+    monkeypatch.setenv("BACKUP_MODE", "seekable")
+    cli_mod._attempt_encrypted_backup(2025)
+    return tmp_path / "backups"
+
+
+def test_verify_passes_for_tar_and_seekable(tmp_path, monkeypatch, fake_age):
+    root = _backups(tmp_path, monkeypatch)
+    report = verify.verify_backups(root, Path(os.environ["AGE_IDENTITY"]), jobs=2)
+    assert report["ok"] and report["passed"] == 2 and report["failed"] == 0
+    assert {Path(r["archive"]).suffix for r in report["archives"]} == {".age", ".sar"}
+    assert all(r["files"] == 1 for r in report["archives"])
+
+
+def test_verify_reports_corruption_and_missing(tmp_path, monkeypatch, fake_age, capsys):
+    root = _backups(tmp_path, monkeypatch)
+    tar_entry, sar_entry = catalog.read_catalog(root)
+    archive = root / tar_entry.archive
+    data = bytearray(archive.read_bytes())
+    data[len(data) // 2] ^= 0xFF
+    archive.write_bytes(bytes(data))
+    (root / sar_entry.archive).unlink()
+
+    report_path = tmp_path / "report.json"
+    assert cli_mod.main(["backups", "verify", "--output", str(report_path)]) == 1
+    assert "Verified 0 of 2 backup(s)" in capsys.readouterr().out
+    report = json.loads(report_path.read_text(encoding="utf-8"))
+    assert report["ok"] is False
+    by_name = {r["archive"]: r for r in report["archives"]}
+    assert by_name[tar_entry.archive]["status"] in ("fail", "error")
+    assert by_name[sar_entry.archive]["status"] == "error"
+    assert "missing" in by_name[sar_entry.archive]["error"]
+
+
+def test_verify_cli_prints_json(tmp_path, monkeypatch, fake_age, capsys):
+    _backups(tmp_path, monkeypatch)
+    capsys.readouterr()
+    assert cli_mod.main(["backups", "verify", "--jobs", "1"]) == 0
+    report = json.loads(capsys.readouterr().out)
+    assert report["ok"] is True and len(report["archives"]) == 2
+    for jobs in ("0", "-2"):
+        assert cli_mod.main(["backups", "verify", "--jobs", jobs]) == 2
+        assert "--jobs must be at least 1" in capsys.readouterr().err
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import csv
+import itertools
+import os
+from pathlib import Path
+import threading
+
+from newyearscards.watch import IncrementalBuild, changed_templates, watch
+
+HEADER = "First Name,Last Name,Address 1,City,Zip Code,Country\n"
+ROWS = (
+    "Frank,Prager,Satower Str. 26,Stäbelow,18198,Germany\n"
+    "Anna,Muster,Hauptstr. 1,Berlin,10115,Germany\n"
+    "Ada,Lovelace,1 Main St,Springfield,62701,USA\n"
+    "Jean,Dupont,1 Rue de Rivoli,Paris,75001,France\n"
+)
+TEMPLATES = """default:
+  lines:
+    - "{first_name} {last_name}"
+    - "{address1}"
+    - "{zip} {city}"
+    - "{country}"
+DE:
+  lines:
+    - "{first_name} {last_name}"
+    - "{address1}"
+    - "{zip} {city}"
+    - "Germany"
+"""
+
+
+def _setup(tmp_path: Path) -> IncrementalBuild:
+    (tmp_path / "in.csv").write_text(HEADER + ROWS, encoding="utf-8")
+    (tmp_path / "t.yml").write_text(TEMPLATES, encoding="utf-8")
+    out = tmp_path / "out" / "labels.csv"
+    return IncrementalBuild(tmp_path / "in.csv", out, tmp_path / "t.yml")
+
+
+def _lines(path: Path) -> list[str]:
+    with path.open(encoding="utf-8", newline="") as f:
+        return [row["Line1"] for row in csv.DictReader(f)]
+
+
+def test_changed_templates():
+    old = {"default": {"lines": ["a"]}, "DE": {"lines": ["b"]}}
+    new = {"default": {"lines": ["a"]}, "DE": {"lines": ["c"]}, "FR": {"lines": ["d"]}}
+    assert changed_templates(old, new) == {"DE", "FR"}  # type: ignore[arg-type]
+
+
+def test_template_edit_rerenders_only_affected_countries(tmp_path):
+    build = _setup(tmp_path)
+    assert build.rebuild().rendered == 4
+
+    # Nothing changed: everything comes from the cache
+    assert build.rebuild(csv_changed=False, templates_changed=True).rendered == 0
+
+    # Edit the DE template: only the two German rows are re-rendered
+    (tmp_path / "t.yml").write_text(TEMPLATES.replace('"Germany"', '"DEUTSCHLAND"'))
+    result = build.rebuild(csv_changed=False, templates_changed=True)
+    assert result.rendered == 2 and "templates: DE" in result.reason
+    assert result.rows == 4
+
+    # Editing default affects the US and FR rows, which have no own template
+    (tmp_path / "t.yml").write_text(
+        TEMPLATES.replace("{first_name} {last_name}", "{last_name}, {first_name}", 1)
+    )
+    result = build.rebuild(csv_changed=False, templates_changed=True)
+    assert result.rendered == 4  # DE reverted too
+    assert _lines(build.out_csv)[2] == "Lovelace, Ada"
+
+
+def test_csv_edit_rerenders_changed_rows_only(tmp_path):
+    build = _setup(tmp_path)
+    build.rebuild()
+    (tmp_path / "in.csv").write_text(
+        HEADER + ROWS.replace("Anna", "Anne") + "Bob,Smith,2 Main St,Boston,02101,USA\n",
+        encoding="utf-8",
+    )
+    result = build.rebuild(csv_changed=True, templates_changed=False)
+    assert (result.rows, result.rendered) == (5, 2)
+    assert _lines(build.out_csv)[1] == "Anne Muster"
+
+
+def test_watch_debounces_and_survives_bad_templates(tmp_path):
+    build = _setup(tmp_path)
+    results = []
+    errors = []
+    first = threading.Event()
+
+    def on_rebuild(result):  # type: ignore[no-untyped-def]
+        results.append(result)
+        first.set()
+
+    t = threading.Thread(
+        target=watch,
+        args=(build,),
+        kwargs={
+            "interval": 0.01,
+            "debounce": 0.1,
+            "on_rebuild": on_rebuild,
+            "on_error": errors.append,
+            "max_rebuilds": 3,
+        },
+        daemon=True,
+    )
+    t.start()
+    assert first.wait(5)
+
+    # A half-written YAML file is reported; the last good output stays
+    tpl = tmp_path / "t.yml"
+    tpl.write_text("DE:\n  lines: [\n", encoding="utf-8")
+    while not errors:
+        threading.Event().wait(0.01)
+    assert build.out_csv.exists()
+
+    # A burst of saves becomes a single rebuild
+    for i in range(3):
+        tpl.write_text(TEMPLATES + f"# save {i}\n", encoding="utf-8")
+        os.utime(tpl, ns=(i, 10**9 * (i + 100)))
+    t.join(5)
+    assert not t.is_alive()
+    assert len(results) == 2 and len(errors) == 1
+
+
+def test_input_change_is_kept_across_a_failed_build(tmp_path):
+    build = _setup(tmp_path)
+    tpl, in_csv = tmp_path / "t.yml", tmp_path / "in.csv"
+
+    def save(path: Path, text: str, stamp: int) -> None:
+        path.write_text(text, encoding="utf-8")
+        os.utime(path, ns=(stamp, stamp))
+
+    # Saved together: a new row and a broken templates file; then only the templates are fixed
+    edits = [
+        lambda: (
+            save(in_csv, HEADER + ROWS + "Marie,Curie,1 Rue X,Paris,75005,France\n", 10**9),
+            save(tpl, "DE:\n  lines: [\n", 10**9),
+        ),
+        lambda: save(tpl, TEMPLATES, 2 * 10**9),
+    ]
+
+    calls = itertools.count()
+
+    def sleep(_seconds: float) -> None:
+        # Even calls wait for a change, odd ones are the debounce
+        if next(calls) % 2 == 0 and edits:
+            edits.pop(0)()
+
+    errors: list[Exception] = []
+    watch(build, on_rebuild=lambda r: None, on_error=errors.append, max_rebuilds=3, sleep=sleep)
+    assert len(errors) == 1
+    assert _lines(build.out_csv)[-1] == "Marie Curie"